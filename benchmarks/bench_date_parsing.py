@@ -0,0 +1,89 @@
+"""
+Micro-benchmark of the date parsing/construction used when reading ERAA data: row-wise (former) vs. vectorized
+versions, on real files of data/ERAA_2023-2 folder.
+Run from the root of this project with: python -m benchmarks.bench_date_parsing
+"""
+import os
+import time
+from datetime import datetime
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from common.long_term_uc_io import COLUMN_NAMES, DATE_FORMAT, DT_SUBFOLDERS, FILES_FORMAT, HYDRO_FILES, \
+    INPUT_ERAA_FOLDER
+from common.constants.datatypes import DATATYPE_NAMES
+from utils.dates import set_date_from_year_and_day_idx, set_date_from_year_and_iso_idx, \
+    set_dates_from_year_and_day_idx, set_dates_from_year_and_iso_idx
+from utils.df_utils import cast_df_col_as_date
+
+N_REPEATS = 3
+YEAR = 1900
+
+
+def best_time(func: Callable, n_repeats: int = N_REPEATS) -> (float, object):
+    best_duration = None
+    result = None
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        result = func()
+        duration = time.perf_counter() - start
+        best_duration = duration if best_duration is None else min(best_duration, duration)
+    return best_duration, result
+
+
+def print_comparison(case_name: str, n_rows: int, duration_rowwise: float, duration_vect: float):
+    print(f'{case_name} ({n_rows} rows): row-wise {1e3 * duration_rowwise:.1f} ms, '
+          f'vectorized {1e3 * duration_vect:.1f} ms -> x{duration_rowwise / duration_vect:.0f}')
+
+
+def bench_daily_hydro_dates():
+    hydro_file = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro, HYDRO_FILES[DATATYPE_NAMES.hydro_ror])
+    df_hydro = pd.read_csv(hydro_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+    day_col = COLUMN_NAMES.day
+    duration_rowwise, dates_rowwise = best_time(
+        func=lambda: df_hydro[day_col].apply(lambda x: set_date_from_year_and_day_idx(year=YEAR, day_idx=x)))
+    duration_vect, dates_vect = best_time(
+        func=lambda: set_dates_from_year_and_day_idx(year=YEAR, day_idx=df_hydro[day_col].to_numpy()))
+    assert np.array_equal(dates_rowwise.to_numpy(dtype='datetime64[ns]'), dates_vect)
+    print_comparison(case_name=f'Dates from day idx, {HYDRO_FILES[DATATYPE_NAMES.hydro_ror]}', n_rows=len(df_hydro),
+                     duration_rowwise=duration_rowwise, duration_vect=duration_vect)
+
+
+def bench_iso_week_hydro_dates():
+    # weekly data -> dates from (ISO) week idx, and day=1 (Monday)
+    hydro_file = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro, HYDRO_FILES[DATATYPE_NAMES.hydro_inflows])
+    df_hydro = pd.read_csv(hydro_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+    week_col = COLUMN_NAMES.week
+    day_col = COLUMN_NAMES.day
+    df_hydro = df_hydro[df_hydro[week_col] < 53].assign(**{day_col: 1})
+    duration_rowwise, dates_rowwise = best_time(
+        func=lambda: df_hydro.apply(lambda row: set_date_from_year_and_iso_idx(year=YEAR, week_idx=row[week_col],
+                                                                               day_idx=row[day_col]),
+                                    axis=1))
+    duration_vect, dates_vect = best_time(
+        func=lambda: set_dates_from_year_and_iso_idx(year=YEAR, week_idx=df_hydro[week_col].to_numpy(),
+                                                     day_idx=df_hydro[day_col].to_numpy()))
+    assert np.array_equal(dates_rowwise.to_numpy(dtype='datetime64[ns]'), dates_vect)
+    print_comparison(case_name=f'Dates from ISO week idx, {HYDRO_FILES[DATATYPE_NAMES.hydro_inflows]}',
+                     n_rows=len(df_hydro), duration_rowwise=duration_rowwise, duration_vect=duration_vect)
+
+
+def bench_cast_df_col_as_date():
+    demand_file = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.demand, 'demand_2025_france.csv')
+    df_demand = pd.read_csv(demand_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+    date_col = COLUMN_NAMES.date
+    duration_rowwise, dates_rowwise = best_time(
+        func=lambda: df_demand[date_col].apply(lambda x: datetime.strptime(x, DATE_FORMAT)))
+    duration_vect, df_vect = best_time(
+        func=lambda: cast_df_col_as_date(df=df_demand.copy(), date_col=date_col, date_format=DATE_FORMAT))
+    assert np.array_equal(dates_rowwise.to_numpy(dtype='datetime64[ns]'), df_vect[date_col].to_numpy())
+    print_comparison(case_name='cast_df_col_as_date, demand_2025_france.csv', n_rows=len(df_demand),
+                     duration_rowwise=duration_rowwise, duration_vect=duration_vect)
+
+
+if __name__ == '__main__':
+    bench_daily_hydro_dates()
+    bench_iso_week_hydro_dates()
+    bench_cast_df_col_as_date()
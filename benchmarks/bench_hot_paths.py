@@ -0,0 +1,386 @@
+"""
+Benchmark suite of the data-loading and model-building hot paths of the LT UC pipeline, on the data/ERAA_2023-2
+files (offline), parameterized by UC horizon length (1 week, 1 month, 1 year) and - for ERAA data reading - number
+of countries. Results are saved in a JSON file of output/benchmarks, and compared to the ones of a previous run
+(e.g. before a perf-oriented change) if its file is provided.
+Run from the root of this project with: python -m benchmarks.bench_hot_paths [baseline results file]
+N.B. ERAA binary cache files (see utils/eraa_data_cache.py) are kept between repeats, but the in-process ERAA data
+store is cleared before each of them -> times of the first reading of data in a run
+"""
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from dataclasses import dataclass, asdict, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pypsa
+from pypsa.descriptors import get_switchable_as_dense
+
+from common.constants.data_analysis_types import ROLLING_WINDOWS_DEFAULT
+from common.constants.datatypes import DATATYPE_NAMES
+from common.constants.usage_params_json import EnvPhaseNames
+from common.fuel_sources import set_fuel_sources_from_json
+from common.logger import deactivate_verbose_warnings
+from common.long_term_uc_io import COLUMN_NAMES, DT_FILE_PREFIX, DT_SUBFOLDERS, HYDRO_DATA_RESAMPLE_METHODS, \
+    HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, HYDRO_TS_GRANULARITY, HYDRO_VALUE_COLUMNS, INPUT_ERAA_FOLDER, \
+    OUTPUT_BENCHMARKS_FOLDER
+from include.dataset import Dataset, get_all_cys_demand_data, get_demand_data, set_final_hydro_key_cols
+from include.uc_postprocessing import UCOptimalSolution
+from my_little_europe_lt_uc import create_pypsa_network_model
+from utils.df_utils import resample_and_distribute, resample_and_distribute_per_zone, selec_in_df_based_on_list
+from utils.dir_utils import make_dir
+from utils.eraa_data_cache import read_eraa_csv
+from utils.eraa_data_reader import filter_input_data, read_and_process_hydro_data
+from utils.eraa_data_store import ERAA_DATA_STORE
+from utils.read import read_and_check_uc_run_params, read_usage_params
+from utils.rolling_avg import calc_rolling_avg_batch
+from utils.ts_statistics import calc_ts_stats
+
+PERIOD_START = datetime(1900, 1, 1)
+HORIZONS = {'week': timedelta(days=7), 'month': timedelta(days=31), 'year': timedelta(days=364)}
+N_REPEATS = {'week': 5, 'month': 3, 'year': 1}  # best time kept
+COUNTRIES_SELEC = {1: ['france'], 3: ['france', 'germany', 'italy'],
+                   7: ['france', 'germany', 'italy', 'iberian-peninsula', 'benelux', 'scandinavia', 'poland']}
+HYDRO_DTS = [DATATYPE_NAMES.hydro_ror, DATATYPE_NAMES.hydro_inflows, DATATYPE_NAMES.hydro_levels_min]
+# real files used in filter_input_data benchmark
+FILTER_INPUT_FILES = {DATATYPE_NAMES.demand: f'{DT_SUBFOLDERS.demand}/{DT_FILE_PREFIX.demand}_2025_france.csv',
+                      DATATYPE_NAMES.capa_factor:
+                          f'{DT_SUBFOLDERS.res_capa_factors}/{DT_FILE_PREFIX.res_capa_factors}_wind_onshore_2025_'
+                          f'france.csv'}
+REGRESSION_TOLERANCE = 0.2  # relative increase of best time above which a case is flagged as a regression
+
+
+@dataclass
+class BenchResult:
+    name: str
+    params: Dict[str, object]
+    best_time: float  # s
+    median_time: float  # s
+    n_repeats: int
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}[{", ".join(f"{k}={v}" for k, v in self.params.items())}]'
+
+
+@dataclass
+class BenchRun:
+    meta: dict = field(default_factory=dict)
+    results: List[BenchResult] = field(default_factory=list)
+
+    def add(self, result: BenchResult):
+        self.results.append(result)
+        print(f'{result.key}: best {1e3 * result.best_time:.1f} ms, median {1e3 * result.median_time:.1f} ms '
+              f'({result.n_repeats} repeats)')
+
+    def json_dump(self, file: str):
+        with open(file, 'w', encoding='utf-8') as f:
+            json.dump({'meta': self.meta, 'results': [asdict(result) for result in self.results]}, f, indent=2)
+
+
+def time_func(name: str, params: dict, func: Callable, n_repeats: int, setup: Callable = None) -> BenchResult:
+    """
+    :param setup: called before each repeat, not timed (e.g. to clear in-process data store)
+    """
+    durations = []
+    for _ in range(n_repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return BenchResult(name=name, params=params, best_time=min(durations), median_time=float(np.median(durations)),
+                       n_repeats=n_repeats)
+
+
+def get_git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_run_meta() -> dict:
+    return {'date': datetime.now().isoformat(timespec='seconds'), 'git_commit': get_git_commit(),
+            'python': platform.python_version(), 'platform': platform.platform(), 'machine': platform.machine(),
+            'n_cpus': os.cpu_count(), 'numpy': np.__version__, 'pandas': pd.__version__, 'pypsa': pypsa.__version__}
+
+
+def set_bench_uc_run_params(horizon: str, countries: List[str] = None):
+    """
+    UC run params of input JSON files, with period (and countries) of a benchmark case
+    """
+    eraa_data_descr, uc_run_params = (
+        read_and_check_uc_run_params(phase_name=EnvPhaseNames.multizones_uc_model, usage_params=read_usage_params())
+    )
+    uc_run_params.set_uc_period(start=PERIOD_START, end=PERIOD_START + HORIZONS[horizon])
+    if countries is not None:
+        uc_run_params.set_countries(countries=countries)
+    # custom constraints bounds depend on period
+    uc_run_params.set_sum_prod_constraints(available_countries=eraa_data_descr.available_countries)
+    return eraa_data_descr, uc_run_params
+
+
+def get_countries_data(uc_run_params, eraa_data_descr) -> Dataset:
+    eraa_dataset = Dataset(source=f'eraa_{eraa_data_descr.eraa_edition}',
+                           agg_prod_types_with_cf_data=eraa_data_descr.agg_prod_types_with_cf_data,
+                           is_stress_test=uc_run_params.is_stress_test)
+    eraa_dataset.get_countries_data(uc_run_params=uc_run_params,
+                                    aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def)
+    eraa_dataset.complete_data()
+    return eraa_dataset
+
+
+def get_generation_units_data(eraa_dataset: Dataset, uc_run_params, eraa_data_descr):
+    eraa_dataset.get_generation_units_data(
+        uc_run_params=uc_run_params, pypsa_unit_params_per_agg_pt=eraa_data_descr.pypsa_unit_params_per_agg_pt,
+        units_complem_params_per_agg_pt=eraa_data_descr.units_complem_params_per_agg_pt)
+    eraa_dataset.set_committable_param_to_false()
+
+
+def set_synthetic_uc_solution(network: pypsa.Network) -> UCOptimalSolution:
+    """
+    UC "solution" with the max. available production of all generators (p_nom * p_max_pu) -> no resolution
+    needed to benchmark the calculation of UC summary metrics, which only depends on the size of prod. df
+    """
+    uc_opt_solution = UCOptimalSolution(network_name=network.name)
+    p_max_pu = get_switchable_as_dense(network, 'Generator', 'p_max_pu')
+    uc_opt_solution.prod = p_max_pu.mul(network.generators.p_nom, axis=1)
+    return uc_opt_solution
+
+
+def bench_filter_input_data(bench_run: BenchRun):
+    for datatype, filename in FILTER_INPUT_FILES.items():
+        df = read_eraa_csv(csv_file=os.path.join(INPUT_ERAA_FOLDER, filename))
+        for horizon, duration in HORIZONS.items():
+            bench_run.add(time_func(
+                name='filter_input_data', params={'datatype': datatype, 'horizon': horizon},
+                func=lambda: filter_input_data(df=df, date_col=COLUMN_NAMES.date,
+                                               climatic_year_col=COLUMN_NAMES.climatic_year,
+                                               period_start=PERIOD_START, period_end=PERIOD_START + duration,
+                                               climatic_year=1989),
+                n_repeats=N_REPEATS[horizon]))
+
+
+def bench_read_and_process_hydro_data(bench_run: BenchRun):
+    hydro_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro)
+    for hydro_dt in HYDRO_DTS:
+        bench_run.add(time_func(name='read_and_process_hydro_data', params={'datatype': hydro_dt},
+                                func=lambda: read_and_process_hydro_data(hydro_dt=hydro_dt, folder=hydro_folder),
+                                n_repeats=N_REPEATS['month']))
+
+
+def bench_resample_and_distribute(bench_run: BenchRun):
+    """
+    Both pandas per-zone and NumPy (all zones at once) engines, on hydro data of all zones
+    """
+    hydro_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro)
+    for hydro_dt in HYDRO_DTS:
+        df_hydro_all = read_and_process_hydro_data(hydro_dt=hydro_dt, folder=hydro_folder)
+        zones = sorted(set(df_hydro_all[COLUMN_NAMES.zone]))
+        for horizon, duration in HORIZONS.items():
+            period_end = PERIOD_START + duration
+            df_hydro_data = filter_input_data(df=df_hydro_all, date_col=COLUMN_NAMES.date,
+                                              climatic_year_col=COLUMN_NAMES.climatic_year,
+                                              period_start=PERIOD_START, period_end=period_end, climatic_year=1989)
+            resample_args = {
+                'date_col': COLUMN_NAMES.date, 'value_cols': HYDRO_VALUE_COLUMNS[hydro_dt],
+                'key_cols': set_final_hydro_key_cols(hydro_dt=hydro_dt),
+                'method': HYDRO_DATA_RESAMPLE_METHODS[hydro_dt],
+                'start_date': min(PERIOD_START, min(df_hydro_data[COLUMN_NAMES.date])),
+                'end_date': period_end - timedelta(hours=1),
+                'resample_divisor': 24 if HYDRO_TS_GRANULARITY[hydro_dt] == 'day' else 7 * 24,
+                'fill_na_vals': HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, 'freq': 'h'
+            }
+            # N.B. copied in each repeat, resample_and_distribute setting date index inplace
+            zone_dfs = [selec_in_df_based_on_list(df=df_hydro_data, selec_col=COLUMN_NAMES.zone, selec_vals=[zone],
+                                                  rm_selec_col=True) for zone in zones]
+            params = {'datatype': hydro_dt, 'horizon': horizon, 'n_zones': len(zones)}
+            bench_run.add(time_func(
+                name='resample_and_distribute', params=params,
+                func=lambda: [resample_and_distribute(df=zone_df.copy(), **resample_args) for zone_df in zone_dfs],
+                n_repeats=N_REPEATS[horizon]))
+            bench_run.add(time_func(
+                name='resample_and_distribute_per_zone', params=params,
+                func=lambda: resample_and_distribute_per_zone(df=df_hydro_data, zone_col=COLUMN_NAMES.zone,
+                                                              zones=zones, **resample_args),
+                n_repeats=N_REPEATS[horizon]))
+
+
+def bench_all_cys_demand_data(bench_run: BenchRun):
+    """
+    Demand of all climatic years of a (country, year): one read per climatic year vs. one tensor for all of them
+    """
+    demand_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.demand)
+    file_suffix = '2025_france'
+    climatic_years = sorted(set(read_eraa_csv(csv_file=f'{demand_folder}/{DT_FILE_PREFIX.demand}_{file_suffix}.csv')
+                                [COLUMN_NAMES.climatic_year]))
+    for horizon, duration in HORIZONS.items():
+        period = (PERIOD_START, PERIOD_START + duration)
+        params = {'horizon': horizon, 'n_climatic_years': len(climatic_years)}
+        bench_run.add(time_func(
+            name='get_demand_data (per climatic year)', params=params,
+            func=lambda: [get_demand_data(folder=demand_folder, file_suffix=file_suffix, target_year=2025,
+                                          country='france', climatic_year=climatic_year, period=period)
+                          for climatic_year in climatic_years],
+            n_repeats=N_REPEATS[horizon], setup=ERAA_DATA_STORE.clear))
+        bench_run.add(time_func(
+            name='get_all_cys_demand_data', params=params,
+            func=lambda: get_all_cys_demand_data(folder=demand_folder, file_suffix=file_suffix, target_year=2025,
+                                                 country='france', period=period),
+            n_repeats=N_REPEATS[horizon], setup=ERAA_DATA_STORE.clear))
+
+
+def bench_residual_load_all_cys(bench_run: BenchRun):
+    """
+    Net demand and fatal production of all climatic years over a year, for 1/3/7 countries - from ERAA data reading
+    to the batched calculation
+    """
+    for n_countries, countries in COUNTRIES_SELEC.items():
+        eraa_data_descr, uc_run_params = set_bench_uc_run_params(horizon='year', countries=countries)
+        eraa_dataset = Dataset(source=f'eraa_{eraa_data_descr.eraa_edition}',
+                               agg_prod_types_with_cf_data=eraa_data_descr.agg_prod_types_with_cf_data)
+        bench_run.add(time_func(
+            name='Dataset.get_countries_all_cys_data', params={'datatype': 'residual_load', 'n_countries': n_countries},
+            func=lambda: eraa_dataset.get_countries_all_cys_data(
+                uc_run_params=uc_run_params, aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def,
+                datatypes_selec=[DATATYPE_NAMES.net_demand, DATATYPE_NAMES.fatal_production]),
+            n_repeats=N_REPEATS['month'], setup=ERAA_DATA_STORE.clear))
+
+
+def bench_ts_stats(bench_run: BenchRun):
+    """
+    Statistics of a year of demand: per climatic year (exact, in a chunk) and of all climatic years concatenated
+    (streamed histogram) - vs. the full sort previously used for duration curves
+    """
+    demand_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.demand)
+    demand_tensor = get_all_cys_demand_data(folder=demand_folder, file_suffix='2025_france', target_year=2025,
+                                            country='france',
+                                            period=(PERIOD_START, PERIOD_START + HORIZONS['year']))
+    cases = {'1-clim-year': demand_tensor.values[0],
+             f'{len(demand_tensor.climatic_years)}-clim-years': demand_tensor.values.ravel()}
+    for case_name, values in cases.items():
+        params = {'case': case_name, 'n_values': len(values)}
+        bench_run.add(time_func(name='np.sort (duration curve)', params=params,
+                                func=lambda: np.sort(values)[::-1], n_repeats=N_REPEATS['week']))
+        bench_run.add(time_func(name='calc_ts_stats', params=params,
+                                func=lambda: calc_ts_stats(values=values), n_repeats=N_REPEATS['week']))
+
+
+def bench_rolling_horizon_avg(bench_run: BenchRun):
+    """
+    Rolling horizon averages of a year of demand of all climatic years: per series and window pandas rolling vs.
+    cumulative sums of the stacked value matrix
+    """
+    windows = ROLLING_WINDOWS_DEFAULT
+    demand_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.demand)
+    demand_tensor = get_all_cys_demand_data(folder=demand_folder, file_suffix='2025_france', target_year=2025,
+                                            country='france',
+                                            period=(PERIOD_START, PERIOD_START + HORIZONS['year']))
+    params = {'n_climatic_years': len(demand_tensor.climatic_years), 'windows': windows}
+    bench_run.add(time_func(
+        name='pd.Series.rolling (per series and window)', params=params,
+        func=lambda: [pd.Series(cy_values).rolling(window).mean().to_numpy()
+                      for cy_values in demand_tensor.values for window in windows],
+        n_repeats=N_REPEATS['week']))
+    bench_run.add(time_func(name='calc_rolling_avg_batch', params=params,
+                            func=lambda: calc_rolling_avg_batch(values=demand_tensor.values, windows=windows),
+                            n_repeats=N_REPEATS['week']))
+
+
+def bench_dataset_and_model(bench_run: BenchRun):
+    """
+    ERAA data reading for 1/3/7 countries, then - for all countries - generation units data, PyPSA model creation
+    and UC summary metrics
+    """
+    fuel_sources = set_fuel_sources_from_json()
+    for horizon in HORIZONS:
+        for n_countries, countries in COUNTRIES_SELEC.items():
+            eraa_data_descr, uc_run_params = set_bench_uc_run_params(horizon=horizon, countries=countries)
+            bench_run.add(time_func(
+                name='Dataset.get_countries_data', params={'horizon': horizon, 'n_countries': n_countries},
+                func=lambda: get_countries_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr),
+                n_repeats=N_REPEATS[horizon], setup=ERAA_DATA_STORE.clear))
+        # following steps with all countries - the last ones
+        eraa_dataset = get_countries_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+        params = {'horizon': horizon, 'n_countries': len(uc_run_params.selected_countries)}
+        bench_run.add(time_func(
+            name='Dataset.get_generation_units_data', params=params,
+            func=lambda: get_generation_units_data(eraa_dataset=eraa_dataset, uc_run_params=uc_run_params,
+                                                   eraa_data_descr=eraa_data_descr),
+            n_repeats=N_REPEATS[horizon]))
+        pypsa_models = []
+        bench_run.add(time_func(
+            name='create_pypsa_network_model', params=params,
+            func=lambda: pypsa_models.append(
+                create_pypsa_network_model(name='bench', uc_run_params=uc_run_params, eraa_dataset=eraa_dataset,
+                                           zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                           fuel_sources=dict(fuel_sources), plot_network=False)),
+            n_repeats=N_REPEATS[horizon]))
+        network = pypsa_models[-1].network
+        uc_opt_solution = set_synthetic_uc_solution(network=network)
+        bench_run.add(time_func(
+            name='set_uc_summary_metrics', params=params,
+            func=lambda: uc_opt_solution.set_uc_summary_metrics(network=network, total_cost=1e9,
+                                                                failure_penalty=uc_run_params.failure_penalty),
+            n_repeats=N_REPEATS['week']))
+
+
+def compare_with_baseline(bench_run: BenchRun, baseline_file: str, tolerance: float = REGRESSION_TOLERANCE):
+    """
+    Print ratio of best times of current run vs. baseline, flagging the regressions (above given tolerance)
+    """
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    baseline_times = {BenchResult(**result).key: result['best_time'] for result in baseline['results']}
+    print(f'\nComparison with baseline {baseline_file} (commit {baseline["meta"].get("git_commit")})')
+    n_regressions = 0
+    for result in bench_run.results:
+        if result.key not in baseline_times:
+            print(f'{result.key}: not in baseline')
+            continue
+        ratio = result.best_time / baseline_times[result.key]
+        is_regression = ratio > 1 + tolerance
+        n_regressions += is_regression
+        print(f'{result.key}: x{ratio:.2f} vs. baseline{" -> REGRESSION" if is_regression else ""}')
+    print(f'{n_regressions} regression(s) above {100 * tolerance:.0f}% tolerance')
+
+
+def run_benchmarks(baseline_file: str = None) -> str:
+    """
+    Returns: file in which results have been saved
+    """
+    deactivate_verbose_warnings()
+    # only errors logged, not to mix (repeated) data warnings with benchmark results
+    logging.basicConfig(level=logging.ERROR)
+    warnings.simplefilter('ignore', pd.errors.SettingWithCopyWarning)
+    bench_run = BenchRun(meta=get_run_meta())
+    bench_filter_input_data(bench_run=bench_run)
+    bench_read_and_process_hydro_data(bench_run=bench_run)
+    bench_resample_and_distribute(bench_run=bench_run)
+    bench_all_cys_demand_data(bench_run=bench_run)
+    bench_residual_load_all_cys(bench_run=bench_run)
+    bench_ts_stats(bench_run=bench_run)
+    bench_rolling_horizon_avg(bench_run=bench_run)
+    bench_dataset_and_model(bench_run=bench_run)
+    make_dir(full_path=OUTPUT_BENCHMARKS_FOLDER)
+    results_file = (f'{OUTPUT_BENCHMARKS_FOLDER}/bench-hot-paths_{bench_run.meta["git_commit"]}_'
+                    f'{datetime.now():%Y%m%d-%H%M%S}.json')
+    bench_run.json_dump(file=results_file)
+    print(f'Benchmark results saved in {results_file}')
+    if baseline_file is not None:
+        compare_with_baseline(bench_run=bench_run, baseline_file=baseline_file)
+    return results_file
+
+
+if __name__ == '__main__':
+    run_benchmarks(baseline_file=sys.argv[1] if len(sys.argv) > 1 else None)
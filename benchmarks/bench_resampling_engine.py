@@ -0,0 +1,73 @@
+"""
+Timing of the NumPy (all zones at once) resampling engine, resample_and_distribute_per_zone, vs. the pandas per-zone
+resample_and_distribute function, on hydro data of data/ERAA_2023-2 folder - identical results being checked in
+tests/test_resampling_engine.py.
+Run from the root of this project with: python -m benchmarks.bench_resampling_engine
+"""
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from common.constants.datatypes import DATATYPE_NAMES
+from common.long_term_uc_io import COLUMN_NAMES, DT_SUBFOLDERS, HYDRO_DATA_RESAMPLE_METHODS, \
+    HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, HYDRO_TS_GRANULARITY, HYDRO_VALUE_COLUMNS, INPUT_ERAA_FOLDER
+from include.dataset import set_final_hydro_key_cols
+from utils.df_utils import resample_and_distribute, resample_and_distribute_per_zone, selec_in_df_based_on_list
+from utils.eraa_data_reader import filter_input_data, read_and_process_hydro_data
+
+HYDRO_DTS = [DATATYPE_NAMES.hydro_ror, DATATYPE_NAMES.hydro_inflows, DATATYPE_NAMES.hydro_levels_min]
+CLIMATIC_YEARS = [1982, 1989, 2016]
+# period start not always on a Monday, to check the case of weekly data starting before it
+PERIODS = [(datetime(1900, 1, 1), datetime(1900, 1, 8)), (datetime(1900, 1, 3), datetime(1900, 1, 20)),
+           (datetime(1900, 3, 7, 5), datetime(1900, 6, 1)), (datetime(1900, 1, 1), datetime(1900, 12, 24))]
+
+
+def get_resample_args(hydro_dt: str, df_hydro_data: pd.DataFrame, period: (datetime, datetime)) -> dict:
+    return {'date_col': COLUMN_NAMES.date, 'value_cols': HYDRO_VALUE_COLUMNS[hydro_dt],
+            'key_cols': set_final_hydro_key_cols(hydro_dt=hydro_dt), 'method': HYDRO_DATA_RESAMPLE_METHODS[hydro_dt],
+            'start_date': min(period[0], min(df_hydro_data[COLUMN_NAMES.date])),
+            'end_date': period[1] - timedelta(hours=1),
+            'resample_divisor': 24 if HYDRO_TS_GRANULARITY[hydro_dt] == 'day' else 7 * 24,
+            'fill_na_vals': HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, 'freq': 'h'}
+
+
+def run_bench():
+    hydro_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro)
+    duration_pandas = 0
+    duration_numpy = 0
+    n_cases = 0
+    n_zones_max = 0
+    for hydro_dt in HYDRO_DTS:
+        df_hydro_all = read_and_process_hydro_data(hydro_dt=hydro_dt, folder=hydro_folder)
+        zones = sorted(set(df_hydro_all[COLUMN_NAMES.zone]))
+        # including a zone without data
+        zones.append('atlantis')
+        n_zones_max = max(n_zones_max, len(zones))
+        for climatic_year in CLIMATIC_YEARS:
+            for period in PERIODS:
+                df_hydro_data = filter_input_data(df=df_hydro_all, date_col=COLUMN_NAMES.date,
+                                                  climatic_year_col=COLUMN_NAMES.climatic_year,
+                                                  period_start=period[0], period_end=period[1],
+                                                  climatic_year=climatic_year)
+                resample_args = get_resample_args(hydro_dt=hydro_dt, df_hydro_data=df_hydro_data, period=period)
+                start = time.perf_counter()
+                for zone in zones:
+                    zone_df = selec_in_df_based_on_list(df=df_hydro_data, selec_col=COLUMN_NAMES.zone,
+                                                        selec_vals=[zone], rm_selec_col=True)
+                    if len(zone_df) > 0:
+                        resample_and_distribute(df=zone_df, **resample_args)
+                duration_pandas += time.perf_counter() - start
+                start = time.perf_counter()
+                resample_and_distribute_per_zone(df=df_hydro_data, zone_col=COLUMN_NAMES.zone,
+                                                 zones=zones, **resample_args)
+                duration_numpy += time.perf_counter() - start
+                n_cases += 1
+    print(f'{n_cases} (hydro datatype, climatic year, period) cases - up to {n_zones_max} zones')
+    print(f'pandas per-zone resampling: {duration_pandas:.2f}s, NumPy engine: {duration_numpy:.2f}s '
+          f'-> x{duration_pandas / duration_numpy:.0f}')
+
+
+if __name__ == '__main__':
+    run_bench()
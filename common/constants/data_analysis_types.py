@@ -3,7 +3,7 @@ from dataclasses import dataclass
 
 @dataclass
 class AnalysisTypes:
-    calc: str = 'calc'
+    calc: str = 'calc'  # statistics (quantiles, duration curve, ramps, top time-slots) saved to JSON
     # only extract data from data folder and put it in output folder
     extract: str = 'extract'
     # idem, put putting it on 'matricial format', with different climatic years in column
@@ -17,3 +17,5 @@ ANALYSIS_TYPES = AnalysisTypes()
 ANALYSIS_TYPES_PLOT = [ANALYSIS_TYPES.plot, ANALYSIS_TYPES.plot_duration_curve, ANALYSIS_TYPES.plot_rolling_horizon_avg]
 AVAILABLE_ANALYSIS_TYPES = list(ANALYSIS_TYPES.__dict__.values())
 COMMON_PLOT_YEAR = 1900
+# rolling horizon avg windows, in number of time-slots (hours): day, week, month
+ROLLING_WINDOWS_DEFAULT = [24, 168, 720]
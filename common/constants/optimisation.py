@@ -1,6 +1,7 @@
 import logging
 from dataclasses import dataclass
-from typing import List
+from datetime import datetime
+from typing import Dict, List, Union
 
 import numpy as np
 
@@ -49,15 +50,103 @@ class OptimResolStatus:
 OPTIM_RESOL_STATUS = OptimResolStatus()
 
 
+@dataclass
+class SolverMethods:
+    simplex: str = 'simplex'
+    ipm: str = 'ipm'  # interior point, followed by crossover to get a basic solution
+    ipm_no_crossover: str = 'ipm_no_crossover'  # idem, without crossover (much faster on big LPs)
+
+
+# named solver profile for batch adequacy runs, defined in solver params JSON file
+FAST_LP_SOLVER_PROFILE = 'fast-LP'
+# name of solver options, for the profile params directly passed to the solver (i.e. with same value)
+SOLVER_OPTION_NAMES = {
+    OptimSolvers.highs: {'threads': 'threads', 'primal_feas_tol': 'primal_feasibility_tolerance',
+                         'dual_feas_tol': 'dual_feasibility_tolerance', 'time_limit': 'time_limit',
+                         'mip_gap': 'mip_rel_gap'},
+    OptimSolvers.gurobi: {'threads': 'Threads', 'primal_feas_tol': 'FeasibilityTol',
+                          'dual_feas_tol': 'OptimalityTol', 'time_limit': 'TimeLimit', 'mip_gap': 'MIPGap'}
+}
+
+
+@dataclass
+class SolverProfile:
+    """
+    Solver performance profile, with solver-agnostic params - None ones let to solver default values
+    """
+    threads: int = None
+    parallel: bool = None  # HiGHS only: parallel (dual) simplex; N.B. HiGHS IPM is always multi-threaded
+    method: str = None  # in SolverMethods
+    presolve: bool = None
+    primal_feas_tol: float = None
+    dual_feas_tol: float = None
+    time_limit: float = None  # in seconds
+    mip_gap: float = None  # relative
+
+    def check(self, profile_name: str):
+        avail_methods = get_default_values(obj=SolverMethods)
+        if self.method is not None and self.method not in avail_methods:
+            print_errors_list(error_name=f'in solver profile {profile_name}',
+                              errors_list=[unknown_value_error(var_name='solver method', value=self.method,
+                                                               available_values=avail_methods)])
+
+    def get_solver_options(self, solver_name: str) -> Dict[str, Union[int, float, str]]:
+        """
+        Options of the given solver corresponding to this profile, to be passed as solver_options to linopy
+        """
+        solver_options = {SOLVER_OPTION_NAMES[solver_name][param_name]: getattr(self, param_name)
+                          for param_name in SOLVER_OPTION_NAMES[solver_name]
+                          if getattr(self, param_name) is not None}
+        if solver_name == OptimSolvers.highs:
+            if self.parallel is not None:
+                solver_options['parallel'] = 'on' if self.parallel else 'off'
+            if self.presolve is not None:
+                solver_options['presolve'] = 'on' if self.presolve else 'off'
+            if self.method is not None:
+                solver_options['solver'] = SolverMethods.simplex if self.method == SolverMethods.simplex \
+                    else SolverMethods.ipm
+                if not self.method == SolverMethods.simplex:
+                    solver_options['run_crossover'] = 'off' if self.method == SolverMethods.ipm_no_crossover \
+                        else 'on'
+        elif solver_name == OptimSolvers.gurobi:
+            if self.presolve is not None:
+                solver_options['Presolve'] = -1 if self.presolve else 0  # -1: automatic
+            if self.method is not None:
+                # 1: dual simplex, 2: barrier
+                solver_options['Method'] = 1 if self.method == SolverMethods.simplex else 2
+                if self.method == SolverMethods.ipm_no_crossover:
+                    solver_options['Crossover'] = 0
+            if self.parallel is not None:
+                logging.warning(f'Solver profile param parallel not available for {solver_name} -> not used')
+        return solver_options
+
+
 @dataclass
 class SolverParams:
     name: str = 'highs'
     license_file: str = None
+    profile_name: str = None  # name of the performance profile used; None for solver default params
+    profile: SolverProfile = None
+
+    def get_solver_options(self) -> Dict[str, Union[int, float, str]]:
+        if self.profile is None:
+            return {}
+        return self.profile.get_solver_options(solver_name=self.name)
 
 
 DEFAULT_OPTIM_SOLVER_PARAMS = SolverParams(name=OptimSolvers.highs)
 
 
+@dataclass
+class ModelFileFormats:
+    lp: str = 'lp'
+    mps: str = 'mps'
+    mps_gz: str = 'mps.gz'  # MPS file compressed with gzip
+
+
+MODEL_FILE_FORMATS = ModelFileFormats()
+
+
 @dataclass
 class CustomConstraintNames:
     max_co2_emissions: str = 'max_co2_emissions'
@@ -79,6 +168,9 @@ class ConstMultCoeffNames:
 # TODO: put as object (below) constants?
 N_COUNTRIES_MAX_IN_NAME = 3
 WHOLE_PERIOD_GRANULARITY: str = 'whole_period'
+# factor to convert custom constraint bounds (given in MtCO2, resp. M€ - as in JSON input file) to the unit of
+# their zone-and-temp. sum of prod. in PyPSA model (tCO2 - with carriers emission factors in tCO2/MWh -, resp. €)
+CUSTOM_CONST_BOUND_UNIT_FACTOR = {ConstMultCoeffNames.co2_emis_factor: 1e6, ConstMultCoeffNames.variable_cost: 1e6}
 
 
 @dataclass
@@ -97,6 +189,8 @@ class ZoneAndTempProdSumConstraint:
     countries: List[str]  # over which constraints is to be imposed
     bound: np.ndarray
     name: str = None
+    # dates associated to bound values (in data calendar); bound[i] being for [dates[i], dates[i+1][
+    dates: List[datetime] = None
 
     def __repr__(self) -> str:
         attr_sep = '\n- '
@@ -7,3 +7,13 @@ class PlotNames:
     prod_stacked_with_stock: str = 'prod_stacked_with_stock'
     link_flows: str = 'link_flows'
     marginal_price: str = 'marginal_price'
+
+
+@dataclass
+class FigureModes:
+    synchronous: str = 'synchronous'  # figures rendered during the run, before returning (default)
+    deferred: str = 'deferred'  # rendered in a background process pool, off the critical path of the run
+    none: str = 'none'  # no figures
+
+
+FIGURE_MODES = FigureModes()
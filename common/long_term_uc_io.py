@@ -47,6 +47,27 @@ class FilesFormat:
     decimal_sep: str = '.'
 
 
+@dataclass
+class ERAADataCacheFormats:
+    feather: str = 'feather'  # columnar, needs pyarrow
+    pickle: str = 'pkl'  # fallback, pandas only
+
+
+@dataclass
+class UCResultFileFormats:
+    csv: str = 'csv'  # one wide CSV file per result family and run
+    parquet: str = 'parquet'  # zstd-compressed, partitioned dataset; needs pyarrow
+
+
+@dataclass
+class UCResultFamilies:
+    # N.B. values are the prefixes of the associated output file names
+    opt_power: str = 'opt_power'
+    storage_opt_decisions: str = 'storage_opt_decisions'
+    link_flow_opt_decisions: str = 'link-flow_opt_decisions'
+    marginal_prices: str = 'marginal_prices'
+
+
 @dataclass
 class ComplemDataSources:
     from_json_tb_modif: str = 'from_json_tb_modif'
@@ -108,6 +129,11 @@ HYDRO_DATA_RESAMPLE_METHODS = {DATATYPE_NAMES.hydro_ror: ResampleMethods.uniform
                                DATATYPE_NAMES.hydro_levels_max: ResampleMethods.all_at_first_ts}
 HYDRO_LEVELS_RESAMPLE_FILLNA_VALS = {COLUMN_NAMES.min_value: 0, COLUMN_NAMES.max_value: 1e10}
 INPUT_ERAA_FOLDER = f'{DATA_FOLDER}/ERAA_2023-2'
+# typed binary copies of ERAA CSV files, saved in a subfolder of the folder of each source file
+ERAA_DATA_CACHE_SUBFOLDER = '.cache'
+ERAA_DATA_CACHE_FORMATS = ERAADataCacheFormats()
+UC_RESULT_FILE_FORMATS = UCResultFileFormats()
+UC_RESULT_FAMILIES = UCResultFamilies()
 INPUT_FOLDER = 'input'
 INPUT_FUEL_SOURCES_FOLDER = f'{DATA_FOLDER}/fuel_sources'
 INPUT_LT_UC_SUBFOLDER = f'{INPUT_FOLDER}/long_term_uc'
@@ -121,6 +147,7 @@ OUTPUT_FOLDER_LT = f'{OUTPUT_FOLDER}/long_term_uc'
 OUTPUT_SUBFOLDER_DATA = 'data'
 OUTPUT_SUBFOLDER_FIG = 'figures'
 OUTPUT_DATA_ANALYSIS_FOLDER = f'{OUTPUT_FOLDER}/data_analysis'
+OUTPUT_BENCHMARKS_FOLDER = f'{OUTPUT_FOLDER}/benchmarks'
 
 
 def check_uc_input_folder_content(all_countries: List[str]):
@@ -290,7 +317,72 @@ def get_marginal_prices_file(country: str, year: int, climatic_year: int, start_
     return get_csv_file_named(name='marginal_prices', country=country, year=year, climatic_year=climatic_year, 
                               start_horizon=start_horizon, toy_model_output=toy_model_output)
 
+
+def get_uc_results_dataset_folder(country: str, toy_model_output: bool = False) -> str:
+    """
+    Root folder of the (Parquet) dataset of UC results - all runs and result families
+    """
+    output_folder = set_full_lt_uc_output_folder(folder_type='data', country=country, toy_model_output=toy_model_output)
+    return f'{output_folder}/uc-results_{country}'
+
+
+def get_uc_results_dataset_file(result_family: str, country: str, year: int, climatic_year: int,
+                                start_horizon: datetime, toy_model_output: bool = False,
+                                create_subdir: bool = True) -> str:
+    """
+    File of a result family of a run in the UC results dataset, partitioned by (target year, climatic year, start
+    horizon) - "hive" style key=value subfolders, then a (pyarrow) dataset per family can be read with
+    pd.read_parquet({dataset folder}/{result family}), with these keys as columns
+    """
+    run_folder = (f'{get_uc_results_dataset_folder(country=country, toy_model_output=toy_model_output)}/'
+                  f'{result_family}/target_year={year}/climatic_year={climatic_year}/'
+                  f'start_horizon={start_horizon.strftime(DATE_FORMAT_FILE)}')
+    if create_subdir:
+        make_dir(full_path=run_folder)
+    return f'{run_folder}/part-0.{UC_RESULT_FILE_FORMATS.parquet}'
+
+
 def get_uc_summary_file(country: str, year: int, climatic_year: int, start_horizon: datetime,
                         toy_model_output: bool = False) -> str:
     return get_json_file_named(name='uc-summary', country=country, year=year, climatic_year=climatic_year,
                                start_horizon=start_horizon, toy_model_output=toy_model_output)
+
+
+def get_uc_profile_file(country: str, year: int, climatic_year: int, start_horizon: datetime,
+                        toy_model_output: bool = False) -> str:
+    """
+    Per-stage profiling timeline (wall/CPU time, memory) of a UC run, next to its UC summary file
+    """
+    return get_json_file_named(name='uc-profile', country=country, year=year, climatic_year=climatic_year,
+                               start_horizon=start_horizon, toy_model_output=toy_model_output)
+
+
+def get_uc_batch_summary_file(country: str = 'europe', create_subdir: bool = True) -> str:
+    """
+    Consolidated table of UC summary metrics, with one row per (target year, climatic year, period) case of a batch
+    """
+    output_folder = set_full_lt_uc_output_folder(folder_type='data', country=country)
+    if create_subdir:
+        make_dir(full_path=output_folder)
+    return f'{output_folder}/uc-summary_batch_{country}.csv'
+
+
+def get_uc_sweep_summary_file(country: str = 'europe', create_subdir: bool = True) -> str:
+    """
+    Consolidated table of UC summary metrics, with one row per case of a parameter sweep
+    """
+    output_folder = set_full_lt_uc_output_folder(folder_type='data', country=country)
+    if create_subdir:
+        make_dir(full_path=output_folder)
+    return f'{output_folder}/uc-summary_sweep_{country}.csv'
+
+
+def get_uc_sweep_basis_file(run_id: str, country: str = 'europe', create_subdir: bool = True) -> str:
+    """
+    Solver basis of the last resolution in a parameter sweep, used to warm-start the next one
+    :param run_id: identifier of the sweep run, for concurrent sweeps not to share (and remove) the same basis file
+    """
+    output_folder = set_full_lt_uc_output_folder(folder_type='data', country=country)
+    if create_subdir:
+        make_dir(full_path=output_folder)
+    return f'{output_folder}/solver-basis_sweep_{country}_{run_id}.bas'
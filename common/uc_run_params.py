@@ -3,6 +3,8 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 import logging
 
+import numpy as np
+
 from common.constants.extract_eraa_data import ERAADatasetDescr
 from common.constants.optimisation import ZoneAndTempProdSumConstraint, CustomConstraintNames, ConstMultCoeffNames, \
     CustomConstraintDirection
@@ -64,6 +66,8 @@ class UCRunParams:
     # sum of production constraint objects, obtained based on previous dicts:
     # sum_{z, t} prod(z, t) * coeff(z, t) <= ub (or >=)
     sum_prod_constraints: List[ZoneAndTempProdSumConstraint] = None
+    # countries with 'all' aggreg. prod. types selection -> set again if target year modified (e.g., in batch runs)
+    countries_with_all_prod_types: List[str] = field(default_factory=list)
 
     def __repr__(self):
         repr_sep = '\n- '
@@ -118,6 +122,13 @@ class UCRunParams:
             self.updated_fuel_sources_params = new_updated_fuel_source_params
 
         # process custom sum-prod. constraints data, e.g. max CO2 emissions one
+        self.set_sum_prod_constraints(available_countries=available_countries)
+
+    def set_sum_prod_constraints(self, available_countries: List[str]):
+        """
+        Set custom sum-prod. constraints from their JSON data - depending on UC period, hence to be called again
+        if the latter is modified after processing (e.g., in batch runs)
+        """
         self.sum_prod_constraints = []
         # add max CO2 emis constraints
         if self.max_co2_emis_constraints is not None:
@@ -134,11 +145,12 @@ class UCRunParams:
                 # not full, e.g. week with only 3 days)
                 self.sum_prod_constraints.append(
                     ZoneAndTempProdSumConstraint(type=CustomConstraintNames.max_co2_emissions,
-                                                 direction=CustomConstraintDirection.lower,
+                                                 direction=CustomConstraintDirection.upper,
                                                  mult_coeff_name=ConstMultCoeffNames.co2_emis_factor,
                                                  temporal_granularity=temporal_granularity,
                                                  countries=const_params['countries'],
-                                                 bound=upper_bound_ts.value)
+                                                 bound=np.atleast_1d(np.array(upper_bound_ts.value, dtype=float)),
+                                                 dates=upper_bound_ts.dates)
                 )
             # and process + check that they are coherently defined
             for constraint in self.sum_prod_constraints:
@@ -172,6 +184,41 @@ class UCRunParams:
 
         return errors_list
 
+    def set_all_selected_prod_types(self, eraa_data_descr: ERAADatasetDescr):
+        """
+        Replace 'all' aggreg. prod. types selection by the ones available for the target year - countries with this
+        selection being kept, to set them again when target year is modified (e.g., in batch runs)
+        """
+        for elt_country, current_agg_pt in self.selected_prod_types.items():
+            if current_agg_pt == [ALL_KEYWORD] and elt_country not in self.countries_with_all_prod_types:
+                self.countries_with_all_prod_types.append(elt_country)
+        for elt_country in self.countries_with_all_prod_types:
+            self.selected_prod_types[elt_country] = (
+                list(eraa_data_descr.available_aggreg_prod_types[elt_country][self.selected_target_year]))
+
+    def coherence_check_prod_types(self, eraa_data_descr: ERAADatasetDescr) -> List[str]:
+        """
+        Check that aggreg. prod. types are not repeated, and available for the target year (to be known)
+        """
+        errors_list = []
+        msg_suffix = 'in values of dict. of aggreg. prod. types selection, for country'
+        for elt_country, current_agg_pt in self.selected_prod_types.items():
+            # check can be done only if country keys are known
+            if elt_country not in eraa_data_descr.available_countries:
+                continue
+            current_avail_aggreg_pts = (
+                eraa_data_descr.available_aggreg_prod_types)[elt_country][self.selected_target_year]
+            current_avail_aggreg_pt_set = set(current_avail_aggreg_pts)
+            current_agg_pt_set = set(current_agg_pt)
+            if len(current_agg_pt_set) < len(current_agg_pt):
+                errors_list.append(f'Repetition of aggreg. prod. types {msg_suffix} {elt_country}')
+            unknown_agg_prod_types = list(current_agg_pt_set - current_avail_aggreg_pt_set)
+            if len(unknown_agg_prod_types) > 0:
+                errors_list.append(
+                    f'Unknown/not available aggreg. prod. types {msg_suffix} {elt_country} '
+                    f'(target year {self.selected_target_year}): {unknown_agg_prod_types}')
+        return errors_list
+
     def coherence_check(self, eraa_data_descr: ERAADatasetDescr, add_failure_asset_if_missing: bool = True):
         # start by checking Target Year (TY) and Climatic Year (CY)
         errors_list = self.coherence_check_ty_and_cy(eraa_data_descr=eraa_data_descr)
@@ -190,10 +237,7 @@ class UCRunParams:
         # operation that can be done only if coherent year; otherwise ref. (available) data cannot be obtained
         is_coherent_ty = coherent_target_year(errors_list=errors_list)
         if is_coherent_ty:
-            for elt_country, current_agg_pt in self.selected_prod_types.items():
-                if current_agg_pt == [ALL_KEYWORD]:
-                    self.selected_prod_types[elt_country] = (
-                        eraa_data_descr.available_aggreg_prod_types)[elt_country][self.selected_target_year]
+            self.set_all_selected_prod_types(eraa_data_descr=eraa_data_descr)
 
         # check that countries in aggreg. prod. types are not repeated, and known
         agg_pt_countries = list(self.selected_prod_types)
@@ -227,22 +271,7 @@ class UCRunParams:
 
         # check that aggreg. prod types are not repeated, and known -> can be done only if coherent TY
         if is_coherent_ty:
-            msg_suffix = 'in values of dict. of aggreg. prod. types selection, for country'
-            for elt_country, current_agg_pt in self.selected_prod_types.items():
-                # check can be done only if country keys are known
-                if elt_country in unknown_agg_pt_countries:
-                    continue
-                current_avail_aggreg_pts = (
-                    eraa_data_descr.available_aggreg_prod_types)[elt_country][self.selected_target_year]
-                current_avail_aggreg_pt_set = set(current_avail_aggreg_pts)
-                current_agg_pt_set = set(current_agg_pt)
-                if len(current_agg_pt_set) < len(current_agg_pt):
-                    errors_list.append(f'Repetition of aggreg. prod. types {msg_suffix} {elt_country}')
-                unknown_agg_prod_types = list(current_agg_pt_set - current_avail_aggreg_pt_set)
-                if len(unknown_agg_prod_types) > 0:
-                    errors_list.append(
-                        f'Unknown/not available aggreg. prod. types {msg_suffix} {elt_country}:'
-                        f' {unknown_agg_prod_types}')
+            errors_list.extend(self.coherence_check_prod_types(eraa_data_descr=eraa_data_descr))
 
         # check that both dates are in allowed period
         allowed_period_msg = (f'[{MIN_DATE_IN_DATA.strftime(DATE_FORMAT_IN_JSON)}, '
@@ -0,0 +1,311 @@
+"""
+Runner of ERAA (input) data analyses in a pool of processes: full task graph set up front, with
+- data loading tasks: one per (datatype, sub-datatypes, year, climatic year, period, extra-params) input, reading the
+data of all countries needed by the analyses sharing this input -> each (country, year, climatic year) input read once.
+For plots of demand/capa. factors over multiple climatic years, one input per (datatype, sub-datatypes, year, period)
+instead, with all climatic years read at once as (climatic year x date) tensors
+- analysis tasks (plot/extract): submitted as soon as all the data they need has been loaded
+Outputs are the same as the ones of a sequential loop over analyses (files named after each analysis)
+"""
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Optional, Tuple, Union
+
+import matplotlib
+import pandas as pd
+
+from common.constants.data_analysis_types import ANALYSIS_TYPES, ANALYSIS_TYPES_PLOT
+from common.constants.datatypes import DATATYPE_NAMES
+from common.constants.extract_eraa_data import ERAADatasetDescr
+from common.logger import init_logger, deactivate_verbose_warnings
+from common.long_term_uc_io import OUTPUT_DATA_ANALYSIS_FOLDER
+from common.plot_params import PlotParams
+from common.uc_run_params import UCRunParams
+from include.dataset import Dataset, DATATYPES_WITH_CY_TENSOR
+from include.dataset_analyzer import DataAnalysis, PER_AGG_PT_CY_TENSORS
+from utils.eraa_data_store import ERAA_DATA_STORE
+from utils.plot import FigureStyle
+
+# key of per-case data in DataAnalysis.apply_analysis: (country, year, climatic year, extra-params idx)
+PER_CASE_DATA_KEY_TYPE = Tuple[str, int, int, Optional[int]]
+# from this number of climatic years in an analysis, they are all read at once (if datatype allows it)
+N_CYS_MIN_FOR_CY_TENSORS = 2
+
+
+@dataclass(frozen=True)
+class DataAnalysisInput:
+    """
+    Input data of (possibly several) analyses, read at once for all their countries
+    """
+    data_type: str
+    subdt_selec: Optional[Tuple[str, ...]]
+    year: int
+    climatic_year: Optional[int]  # None for all climatic years (of standard or stress test data) read at once
+    period_start: datetime
+    period_end: datetime
+    extra_params_json: Optional[str] = None  # extra-params values, as (hashable) JSON str
+    is_stress_test: bool = False  # only used if all climatic years read at once
+
+    def __repr__(self) -> str:
+        if self.climatic_year is None:
+            cy_str = 'all stress test climatic years' if self.is_stress_test else 'all climatic years'
+            cases_str = f'year {self.year} and {cy_str}'
+        else:
+            cases_str = f'(year, climatic year) = ({self.year}, {self.climatic_year})'
+        return (f'{self.data_type} input for {cases_str}, period '
+                f'{self.period_start:%Y/%m/%d}-{self.period_end:%Y/%m/%d}'
+                + (f', extra-params {self.extra_params_json}' if self.extra_params_json is not None else ''))
+
+    def with_cy_tensors(self) -> bool:
+        return self.climatic_year is None
+
+    def get_extra_params_vals(self) -> dict:
+        return {} if self.extra_params_json is None else json.loads(self.extra_params_json)
+
+
+@dataclass
+class DataAnalysisTask:
+    data_analysis: DataAnalysis
+    # {(country, year, climatic year, extra-params idx): input from which the data of this case is obtained}
+    per_case_input: Dict[PER_CASE_DATA_KEY_TYPE, DataAnalysisInput]
+    dt_suffix_for_output: Optional[str] = None
+    extra_params_labels: Dict[int, str] = None
+
+
+@dataclass
+class DataAnalysisSharedInputs:
+    """
+    Inputs common to all tasks, read and checked once in main process then sent once to each worker
+    """
+    eraa_data_descr: ERAADatasetDescr
+    uc_run_params: UCRunParams
+    fig_style: FigureStyle
+    per_dim_plot_params: Dict[str, PlotParams]
+    log_level: str
+
+
+# set in each worker process by init_data_analysis_worker
+DATA_ANALYSIS_SHARED_INPUTS: Optional[DataAnalysisSharedInputs] = None
+
+
+def use_cy_tensors(data_analysis: DataAnalysis) -> bool:
+    """
+    Are all climatic years data of an analysis read at once, as (climatic year x date) tensors? Only for plots and
+    statistics - (float32) tensor values being not exactly the ones of ERAA files, that are kept in extracted data
+    """
+    return (data_analysis.data_type in DATATYPES_WITH_CY_TENSOR
+            and data_analysis.analysis_type in ANALYSIS_TYPES_PLOT + [ANALYSIS_TYPES.calc]
+            and len(data_analysis.climatic_years) >= N_CYS_MIN_FOR_CY_TENSORS)
+
+
+def set_data_analysis_tasks(data_analyses: List[DataAnalysis], avail_cy_stress_test: List[int]) \
+        -> List[DataAnalysisTask]:
+    """
+    Set, for each analysis, the inputs of its (country, year, climatic year, extra-params) cases
+    N.B. dt suffix for output set here, as it can reset aggreg. prod. types of the analysis - after they have been
+    used for data selection
+    :param avail_cy_stress_test: climatic years of stress test data - in separate files
+    """
+    tasks = []
+    for data_analysis in data_analyses:
+        subdt_selec = None if data_analysis.aggreg_prod_types == [None] else tuple(data_analysis.aggreg_prod_types)
+        with_cy_tensors = use_cy_tensors(data_analysis=data_analysis)
+        per_case_input = {}
+        for year, clim_year, current_extra_params in (
+                product(data_analysis.years, data_analysis.climatic_years, data_analysis.extra_params)):
+            if current_extra_params is None:
+                extra_params_json, extra_params_idx = None, None
+            else:
+                extra_params_json = json.dumps(current_extra_params.values, sort_keys=True)
+                extra_params_idx = current_extra_params.index
+            if with_cy_tensors:
+                analysis_input = DataAnalysisInput(data_type=data_analysis.data_type, subdt_selec=subdt_selec,
+                                                   year=year, climatic_year=None,
+                                                   period_start=data_analysis.period_start,
+                                                   period_end=data_analysis.period_end,
+                                                   extra_params_json=extra_params_json,
+                                                   is_stress_test=(avail_cy_stress_test is not None
+                                                                   and clim_year in avail_cy_stress_test))
+            else:
+                analysis_input = DataAnalysisInput(data_type=data_analysis.data_type, subdt_selec=subdt_selec,
+                                                   year=year, climatic_year=clim_year,
+                                                   period_start=data_analysis.period_start,
+                                                   period_end=data_analysis.period_end,
+                                                   extra_params_json=extra_params_json)
+            for country in data_analysis.countries:
+                per_case_input[(country, year, clim_year, extra_params_idx)] = analysis_input
+        dt_suffix_for_output = data_analysis.get_dt_suffix_for_output()
+        tasks.append(DataAnalysisTask(data_analysis=data_analysis, per_case_input=per_case_input,
+                                      dt_suffix_for_output=dt_suffix_for_output,
+                                      extra_params_labels=data_analysis.get_extra_args_idx_to_label_corresp()))
+    return tasks
+
+
+def get_per_input_countries(tasks: List[DataAnalysisTask]) -> Dict[DataAnalysisInput, List[str]]:
+    """
+    Countries to be read for each input - union over the analyses using it -, inputs ordered by (year, datatype,
+    climatic year), so that the data files of a same year are mostly read by the same workers
+    """
+    per_input_countries = {}
+    for task in tasks:
+        for (country, _, _, _), analysis_input in task.per_case_input.items():
+            input_countries = per_input_countries.setdefault(analysis_input, [])
+            if country not in input_countries:
+                input_countries.append(country)
+    return dict(sorted(per_input_countries.items(),
+                       key=lambda item: (item[0].year, item[0].data_type,
+                                         -1 if item[0].with_cy_tensors() else item[0].climatic_year)))
+
+
+def set_input_uc_run_params(uc_run_params: UCRunParams, analysis_input: DataAnalysisInput, countries: List[str],
+                            eraa_data_descr: ERAADatasetDescr) -> UCRunParams:
+    input_uc_run_params = deepcopy(uc_run_params)
+    input_uc_run_params.set_countries(countries=countries)
+    input_uc_run_params.set_uc_period(start=analysis_input.period_start, end=analysis_input.period_end)
+    input_uc_run_params.set_target_year(year=analysis_input.year)
+    if analysis_input.with_cy_tensors():
+        input_uc_run_params.is_stress_test = analysis_input.is_stress_test
+        return input_uc_run_params
+    input_uc_run_params.set_climatic_year(climatic_year=analysis_input.climatic_year)
+    # Attention check at each time if stress test based on the set year
+    input_uc_run_params.set_is_stress_test(avail_cy_stress_test=eraa_data_descr.available_climatic_years_stress_test)
+    return input_uc_run_params
+
+
+def check_data_analysis_inputs(per_input_countries: Dict[DataAnalysisInput, List[str]], uc_run_params: UCRunParams,
+                               eraa_data_descr: ERAADatasetDescr):
+    """
+    Check (year, climatic year) of all inputs in main process -> stop before reading any data if incoherent
+    """
+    for analysis_input, countries in per_input_countries.items():
+        # all climatic years inputs: years already checked with DataAnalysis params
+        if analysis_input.with_cy_tensors():
+            continue
+        input_uc_run_params = set_input_uc_run_params(uc_run_params=uc_run_params, analysis_input=analysis_input,
+                                                      countries=countries, eraa_data_descr=eraa_data_descr)
+        input_uc_run_params.coherence_check_ty_and_cy(eraa_data_descr=eraa_data_descr, stop_if_error=True)
+
+
+def init_data_analysis_worker(shared_inputs: DataAnalysisSharedInputs):
+    global DATA_ANALYSIS_SHARED_INPUTS
+    DATA_ANALYSIS_SHARED_INPUTS = shared_inputs
+    # figures only saved to files
+    matplotlib.use('Agg')
+    deactivate_verbose_warnings()
+    init_logger(logger_dir=OUTPUT_DATA_ANALYSIS_FOLDER,
+                logger_name=f'eraa_input_data_analysis_worker-{os.getpid()}.log', log_level=shared_inputs.log_level)
+
+
+def load_data_analysis_input(analysis_input: DataAnalysisInput, countries: List[str]) \
+        -> Dict[str, Optional[Union[pd.DataFrame, PER_AGG_PT_CY_TENSORS]]]:
+    """
+    Read data of an input for given countries, in a worker process
+    :returns {country: df of data}, None values for datatypes without per-country df (e.g. hydro); or
+    {country: {agg. prod. type: tensor}} for an all climatic years input
+    """
+    shared_inputs = DATA_ANALYSIS_SHARED_INPUTS
+    eraa_data_descr = shared_inputs.eraa_data_descr
+    uc_run_params = set_input_uc_run_params(uc_run_params=shared_inputs.uc_run_params, analysis_input=analysis_input,
+                                            countries=countries, eraa_data_descr=eraa_data_descr)
+    logging.info(f'Read needed ERAA ({eraa_data_descr.eraa_edition}) data: {analysis_input}, for {countries}')
+    eraa_dataset = Dataset(source=f'eraa_{eraa_data_descr.eraa_edition}',
+                           agg_prod_types_with_cf_data=eraa_data_descr.agg_prod_types_with_cf_data,
+                           is_stress_test=uc_run_params.is_stress_test)
+    subdt_selec = list(analysis_input.subdt_selec) if analysis_input.subdt_selec is not None else None
+    if analysis_input.with_cy_tensors():
+        eraa_dataset.get_countries_all_cys_data(uc_run_params=uc_run_params,
+                                                aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def,
+                                                datatypes_selec=[analysis_input.data_type], subdt_selec=subdt_selec,
+                                                **analysis_input.get_extra_params_vals())
+        ERAA_DATA_STORE.log_stats()
+        # {agg. prod. type: tensor}, with None key for datatypes without agg. pt dimension
+        if analysis_input.data_type == DATATYPE_NAMES.demand:
+            return {country: {None: eraa_dataset.demand_all_cys[country]} for country in countries}
+        if analysis_input.data_type == DATATYPE_NAMES.net_demand:
+            return {country: {None: eraa_dataset.net_demand_all_cys[country]} for country in countries}
+        per_agg_pt_data = eraa_dataset.agg_cf_data_all_cys if analysis_input.data_type == DATATYPE_NAMES.capa_factor \
+            else eraa_dataset.fatal_prod_all_cys
+        return {country: per_agg_pt_data[country] for country in countries}
+    eraa_dataset.get_countries_data(uc_run_params=uc_run_params,
+                                    aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def,
+                                    datatypes_selec=[analysis_input.data_type], subdt_selec=subdt_selec,
+                                    **analysis_input.get_extra_params_vals())
+    eraa_dataset.complete_data()
+    # ERAA data files shared among inputs read by this worker -> to check store size/hit ratio
+    ERAA_DATA_STORE.log_stats()
+    per_dt_data = {DATATYPE_NAMES.demand: eraa_dataset.demand,
+                   DATATYPE_NAMES.capa_factor: eraa_dataset.agg_cf_data,
+                   DATATYPE_NAMES.net_demand: eraa_dataset.net_demand,
+                   DATATYPE_NAMES.fatal_production: eraa_dataset.fatal_prod}
+    if analysis_input.data_type not in per_dt_data:
+        return {country: None for country in countries}
+    return {country: per_dt_data[analysis_input.data_type][country] for country in countries}
+
+
+def run_data_analysis_task(task: DataAnalysisTask,
+                           per_case_data: Dict[PER_CASE_DATA_KEY_TYPE, Union[pd.DataFrame, PER_AGG_PT_CY_TENSORS]]):
+    """
+    Apply analysis (plot or extract) of a task, in a worker process
+    """
+    shared_inputs = DATA_ANALYSIS_SHARED_INPUTS
+    logging.info(task.data_analysis)
+    task.data_analysis.apply_analysis(per_case_data=per_case_data, fig_style=shared_inputs.fig_style,
+                                      per_dim_plot_params=shared_inputs.per_dim_plot_params,
+                                      extra_params_labels=task.extra_params_labels,
+                                      dt_suffix_for_output=task.dt_suffix_for_output)
+
+
+def run_data_analyses(data_analyses: List[DataAnalysis], shared_inputs: DataAnalysisSharedInputs,
+                      max_workers: int = None):
+    """
+    Run data analyses in a pool of processes: all inputs loaded, then each analysis applied once the inputs it
+    needs are available
+    :param max_workers: number of processes used; if None, number of CPUs
+    """
+    tasks = set_data_analysis_tasks(
+        data_analyses=data_analyses,
+        avail_cy_stress_test=shared_inputs.eraa_data_descr.available_climatic_years_stress_test)
+    per_input_countries = get_per_input_countries(tasks=tasks)
+    check_data_analysis_inputs(per_input_countries=per_input_countries, uc_run_params=shared_inputs.uc_run_params,
+                               eraa_data_descr=shared_inputs.eraa_data_descr)
+    n_inputs = len(per_input_countries)
+    n_tasks = len(tasks)
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    max_workers = max(1, min(max_workers, n_inputs + n_tasks))
+    logging.info(f'Run {n_tasks} data analyses - from {n_inputs} distinct inputs - with {max_workers} processes; '
+                 f'per-worker logs in {OUTPUT_DATA_ANALYSIS_FOLDER}')
+    # number of inputs still to be loaded per task
+    n_missing_inputs = {i_task: len(set(task.per_case_input.values())) for i_task, task in enumerate(tasks)}
+    tasks_per_input = {analysis_input: [] for analysis_input in per_input_countries}
+    for i_task, task in enumerate(tasks):
+        for analysis_input in set(task.per_case_input.values()):
+            tasks_per_input[analysis_input].append(i_task)
+    per_input_data = {}
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_data_analysis_worker,
+                             initargs=(shared_inputs,)) as executor:
+        load_futures = {executor.submit(load_data_analysis_input, analysis_input, countries): analysis_input
+                        for analysis_input, countries in per_input_countries.items()}
+        analysis_futures = {}
+        for future in as_completed(load_futures):
+            analysis_input = load_futures[future]
+            per_input_data[analysis_input] = future.result()
+            for i_task in tasks_per_input[analysis_input]:
+                n_missing_inputs[i_task] -= 1
+                if n_missing_inputs[i_task] > 0:
+                    continue
+                task = tasks[i_task]
+                per_case_data = {case_key: per_input_data[case_input][case_key[0]]
+                                 for case_key, case_input in task.per_case_input.items()}
+                analysis_futures[executor.submit(run_data_analysis_task, task, per_case_data)] = i_task
+        for i_done, future in enumerate(as_completed(analysis_futures)):
+            future.result()
+            i_task = analysis_futures[future]
+            logging.info(f'[{i_done + 1}/{n_tasks}] {tasks[i_task].data_analysis.analysis_type} of '
+                         f'{tasks[i_task].data_analysis.data_type} data done')
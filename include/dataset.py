@@ -15,37 +15,52 @@ from common.constants.eraa_data import ERAAParamNames
 from common.constants.prod_types import ProdTypeNames, set_gen_unit_name
 from common.constants.pypsa_params import GEN_UNITS_PYPSA_PARAMS, GenUnitsCustomParams
 from common.error_msgs import print_errors_list
-from common.long_term_uc_io import COLUMN_NAMES, DT_FILE_PREFIX, DT_SUBFOLDERS, FILES_FORMAT, \
+from common.long_term_uc_io import COLUMN_NAMES, DT_FILE_PREFIX, DT_SUBFOLDERS, \
     GEN_CAPA_SUBDT_COLS, INPUT_CY_STRESS_TEST_SUBFOLDER, INPUT_ERAA_FOLDER, HYDRO_KEY_COLUMNS, \
     HYDRO_VALUE_COLUMNS, HYDRO_TS_GRANULARITY, HYDRO_DATA_RESAMPLE_METHODS, HYDRO_LEVELS_RESAMPLE_FILLNA_VALS
 from common.uc_run_params import UCRunParams
 from include.dataset_builder import GenerationUnitData, select_gen_units_data
+from include.generation_unit_table import GenerationUnitTable
 from utils.basic_utils import get_intersection_of_lists
+from utils.climatic_years_tensor import CY_TENSOR_DTYPE, ClimaticYearsTensor, calc_avg_of_cy_tensors, \
+    get_union_grid, set_cy_tensor, set_cy_tensor_from_values
 from utils.df_utils import create_dict_from_cols_in_df, selec_in_df_based_on_list, set_aggreg_col_based_on_corresp, \
-    create_dict_from_df_row, resample_and_distribute
+    create_dict_from_df_row, resample_and_distribute_per_zone
 from utils.dir_utils import uniformize_path_os
 from utils.eraa_data_reader import filter_input_data, gen_capa_pt_str_sanitizer, select_interco_capas, \
     set_aggreg_cf_prod_types_data, read_and_process_hydro_data
+from utils.eraa_data_store import ERAA_DATA_STORE, ERAADataKey
+from utils.profiling import profile_stage
+from utils.residual_load import calc_fatal_prod_batch, calc_net_demand_batch
 from utils.write import json_dump
 
 N_SPACES_MSG = 2
 PROD_TYPE_AGG_COL = f'{COLUMN_NAMES.production_type}_agg'
+# datatypes that can be read for all climatic years at once, as (climatic year x date) tensors
+DATATYPES_WITH_CY_TENSOR = [DATATYPE_NAMES.demand, DATATYPE_NAMES.capa_factor, DATATYPE_NAMES.net_demand,
+                            DATATYPE_NAMES.fatal_production]
 
 
-def get_demand_data(folder: str, file_suffix: str, climatic_year: int, period: Tuple[datetime, datetime],
-                    is_stress_test: bool = False) -> pd.DataFrame:
+def set_ts_data_folder(folder: str, is_stress_test: bool = False) -> str:
+    # stress test climatic years data in a dedicated subfolder
+    return f'{folder}/{INPUT_CY_STRESS_TEST_SUBFOLDER}' if is_stress_test else folder
+
+
+def get_demand_file(folder: str, file_suffix: str, is_stress_test: bool = False) -> str:
+    demand_folder_full = set_ts_data_folder(folder=folder, is_stress_test=is_stress_test)
+    return f'{demand_folder_full}/{DT_FILE_PREFIX.demand}_{file_suffix}.csv'
+
+
+def get_demand_data(folder: str, file_suffix: str, target_year: int, country: str, climatic_year: int,
+                    period: Tuple[datetime, datetime], is_stress_test: bool = False) -> pd.DataFrame:
     # get demand
     logging.debug('Get demand')
-    if is_stress_test:
-        demand_folder_full = f'{folder}/{INPUT_CY_STRESS_TEST_SUBFOLDER}'
-    else:
-        demand_folder_full = folder
-    demand_file = f'{demand_folder_full}/{DT_FILE_PREFIX.demand}_{file_suffix}.csv'
-    df_demand = pd.read_csv(demand_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
-    # then keep only selected period date range and climatic year
-    df_demand = filter_input_data(df=df_demand, date_col=COLUMN_NAMES.date,
-                                  climatic_year_col=COLUMN_NAMES.climatic_year, period_start=period[0],
-                                  period_end=period[1], climatic_year=climatic_year)
+    demand_file = get_demand_file(folder=folder, file_suffix=file_suffix, is_stress_test=is_stress_test)
+    # keep only selected climatic year and period date range - from (full) file data shared in process-wide store
+    data_key = ERAADataKey(datatype=DATATYPE_NAMES.demand, target_year=target_year, country=country,
+                           is_stress_test=is_stress_test)
+    df_demand = ERAA_DATA_STORE.get_ts_data(key=data_key, csv_file=demand_file, climatic_year=climatic_year,
+                                            period=period)
     return df_demand
 
 
@@ -59,13 +74,16 @@ def get_cf_agg_prod_types_tb_read(selected_agg_prod_types: List[str], agg_prod_t
     return [agg_prod_type for agg_prod_type in agg_prod_types_tb_read if agg_prod_type in agg_prod_types_with_cf_data]
 
 
-def get_res_capa_factors_data(folder: str, file_suffix: str, climatic_year: int, cf_agg_prod_types_tb_read: List[str],
-                              aggreg_pt_cf_def: Dict[str, List[str]], period: Tuple[datetime, datetime],
-                              is_stress_test: bool = False) -> Optional[pd.DataFrame]:
+def get_res_capa_factors_data(folder: str, file_suffix: str, target_year: int, country: str, climatic_year: int,
+                              cf_agg_prod_types_tb_read: List[str], aggreg_pt_cf_def: Dict[str, List[str]],
+                              period: Tuple[datetime, datetime], is_stress_test: bool = False) \
+        -> Optional[pd.DataFrame]:
     """
     Get RES capa. factors (CF) data
     :param folder: in which RES CF data must be read
     :param file_suffix: of files to be read
+    :param target_year: considered
+    :param country: idem
     :param climatic_year: considered
     :param cf_agg_prod_types_tb_read: list of aggreg. prod. types with CF data to be read
     :param aggreg_pt_cf_def: def. of aggreg. prod. types - the ones with CF data: {agg. pt: list of associated pts}
@@ -75,10 +93,7 @@ def get_res_capa_factors_data(folder: str, file_suffix: str, climatic_year: int,
     logging.debug('Get RES capacity factors')
     date_col = COLUMN_NAMES.date
     # full path to folder in which RES CF data can be read
-    if is_stress_test:
-        res_cf_folder_full = f'{folder}/{INPUT_CY_STRESS_TEST_SUBFOLDER}'
-    else:
-        res_cf_folder_full = folder
+    res_cf_folder_full = set_ts_data_folder(folder=folder, is_stress_test=is_stress_test)
     # loop over the agg. production types to be read, the ones with CF data
     df_res_cf_list = []
     for agg_prod_type in cf_agg_prod_types_tb_read:
@@ -93,13 +108,10 @@ def get_res_capa_factors_data(folder: str, file_suffix: str, climatic_year: int,
                                              f'{prod_type} not accounted for here')
             else:
                 logging.debug(2 * N_SPACES_MSG * ' ' + f'* Prod. type: {prod_type}')
-                current_df_res_cf = pd.read_csv(cf_data_file, sep=FILES_FORMAT.column_sep,
-                                                decimal=FILES_FORMAT.decimal_sep)
-                current_df_res_cf = \
-                    filter_input_data(df=current_df_res_cf, date_col=date_col,
-                                      climatic_year_col=COLUMN_NAMES.climatic_year,
-                                      period_start=period[0], period_end=period[1],
-                                      climatic_year=climatic_year)
+                data_key = ERAADataKey(datatype=DATATYPE_NAMES.capa_factor, target_year=target_year,
+                                       country=country, is_stress_test=is_stress_test, prod_type=prod_type)
+                current_df_res_cf = ERAA_DATA_STORE.get_ts_data(key=data_key, csv_file=cf_data_file,
+                                                                climatic_year=climatic_year, period=period)
                 if len(current_df_res_cf) == 0:
                     logging.warning(
                         2 * N_SPACES_MSG * ' ' + f'No RES capa. factor data for prod. type '
@@ -123,7 +135,58 @@ def get_res_capa_factors_data(folder: str, file_suffix: str, climatic_year: int,
     return agg_cf_data_read
 
 
-def get_installed_gen_capas_data(folder: str, file_suffix: str, country: str, aggreg_pt_gen_capa_def,
+def get_all_cys_demand_data(folder: str, file_suffix: str, target_year: int, country: str,
+                            period: Tuple[datetime, datetime], is_stress_test: bool = False,
+                            dtype=CY_TENSOR_DTYPE) -> ClimaticYearsTensor:
+    """
+    Get demand of all climatic years in file, as a (climatic year x date) tensor - from a single read of the file
+    """
+    logging.debug('Get demand for all climatic years')
+    demand_file = get_demand_file(folder=folder, file_suffix=file_suffix, is_stress_test=is_stress_test)
+    data_key = ERAADataKey(datatype=DATATYPE_NAMES.demand, target_year=target_year, country=country,
+                           is_stress_test=is_stress_test)
+    return ERAA_DATA_STORE.get_all_cys_ts_data(key=data_key, csv_file=demand_file, period=period, dtype=dtype)
+
+
+def get_all_cys_res_capa_factors_data(folder: str, file_suffix: str, target_year: int, country: str,
+                                      cf_agg_prod_types_tb_read: List[str], aggreg_pt_cf_def: Dict[str, List[str]],
+                                      period: Tuple[datetime, datetime], is_stress_test: bool = False,
+                                      dtype=CY_TENSOR_DTYPE) -> Dict[str, ClimaticYearsTensor]:
+    """
+    Get RES capa. factors (CF) data of all climatic years in files, same as get_res_capa_factors_data but with
+    - per aggreg. prod. type - a (climatic year x date) tensor
+    :returns {aggreg. prod. type: tensor of CF averaged over its prod. types}, only for agg. pts with data
+    """
+    logging.debug('Get RES capacity factors for all climatic years')
+    res_cf_folder_full = set_ts_data_folder(folder=folder, is_stress_test=is_stress_test)
+    agg_cf_data_read = {}
+    for agg_prod_type in cf_agg_prod_types_tb_read:
+        logging.debug(N_SPACES_MSG * ' ' + f'- For aggreg. prod. type: {agg_prod_type}')
+        current_agg_pt_cf_tensors = []
+        for prod_type in aggreg_pt_cf_def[agg_prod_type]:
+            cf_filename = f'{DT_FILE_PREFIX.res_capa_factors}_{prod_type}_{file_suffix}.csv'
+            cf_data_file = uniformize_path_os(path_str=f'{res_cf_folder_full}/{cf_filename}')
+            if not os.path.exists(cf_data_file):
+                logging.warning(
+                    2 * N_SPACES_MSG * ' ' + f'RES capa. factor data file does not exist: '
+                                             f'{prod_type} not accounted for here')
+                continue
+            data_key = ERAADataKey(datatype=DATATYPE_NAMES.capa_factor, target_year=target_year,
+                                   country=country, is_stress_test=is_stress_test, prod_type=prod_type)
+            current_cf_tensor = ERAA_DATA_STORE.get_all_cys_ts_data(key=data_key, csv_file=cf_data_file,
+                                                                    period=period, dtype=dtype)
+            if len(current_cf_tensor.climatic_years) == 0:
+                logging.warning(2 * N_SPACES_MSG * ' ' + f'No RES capa. factor data for prod. type {prod_type}')
+            else:
+                current_agg_pt_cf_tensors.append(current_cf_tensor)
+        if len(current_agg_pt_cf_tensors) == 0:
+            logging.warning(N_SPACES_MSG * ' ' + f'No data available for aggregate RES prod. type {agg_prod_type}')
+        else:
+            agg_cf_data_read[agg_prod_type] = calc_avg_of_cy_tensors(cy_tensors=current_agg_pt_cf_tensors)
+    return agg_cf_data_read
+
+
+def get_installed_gen_capas_data(folder: str, file_suffix: str, target_year: int, country: str, aggreg_pt_gen_capa_def,
                                  selected_agg_prod_types: List[str]) -> Optional[pd.DataFrame]:
     # TODO: type
     # get installed generation capacity data
@@ -135,7 +198,8 @@ def get_installed_gen_capas_data(folder: str, file_suffix: str, country: str, ag
         logging.warning(f'Generation capas data file does not exist: {country} not accounted for here')
         return None
 
-    df_gen_capa = pd.read_csv(gen_capa_data_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+    data_key = ERAADataKey(datatype=DATATYPE_NAMES.installed_capa, target_year=target_year, country=country)
+    df_gen_capa = ERAA_DATA_STORE.get_data(key=data_key, csv_file=gen_capa_data_file)
     # Keep sanitize prod. types col values
     df_gen_capa[prod_type_col] = df_gen_capa[prod_type_col].apply(gen_capa_pt_str_sanitizer)
     # Keep only selected aggreg. prod. types
@@ -178,7 +242,11 @@ def get_hydro_data(hydro_dt: str, folder: str, countries: List[str], climatic_ye
     Returns: {country: associated df with date and climatic year - with unique value - as 'key' columns}
     """
     logging.debug(f'Get {hydro_dt} data (1 file over all countries and years)')
-    df_hydro_data = read_and_process_hydro_data(hydro_dt=hydro_dt, folder=folder)
+    # read and processed once per process, then shared in ERAA data store
+    df_hydro_data = ERAA_DATA_STORE.get_processed_data(
+        key=ERAADataKey(datatype=hydro_dt),
+        loader=lambda: read_and_process_hydro_data(hydro_dt=hydro_dt, folder=folder)
+    )
     date_col = COLUMN_NAMES.date
     period_start = period[0]
     period_end = period[1]
@@ -193,28 +261,52 @@ def get_hydro_data(hydro_dt: str, folder: str, countries: List[str], climatic_ye
     end_date_resample = period_end - timedelta(hours=1)
     value_cols = HYDRO_VALUE_COLUMNS[hydro_dt]
     key_cols = set_final_hydro_key_cols(hydro_dt=hydro_dt)
-    per_country_hydro_data = {}
-    for country in countries:
-        # either day to hours or week to hours
-        resample_divisor = 24 if HYDRO_TS_GRANULARITY[hydro_dt] == 'day' else 7 * 24
-        fill_na_vals = HYDRO_LEVELS_RESAMPLE_FILLNA_VALS  # only used for extreme-levels of reservoir -> no limit
-        current_country_df = (
-            selec_in_df_based_on_list(df=df_hydro_data, selec_col=COLUMN_NAMES.zone, selec_vals=[country],
-                                      rm_selec_col=True))
-        if len(current_country_df) > 0:
-            resample_method = HYDRO_DATA_RESAMPLE_METHODS[hydro_dt]
-            per_country_hydro_data[country] = (
-                resample_and_distribute(df=current_country_df, date_col=date_col, value_cols=value_cols,
-                                        key_cols=key_cols, method=resample_method, start_date=start_date_resample,
-                                        end_date=end_date_resample, resample_divisor=resample_divisor,
-                                        fill_na_vals=fill_na_vals, freq='h')
-            )
-        else:  # no data for current country
+    # either day to hours or week to hours
+    resample_divisor = 24 if HYDRO_TS_GRANULARITY[hydro_dt] == 'day' else 7 * 24
+    fill_na_vals = HYDRO_LEVELS_RESAMPLE_FILLNA_VALS  # only used for extreme-levels of reservoir -> no limit
+    # all countries resampled at once, (country x day/week) -> (country x hour) arrays
+    per_country_hydro_data = (
+        resample_and_distribute_per_zone(df=df_hydro_data, zone_col=COLUMN_NAMES.zone, zones=countries,
+                                         date_col=date_col, value_cols=value_cols, key_cols=key_cols,
+                                         method=HYDRO_DATA_RESAMPLE_METHODS[hydro_dt],
+                                         start_date=start_date_resample, end_date=end_date_resample,
+                                         resample_divisor=resample_divisor, fill_na_vals=fill_na_vals, freq='h')
+    )
+    for country, country_df in per_country_hydro_data.items():
+        if len(country_df) == 0:  # no data for current country
             logging.warning(f'No {hydro_dt} data obtained for country {country}')
-            per_country_hydro_data[country] = pd.DataFrame()
     return per_country_hydro_data
 
 
+def get_all_cys_hydro_ror_data(folder: str, countries: List[str], climatic_years: List[int],
+                               period: Tuple[datetime, datetime], dtype=CY_TENSOR_DTYPE) \
+        -> Dict[str, ClimaticYearsTensor]:
+    """
+    Get hydro Run-of-River prod. of given climatic years, as (climatic year x date) tensors - hydro data file being
+    read and processed once, then resampled to hourly values for each climatic year
+    :returns {country: tensor}, only for countries with data
+    """
+    hydro_dt = DATATYPE_NAMES.hydro_ror
+    df_hydro_data = ERAA_DATA_STORE.get_processed_data(
+        key=ERAADataKey(datatype=hydro_dt),
+        loader=lambda: read_and_process_hydro_data(hydro_dt=hydro_dt, folder=folder)
+    )
+    climatic_years_in_data = set(df_hydro_data[COLUMN_NAMES.climatic_year])
+    per_country_dfs = {country: [] for country in countries}
+    for climatic_year in climatic_years:
+        if climatic_year not in climatic_years_in_data:
+            logging.warning(f'No {hydro_dt} data for climatic year {climatic_year}')
+            continue
+        per_country_hydro_data = get_hydro_data(hydro_dt=hydro_dt, folder=folder, countries=countries,
+                                                climatic_year=climatic_year, period=period)
+        for country, country_df in per_country_hydro_data.items():
+            if len(country_df) > 0:
+                per_country_dfs[country].append(country_df)
+    return {country: set_cy_tensor(df=pd.concat(country_dfs, ignore_index=True), cy_row_index=None, period=period,
+                                   dtype=dtype)
+            for country, country_dfs in per_country_dfs.items() if len(country_dfs) > 0}
+
+
 def separate_hydro_extr_levels_data(hydro_extr_levels_data: Dict[str, pd.DataFrame],
                                     rename_value_col: bool = True) \
         -> Tuple[Dict[str, pd.DataFrame], Dict[str, pd.DataFrame]]:
@@ -279,25 +371,69 @@ def capa_info_log(df_gen_capa: pd.DataFrame):
     logging.info(f'-> power capacity values, in MW: {power_capa_dict}')
 
 
-def calc_cf_capa_prod(df_gen_capa: pd.DataFrame, df_agg_cf: pd.DataFrame, cf_agg_prod_types_tb_read: List[str],
-                      capas_aggreg_pt_with_cf: Dict[str, int]) -> (Dict[str, pd.DataFrame], List[str], List[str]):
-    value_col = COLUMN_NAMES.value
-    pts_with_capa_from_arg = []  # prod types with capacity value taken from arg. (not ERAA data)
-    pts_wo_cf_data = []  # prod types without CF data obtained...
-    cf_capa_prod = {}
-    for agg_prod_type in cf_agg_prod_types_tb_read:
+def get_capas_vector(df_gen_capa: Optional[pd.DataFrame], agg_prod_types: List[str],
+                     capas_aggreg_pt_with_cf: Dict[str, int]) -> (np.ndarray, List[str]):
+    """
+    Get power capacities of aggreg. prod. types, as a vector ordered as given list
+    :param df_gen_capa: df with installed generation capas data
+    :param agg_prod_types: list of aggreg. prod. types for which capacity is needed
+    :param capas_aggreg_pt_with_cf: {pt name: capa value to be used}, overwriting ERAA data
+    :returns capacities vector, and list of prod types with capacity value taken from arg. (not ERAA data)
+    """
+    pts_with_capa_from_arg = []
+    power_capas = {} if df_gen_capa is None else (
+        create_dict_from_cols_in_df(df=df_gen_capa, key_col=PROD_TYPE_AGG_COL, val_col='power_capacity'))
+    capas = np.zeros(len(agg_prod_types))
+    for i_pt, agg_prod_type in enumerate(agg_prod_types):
         # get current capa either from fixed data provided as arg of this function
         if agg_prod_type in capas_aggreg_pt_with_cf:
-            current_capa = capas_aggreg_pt_with_cf[agg_prod_type]
+            capas[i_pt] = capas_aggreg_pt_with_cf[agg_prod_type]
             pts_with_capa_from_arg.append(agg_prod_type)
-        else:  # or from (ERAA) dataset data
-            current_capa = df_gen_capa.loc[df_gen_capa[PROD_TYPE_AGG_COL] == agg_prod_type, 'power_capacity'].values[0]
-        current_cf_data = df_agg_cf[df_agg_cf[PROD_TYPE_AGG_COL] == agg_prod_type]
-        if len(current_cf_data) > 0:
-            cf_capa_prod[agg_prod_type] = current_capa * np.array(current_cf_data[value_col])
+        elif agg_prod_type in power_capas:  # or from (ERAA) dataset data
+            capas[i_pt] = power_capas[agg_prod_type]
         else:
-            pts_wo_cf_data.append(agg_prod_type)
-    return cf_capa_prod, pts_with_capa_from_arg, pts_wo_cf_data
+            logging.warning(f'No capacity for aggreg. prod. type {agg_prod_type} -> set to 0')
+    return capas, pts_with_capa_from_arg
+
+
+def set_cf_matrix(df_agg_cf: Optional[pd.DataFrame], cf_agg_prod_types_tb_read: List[str],
+                  dates: pd.DatetimeIndex = None) -> (np.ndarray, List[str], List[str], pd.DatetimeIndex):
+    """
+    From df of CF data (aggreg. prod. type, date, value) to (prod. type x date) matrix
+    :param df_agg_cf: CF data, None if no prod. type with CF data for the country
+    :param cf_agg_prod_types_tb_read: prod. types with CF data to be used
+    :param dates: used as (empty matrix) columns if no CF data - e.g. the demand ones for net demand calculation
+    :returns matrix, list of prod types with CF data (i.e. its rows), list of the ones without CF data and dates
+    (i.e. its columns)
+    """
+    # no CF data -> empty (0 x nber of dates) matrix, all prod. types being without CF data
+    if df_agg_cf is None or len(df_agg_cf) == 0:
+        if dates is None:
+            dates = pd.DatetimeIndex([])
+        return np.zeros((0, len(dates))), [], list(cf_agg_prod_types_tb_read), dates
+    df_cf_matrix = df_agg_cf.pivot(index=PROD_TYPE_AGG_COL, columns=COLUMN_NAMES.date, values=COLUMN_NAMES.value)
+    pts_with_cf_data = [elt for elt in cf_agg_prod_types_tb_read if elt in df_cf_matrix.index]
+    pts_wo_cf_data = [elt for elt in cf_agg_prod_types_tb_read if elt not in df_cf_matrix.index]
+    return df_cf_matrix.loc[pts_with_cf_data].to_numpy(), pts_with_cf_data, pts_wo_cf_data, df_cf_matrix.columns
+
+
+def calc_cf_capa_prod(df_gen_capa: pd.DataFrame, df_agg_cf: pd.DataFrame, cf_agg_prod_types_tb_read: List[str],
+                      capas_aggreg_pt_with_cf: Dict[str, int]) -> (pd.DataFrame, List[str], List[str]):
+    """
+    Calculate fatal production - capacity x CF - of aggreg. prod. types with CF data
+    :returns df with "production_type_agg", "date", "value" columns, list of prod types with capacity value taken
+    from arg. (not ERAA data) and list of the ones without CF data obtained
+    """
+    cf_matrix, pts_with_cf_data, pts_wo_cf_data, dates = (
+        set_cf_matrix(df_agg_cf=df_agg_cf, cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read))
+    capas, pts_with_capa_from_arg = get_capas_vector(df_gen_capa=df_gen_capa, agg_prod_types=pts_with_cf_data,
+                                                     capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
+    # (prod type x date) with a unique climatic year
+    cf_capa_prod = calc_fatal_prod_batch(cf_values=cf_matrix[:, np.newaxis, :], capas=capas)[:, 0, :]
+    df_cf_capa_prod = pd.DataFrame({PROD_TYPE_AGG_COL: np.repeat(pts_with_cf_data, len(dates)),
+                                    COLUMN_NAMES.date: np.tile(dates, len(pts_with_cf_data)),
+                                    COLUMN_NAMES.value: cf_capa_prod.ravel()})
+    return df_cf_capa_prod, pts_with_capa_from_arg, pts_wo_cf_data
 
 
 def calc_net_demand(df_demand: pd.DataFrame, df_gen_capa: pd.DataFrame, df_agg_cf: pd.DataFrame,
@@ -317,25 +453,83 @@ def calc_net_demand(df_demand: pd.DataFrame, df_gen_capa: pd.DataFrame, df_agg_c
     provided in Python arg, and not from ERAA data (in data folder of this project)
     """
     value_col = COLUMN_NAMES.value
-    # TODO: directly in pd to avoid creation of np arrays?
-    # convert to float so that subtraction of CF can be done hereafter
-    current_np_net_demand = np.array(df_demand[value_col]).astype(np.float64)
-    cf_capa_prod, pts_with_capa_from_arg, pts_wo_cf_data = (
-        calc_cf_capa_prod(df_gen_capa=df_gen_capa, df_agg_cf=df_agg_cf,
-                          cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
-                          capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
-    )
-    current_np_net_demand -= sum(cf_capa_prod.values())
+    cf_matrix, pts_with_cf_data, pts_wo_cf_data, _ = (
+        set_cf_matrix(df_agg_cf=df_agg_cf, cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
+                      dates=pd.DatetimeIndex(df_demand[COLUMN_NAMES.date])))
+    capas, pts_with_capa_from_arg = get_capas_vector(df_gen_capa=df_gen_capa, agg_prod_types=pts_with_cf_data,
+                                                     capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
+    ror_prod = None
     if df_hydro_ror_prod is not None and len(df_hydro_ror_prod) > 0:
-        current_np_net_demand -= np.array(df_hydro_ror_prod[value_col])
+        ror_prod = np.array(df_hydro_ror_prod[value_col])[np.newaxis, :]
+    # with a unique climatic year
+    # convert to float so that subtraction of CF can be done hereafter
+    net_demand = calc_net_demand_batch(demand=np.array(df_demand[value_col]).astype(np.float64)[np.newaxis, :],
+                                       cf_values=cf_matrix[:, np.newaxis, :], capas=capas, ror_prod=ror_prod)
     df_net_demand = deepcopy(df_demand)
-    df_net_demand[value_col] = current_np_net_demand
+    df_net_demand[value_col] = net_demand[0]
     # warning if prod. types without CF data obtained -> not taken into account here...
     if len(pts_wo_cf_data) > 0:
         logging.warning(f'No capa. factor data available to account for {pts_wo_cf_data} in net demand calculation')
     return df_net_demand, pts_with_capa_from_arg
 
 
+def calc_residual_load_all_cys(countries: List[str], agg_prod_types: List[str],
+                               agg_cf_data: Dict[str, Dict[str, ClimaticYearsTensor]], capas: Dict[str, np.ndarray],
+                               demand: Dict[str, ClimaticYearsTensor] = None,
+                               hydro_ror_prod: Dict[str, ClimaticYearsTensor] = None, dtype=CY_TENSOR_DTYPE) \
+        -> (Dict[str, Dict[str, ClimaticYearsTensor]], Optional[Dict[str, ClimaticYearsTensor]]):
+    """
+    Calculate fatal production and net demand for all countries and climatic years at once, with the batched engine
+    on (country x prod. type x climatic year x date) CF array and (country x prod. type) capacities
+    :param countries: considered
+    :param agg_prod_types: aggreg. prod. types with CF data, union over countries (CF set to 0 for a country without
+    data for one of them)
+    :param agg_cf_data: {country: {aggreg. prod. type: tensor of CF}}
+    :param capas: {country: vector of capacities of agg_prod_types}
+    :param demand: {country: tensor of demand}; None if net demand is not to be calculated
+    :param hydro_ror_prod: {country: tensor of hydro Run-of-River prod.}; None if not accounted for in net demand
+    :param dtype: of output tensors
+    :returns {country: {aggreg. prod. type: tensor of fatal prod.}}, {country: tensor of net demand} (None if no
+    demand provided)
+    """
+    # common (climatic year x date) grid: the one of demand data if net demand calculated, of CF data otherwise
+    grid_tensors = list(demand.values()) if demand is not None \
+        else [cf_tensor for country in countries for cf_tensor in agg_cf_data[country].values()]
+    climatic_years, dates = get_union_grid(cy_tensors=grid_tensors)
+    cf_values = np.zeros((len(countries), len(agg_prod_types), len(climatic_years), len(dates)), dtype=dtype)
+    for i_country, country in enumerate(countries):
+        for i_pt, agg_prod_type in enumerate(agg_prod_types):
+            if agg_prod_type in agg_cf_data[country]:
+                cf_values[i_country, i_pt] = (
+                    agg_cf_data[country][agg_prod_type].reindex(climatic_years=climatic_years, dates=dates))
+    capas_matrix = np.vstack([capas[country] for country in countries])
+    fatal_prod_values = calc_fatal_prod_batch(cf_values=cf_values, capas=capas_matrix)
+    fatal_prod = {country: {agg_prod_type: set_cy_tensor_from_values(values=fatal_prod_values[i_country, i_pt],
+                                                                     climatic_years=climatic_years, dates=dates,
+                                                                     dtype=dtype)
+                            for i_pt, agg_prod_type in enumerate(agg_prod_types)
+                            if agg_prod_type in agg_cf_data[country]}
+                  for i_country, country in enumerate(countries)}
+    if demand is None:
+        return fatal_prod, None
+
+    demand_values = np.stack([demand[country].reindex(climatic_years=climatic_years, dates=dates)
+                              for country in countries])
+    ror_prod_values = None
+    if hydro_ror_prod is not None:  # no prod. where no data
+        ror_prod_values = np.zeros(demand_values.shape, dtype=dtype)
+        for i_country, country in enumerate(countries):
+            if country in hydro_ror_prod:
+                ror_prod_values[i_country] = hydro_ror_prod[country].reindex(climatic_years=climatic_years,
+                                                                             dates=dates, fill_value=0)
+    net_demand_values = calc_net_demand_batch(demand=demand_values, cf_values=cf_values, capas=capas_matrix,
+                                              ror_prod=ror_prod_values)
+    net_demand = {country: set_cy_tensor_from_values(values=net_demand_values[i_country],
+                                                     climatic_years=climatic_years, dates=dates, dtype=dtype)
+                  for i_country, country in enumerate(countries)}
+    return fatal_prod, net_demand
+
+
 def capa_from_arg_for_info_log(data_type: str, prod_types_with_capa_from_arg: List[str],
                                capas_aggreg_pt_with_cf: Dict[str, int]):
     if len(prod_types_with_capa_from_arg) > 0:
@@ -356,9 +550,9 @@ def get_interco_capas_data(folder: str, countries: List[str], year: int) -> Opti
         else:
             logging.warning(msg_prefix)
         return None
-    # read
-    df_interco_capas = pd.read_csv(interco_capas_data_file, sep=FILES_FORMAT.column_sep,
-                                   decimal=FILES_FORMAT.decimal_sep)
+    # read - once per process, then shared in ERAA data store
+    data_key = ERAADataKey(datatype=DATATYPE_NAMES.interco_capa, target_year=year)
+    df_interco_capas = ERAA_DATA_STORE.get_data(key=data_key, csv_file=interco_capas_data_file)
     # and select information needed for selected countries
     df_interco_capas = select_interco_capas(df_intercos_capa=df_interco_capas, countries=countries)
     # set as dictionary
@@ -430,15 +624,22 @@ class Dataset:
     net_demand: Dict[str, pd.DataFrame] = None  # idem
     fatal_prod: Dict[str, pd.DataFrame] = None  # idem
     agg_cf_data: Dict[str, pd.DataFrame] = None  # idem
+    # {country: (climatic year x date) tensor of demand}, when all climatic years read at once
+    demand_all_cys: Dict[str, ClimaticYearsTensor] = None
+    agg_cf_data_all_cys: Dict[str, Dict[str, ClimaticYearsTensor]] = None  # idem, per aggreg. prod. type
+    net_demand_all_cys: Dict[str, ClimaticYearsTensor] = None  # idem
+    fatal_prod_all_cys: Dict[str, Dict[str, ClimaticYearsTensor]] = None  # idem, per aggreg. prod. type
     agg_gen_capa_data: Dict[str, pd.DataFrame] = None  # idem
     interco_capas: Dict[Tuple[str, str], float] = None  # {(origin country, dest. country): interco. capa. value}
     hydro_ror_data: Dict[str, pd.DataFrame] = None  # Run-of-River prod data # TODO: typing
     hydro_inflows_data: Dict[str, pd.DataFrame] = None  # TODO: typing
     hydro_reservoir_levels_min_data: Dict[str, pd.DataFrame] = None  # TODO: typing
     hydro_reservoir_levels_max_data: Dict[str, pd.DataFrame] = None  # TODO: typing
-    # {country: list of associated generation units data}
+    # {country: list of associated generation units data} - views on the following columnar table
     generation_units_data: Dict[str, List[GenerationUnitData]] = None
+    generation_units_table: GenerationUnitTable = None
 
+    @profile_stage(name='countries data')
     def get_countries_data(self, uc_run_params: UCRunParams, aggreg_prod_types_def: Dict[str, Dict[str, List[str]]],
                            datatypes_selec: List[str] = None, subdt_selec: List[str] = None,
                            capas_aggreg_pt_with_cf: Dict[str, int] = None):
@@ -496,27 +697,30 @@ class Dataset:
         # TODO: merge/loop (how to for assignment depending on hydro datatype?)
         if DATATYPE_NAMES.hydro_ror in dts_tb_read:
             if subdt_selec is None or DATATYPE_NAMES.hydro_ror in subdt_selec:
-                self.hydro_ror_data \
-                    = get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_ror, folder=hydro_folder,
-                                     countries=uc_run_params.selected_countries,
-                                     climatic_year=uc_run_params.selected_climatic_year,
-                                     period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end)
-                                     )
+                with profile_stage(name=DATATYPE_NAMES.hydro_ror):
+                    self.hydro_ror_data \
+                        = get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_ror, folder=hydro_folder,
+                                         countries=uc_run_params.selected_countries,
+                                         climatic_year=uc_run_params.selected_climatic_year,
+                                         period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end)
+                                         )
         if DATATYPE_NAMES.hydro_inflows in dts_tb_read:
-            self.hydro_inflows_data = (
-                get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_inflows, folder=hydro_folder,
-                               countries=uc_run_params.selected_countries,
-                               climatic_year=uc_run_params.selected_climatic_year,
-                               period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end))
-            )
+            with profile_stage(name=DATATYPE_NAMES.hydro_inflows):
+                self.hydro_inflows_data = (
+                    get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_inflows, folder=hydro_folder,
+                                   countries=uc_run_params.selected_countries,
+                                   climatic_year=uc_run_params.selected_climatic_year,
+                                   period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end))
+                )
         # both extr levels data in same file -> get data once
         if DATATYPE_NAMES.hydro_levels_min in dts_tb_read or DATATYPE_NAMES.hydro_levels_max in dts_tb_read:
-            hydro_extr_levels_data = (
-                get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_levels_min, folder=hydro_folder,
-                               countries=uc_run_params.selected_countries,
-                               climatic_year=uc_run_params.selected_climatic_year,
-                               period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end))
-            )
+            with profile_stage(name=DATATYPE_NAMES.hydro_levels_min):
+                hydro_extr_levels_data = (
+                    get_hydro_data(hydro_dt=DATATYPE_NAMES.hydro_levels_min, folder=hydro_folder,
+                                   countries=uc_run_params.selected_countries,
+                                   climatic_year=uc_run_params.selected_climatic_year,
+                                   period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end))
+                )
             # from {country: df containing both min and max levels data} to two separate dictionaries
             self.hydro_reservoir_levels_min_data, self.hydro_reservoir_levels_max_data = (
                 separate_hydro_extr_levels_data(hydro_extr_levels_data=hydro_extr_levels_data)
@@ -529,10 +733,14 @@ class Dataset:
             current_suffix = f'{uc_run_params.selected_target_year}_{country}'  # common suffix to all ERAA data files
             if DATATYPE_NAMES.demand in dts_tb_read:
                 # get demand
-                current_df_demand = get_demand_data(folder=demand_folder, file_suffix=current_suffix,
-                                                    climatic_year=uc_run_params.selected_climatic_year,
-                                                    period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end),
-                                                    is_stress_test=self.is_stress_test)
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.demand}'):
+                    current_df_demand = (
+                        get_demand_data(folder=demand_folder, file_suffix=current_suffix,
+                                        target_year=uc_run_params.selected_target_year, country=country,
+                                        climatic_year=uc_run_params.selected_climatic_year,
+                                        period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end),
+                                        is_stress_test=self.is_stress_test)
+                    )
                 # if demand selected add it to dataset
                 if DATATYPE_NAMES.demand in datatypes_selec:
                     self.demand[country] = current_df_demand
@@ -549,14 +757,16 @@ class Dataset:
                                                   subdt_selec=subdt_selec)
                 )
                 # get RES CF data for these prod. types
-                agg_cf_data_read = (
-                    get_res_capa_factors_data(folder=res_cf_folder, file_suffix=current_suffix,
-                                              climatic_year=uc_run_params.selected_climatic_year,
-                                              cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
-                                              aggreg_pt_cf_def=aggreg_prod_types_def[DATATYPE_NAMES.capa_factor],
-                                              period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end),
-                                              is_stress_test=self.is_stress_test)
-                )
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.capa_factor}'):
+                    agg_cf_data_read = (
+                        get_res_capa_factors_data(folder=res_cf_folder, file_suffix=current_suffix,
+                                                  target_year=uc_run_params.selected_target_year, country=country,
+                                                  climatic_year=uc_run_params.selected_climatic_year,
+                                                  cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
+                                                  aggreg_pt_cf_def=aggreg_prod_types_def[DATATYPE_NAMES.capa_factor],
+                                                  period=(uc_run_params.uc_period_start, uc_run_params.uc_period_end),
+                                                  is_stress_test=self.is_stress_test)
+                    )
 
                 if len(cf_agg_prod_types_tb_read) > 0 and agg_cf_data_read is None:
                     logging.warning(
@@ -572,13 +782,13 @@ class Dataset:
                                     f'accounted for: {capas_aggreg_pt_with_cf} -> replaced by values provided in arg, '
                                     f'for net demand calculation only')
                 # get ERAA capas for gen. assets
-                current_df_gen_capa = (
-                    get_installed_gen_capas_data(folder=gen_capas_folder, file_suffix=current_suffix,
-                                                 country=country,
-                                                 aggreg_pt_gen_capa_def=
-                                                 aggreg_prod_types_def[DATATYPE_NAMES.installed_capa],
-                                                 selected_agg_prod_types=uc_run_params.selected_prod_types[country])
-                )
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.installed_capa}'):
+                    current_df_gen_capa = get_installed_gen_capas_data(
+                        folder=gen_capas_folder, file_suffix=current_suffix,
+                        target_year=uc_run_params.selected_target_year, country=country,
+                        aggreg_pt_gen_capa_def=aggreg_prod_types_def[DATATYPE_NAMES.installed_capa],
+                        selected_agg_prod_types=uc_run_params.selected_prod_types[country]
+                    )
                 # add failure fictive one
                 if ProdTypeNames.failure in uc_run_params.selected_prod_types[country]:
                     current_df_gen_capa = (
@@ -596,24 +806,11 @@ class Dataset:
 
             if DATATYPE_NAMES.fatal_production in datatypes_selec:
                 # TODO: include hydro ror here ?
-                cf_capa_prod, pts_with_capa_from_arg, pts_wo_cf_data = (
+                # df "production_type_agg", "date", "value" to unify format
+                self.fatal_prod[country], pts_with_capa_from_arg, pts_wo_cf_data = (
                     calc_cf_capa_prod(df_gen_capa=current_df_gen_capa, df_agg_cf=agg_cf_data_read,
                                       cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
                                       capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf))
-                # from dict {pt name: np prod profile} to df "production_type_agg", "date", "value" to unify format
-                # get dates from CF data - on which data selection has been applied
-                first_agg_pt = list(cf_capa_prod)[0]
-                # selecting only the dates for a given agg. pt (other each date will be repeated...
-                # nber of agg. pt times)
-                current_dates = (
-                    list(agg_cf_data_read.loc[agg_cf_data_read['production_type_agg'] == first_agg_pt, COLUMN_NAMES.date]))
-                n_dates = len(current_dates)
-                dfs_lst = []
-                for agg_pt, prod_prof in cf_capa_prod.items():
-                    dfs_lst.append(pd.DataFrame({'production_type_agg': n_dates * [agg_pt],
-                                                 COLUMN_NAMES.date: current_dates, COLUMN_NAMES.value: prod_prof}))
-                # with other data
-                self.fatal_prod[country] = pd.concat(dfs_lst)
                 capa_from_arg_for_info_log(data_type=DATATYPE_NAMES.fatal_production,
                                            prod_types_with_capa_from_arg=pts_with_capa_from_arg,
                                            capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
@@ -635,15 +832,124 @@ class Dataset:
                                            capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
 
         if DATATYPE_NAMES.interco_capa in datatypes_selec:
-            interco_capas = (
-                get_interco_capas_data(folder=interco_capas_folder, countries=uc_run_params.selected_countries,
-                                       year=uc_run_params.selected_target_year)
-            )
+            with profile_stage(name=DATATYPE_NAMES.interco_capa):
+                interco_capas = (
+                    get_interco_capas_data(folder=interco_capas_folder, countries=uc_run_params.selected_countries,
+                                           year=uc_run_params.selected_target_year)
+                )
             # add interco capas values set by user
             if interco_capas is not None:
                 interco_capas |= uc_run_params.interco_capas_tb_overwritten
             self.interco_capas = interco_capas
 
+    @profile_stage(name='countries all climatic years data')
+    def get_countries_all_cys_data(self, uc_run_params: UCRunParams,
+                                   aggreg_prod_types_def: Dict[str, Dict[str, List[str]]],
+                                   datatypes_selec: List[str], subdt_selec: List[str] = None,
+                                   capas_aggreg_pt_with_cf: Dict[str, int] = None, dtype=CY_TENSOR_DTYPE):
+        """
+        Get ERAA data of all climatic years for the selected countries, as (climatic year x date) tensors - each
+        file being read once, instead of once per climatic year with get_countries_data
+        :param uc_run_params: UC run parameters, from which main reading infos will be obtained (its climatic year
+        not used)
+        :param aggreg_prod_types_def: per-datatype definition of aggreg. to indiv. production types
+        :param datatypes_selec: list of datatypes for which data must be read, among DATATYPES_WITH_CY_TENSOR
+        :param subdt_selec: list of sub-datatypes for which data must be read
+        :param capas_aggreg_pt_with_cf: capacities of prod types with CF data to be used for prod. values calculation
+        :param dtype: of tensor values
+        """
+        dts_wo_cy_tensor = [dt for dt in datatypes_selec if dt not in DATATYPES_WITH_CY_TENSOR]
+        if len(dts_wo_cy_tensor) > 0:
+            raise Exception(f'All climatic years data cannot be obtained for datatypes {dts_wo_cy_tensor}; only '
+                            f'for {DATATYPES_WITH_CY_TENSOR} -> STOP')
+        if capas_aggreg_pt_with_cf is None:
+            capas_aggreg_pt_with_cf = {}
+        with_net_demand = DATATYPE_NAMES.net_demand in datatypes_selec
+        with_residual_load = with_net_demand or DATATYPE_NAMES.fatal_production in datatypes_selec
+        demand_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.demand)
+        res_cf_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.res_capa_factors)
+        gen_capas_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.generation_capas)
+        hydro_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro)
+        period = (uc_run_params.uc_period_start, uc_run_params.uc_period_end)
+        countries = uc_run_params.selected_countries
+        demand = {}
+        agg_cf_data = {}
+        residual_load_pts = []  # aggreg. prod. types with CF data, union over countries
+        per_country_df_gen_capa = {}
+        for country in countries:
+            logging.info(3 * '#' + f' For country: {country} (all climatic years)')
+            current_suffix = f'{uc_run_params.selected_target_year}_{country}'  # common suffix to all ERAA data files
+            if DATATYPE_NAMES.demand in datatypes_selec or with_net_demand:
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.demand}'):
+                    demand[country] = (
+                        get_all_cys_demand_data(folder=demand_folder, file_suffix=current_suffix,
+                                                target_year=uc_run_params.selected_target_year, country=country,
+                                                period=period, is_stress_test=self.is_stress_test, dtype=dtype)
+                    )
+            if DATATYPE_NAMES.capa_factor in datatypes_selec or with_residual_load:
+                cf_agg_prod_types_tb_read = (
+                    get_cf_agg_prod_types_tb_read(selected_agg_prod_types=uc_run_params.selected_prod_types[country],
+                                                  agg_prod_types_with_cf_data=self.agg_prod_types_with_cf_data,
+                                                  subdt_selec=subdt_selec)
+                )
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.capa_factor}'):
+                    agg_cf_data[country] = (
+                        get_all_cys_res_capa_factors_data(
+                            folder=res_cf_folder, file_suffix=current_suffix,
+                            target_year=uc_run_params.selected_target_year, country=country,
+                            cf_agg_prod_types_tb_read=cf_agg_prod_types_tb_read,
+                            aggreg_pt_cf_def=aggreg_prod_types_def[DATATYPE_NAMES.capa_factor], period=period,
+                            is_stress_test=self.is_stress_test, dtype=dtype)
+                    )
+            if with_residual_load:
+                residual_load_pts.extend([elt for elt in agg_cf_data[country] if elt not in residual_load_pts])
+                with profile_stage(name=f'{country} {DATATYPE_NAMES.installed_capa}'):
+                    current_df_gen_capa = get_installed_gen_capas_data(
+                        folder=gen_capas_folder, file_suffix=current_suffix,
+                        target_year=uc_run_params.selected_target_year, country=country,
+                        aggreg_pt_gen_capa_def=aggreg_prod_types_def[DATATYPE_NAMES.installed_capa],
+                        selected_agg_prod_types=uc_run_params.selected_prod_types[country]
+                    )
+                current_df_gen_capa = (
+                    overwrite_gen_capas_data(df_gen_capa=current_df_gen_capa,
+                                             new_power_capas=uc_run_params.capacities_tb_overwritten, country=country)
+                )
+                per_country_df_gen_capa[country] = current_df_gen_capa
+        if DATATYPE_NAMES.demand in datatypes_selec:
+            self.demand_all_cys = demand
+        if DATATYPE_NAMES.capa_factor in datatypes_selec:
+            self.agg_cf_data_all_cys = agg_cf_data
+        if not with_residual_load:
+            return
+
+        # capacities vectors once the union of prod. types over countries is known
+        capas = {}
+        for country in countries:
+            capas[country], pts_with_capa_from_arg = (
+                get_capas_vector(df_gen_capa=per_country_df_gen_capa[country], agg_prod_types=residual_load_pts,
+                                 capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
+            )
+            for data_type in [DATATYPE_NAMES.net_demand, DATATYPE_NAMES.fatal_production]:
+                if data_type in datatypes_selec:
+                    capa_from_arg_for_info_log(data_type=data_type,
+                                               prod_types_with_capa_from_arg=pts_with_capa_from_arg,
+                                               capas_aggreg_pt_with_cf=capas_aggreg_pt_with_cf)
+        # Run-of-River prod. in net demand, as in get_countries_data - for the climatic years of demand data
+        hydro_ror_prod = None
+        if with_net_demand and (subdt_selec is None or DATATYPE_NAMES.hydro_ror in subdt_selec):
+            demand_cys = sorted(set(int(cy) for country_demand in demand.values()
+                                    for cy in country_demand.climatic_years))
+            with profile_stage(name=DATATYPE_NAMES.hydro_ror):
+                hydro_ror_prod = get_all_cys_hydro_ror_data(folder=hydro_folder, countries=countries,
+                                                            climatic_years=demand_cys, period=period, dtype=dtype)
+        with profile_stage(name='residual load'):
+            self.fatal_prod_all_cys, self.net_demand_all_cys = (
+                calc_residual_load_all_cys(countries=countries, agg_prod_types=residual_load_pts,
+                                           agg_cf_data=agg_cf_data, capas=capas,
+                                           demand=demand if with_net_demand else None,
+                                           hydro_ror_prod=hydro_ror_prod, dtype=dtype)
+            )
+
     def complete_data(self):
         """
         Replace None values by empty dfs in all dict {country: df of data}
@@ -664,6 +970,7 @@ class Dataset:
     def get_agg_prod_types(self, country: str) -> List[str]:
         return list(set(self.agg_gen_capa_data[country][PROD_TYPE_AGG_COL]))
 
+    @profile_stage(name='generation units data')
     def get_generation_units_data(self, uc_run_params: UCRunParams, pypsa_unit_params_per_agg_pt: Dict[str, dict],
                                   units_complem_params_per_agg_pt: Dict[str, Dict[str, str]]):
         """
@@ -725,8 +1032,9 @@ class Dataset:
                         logging.debug(2 * N_SPACES_MSG * ' ' + f'-> add {capa_factor_key}')
                         current_pt_res_cf_data = (
                             self.agg_cf_data)[country][self.agg_cf_data[country][PROD_TYPE_AGG_COL] == agg_pt]
+                        # N.B. no copy here, done once when setting generation units table
                         current_assets_data[agg_pt][GEN_UNITS_PYPSA_PARAMS.capa_factors] = (
-                            np.array(current_pt_res_cf_data[COLUMN_NAMES.value])
+                            current_pt_res_cf_data[COLUMN_NAMES.value].to_numpy()
                         )
                     # add inflow when it applies
                     if check_if_from_eraa_data(param_key=inflow_key,
@@ -737,7 +1045,7 @@ class Dataset:
                         inflow_value_col = 'cum_inflow_into_reservoirs' if agg_pt == ProdTypeNames.hydro_reservoir \
                             else 'cum_nat_inflow_into_pump-storage_reservoirs'
                         try:
-                            current_inflows_data = np.array(current_pt_inflow_data[inflow_value_col])
+                            current_inflows_data = current_pt_inflow_data[inflow_value_col].to_numpy()
                         except:
                             logging.warning(f'Issue to access inflows data for {country} and {agg_pt} -> set to 0')
                             current_inflows_data = 0  # Q: ok to set constant float and not vector for this PyPSA attr.?
@@ -748,14 +1056,14 @@ class Dataset:
                         logging.debug(2 * N_SPACES_MSG * ' ' + f'-> add {soc_level_extr_key} (min and max)')
                         current_pt_soc_level_min_data = self.hydro_reservoir_levels_min_data[country]
                         try:
-                            current_soc_level_min_data = np.array(current_pt_soc_level_min_data[COLUMN_NAMES.value])
+                            current_soc_level_min_data = current_pt_soc_level_min_data[COLUMN_NAMES.value].to_numpy()
                         except:
                             logging.warning(
                                 f'Issue to access SOC level min data for {country} and {agg_pt} -> set to 0')
                             current_soc_level_min_data = 0  # Q: ok to set constant float and not vector for this PyPSA attr.?
                         current_pt_soc_level_max_data = self.hydro_reservoir_levels_max_data[country]
                         try:
-                            current_soc_level_max_data = np.array(current_pt_soc_level_max_data[COLUMN_NAMES.value])
+                            current_soc_level_max_data = current_pt_soc_level_max_data[COLUMN_NAMES.value].to_numpy()
                         except:
                             logging.warning(
                                 f'Issue to access SOC level min data for {country} and {agg_pt} -> set to 0')
@@ -786,9 +1094,15 @@ class Dataset:
                         current_assets_data[agg_pt][GEN_UNITS_PYPSA_PARAMS.power_capa] = power_capacity
 
                 self.generation_units_data[country].append(GenerationUnitData(**current_assets_data[agg_pt]))
+        self.set_generation_units_data(gen_units_data=self.generation_units_data)
 
     def set_generation_units_data(self, gen_units_data: Dict[str, List[GenerationUnitData]]):
-        self.generation_units_data = gen_units_data
+        """
+        Store generation units data in a columnar table - hourly profiles copied in a single float32 buffer -, and
+        keep them as views on it
+        """
+        self.generation_units_table = GenerationUnitTable.from_gen_units_data(gen_units_data=gen_units_data)
+        self.generation_units_data = self.generation_units_table.to_gen_units_data()
 
     def dump_gen_units_data_to_json(self, filepath: str):
         logging.info(f'Save PyPSA generation units data into JSON file: {filepath}')
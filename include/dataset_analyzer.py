@@ -7,7 +7,8 @@ from typing import List, Union, Dict, Tuple, Optional
 import numpy as np
 import pandas as pd
 
-from common.constants.data_analysis_types import ANALYSIS_TYPES, ANALYSIS_TYPES_PLOT, AVAILABLE_ANALYSIS_TYPES
+from common.constants.data_analysis_types import ANALYSIS_TYPES, ANALYSIS_TYPES_PLOT, AVAILABLE_ANALYSIS_TYPES, \
+    ROLLING_WINDOWS_DEFAULT
 from common.constants.datatypes import DatatypesNames, UNITS_PER_DT, DATATYPE_NAMES
 from common.constants.extract_eraa_data import ERAADatasetDescr, FICTIVE_CALENDAR_YEAR
 from common.constants.temporal import DATE_FORMAT_IN_JSON, MAX_DATE_IN_DATA, N_DAYS_DATA_ANALYSIS_DEFAULT
@@ -16,6 +17,7 @@ from common.long_term_uc_io import OUTPUT_DATA_ANALYSIS_FOLDER
 from common.plot_params import PlotParams
 from include.uc_timeseries import set_uc_ts_name, UCTimeseries
 from utils.basic_utils import random_draw_in_list, check_all_values_equal
+from utils.climatic_years_tensor import ClimaticYearsTensor
 from utils.dates import robust_date_parser, set_year_in_date, set_temporal_period_str
 from utils.df_utils import selec_in_df_based_on_list
 from utils.plot import FigureStyle
@@ -23,11 +25,15 @@ from utils.type_checker import CheckerNames, apply_params_type_check
 
 AVAILABLE_DATA_TYPES = list(DatatypesNames.__annotations__.values())
 AGG_PROD_TYPE_KEY = 'aggreg_prod_types'  # TODO[Q2OJ]: cleaner way to set/get it?
+ROLLING_WINDOWS_KEY = 'rolling_windows'
 RAW_TYPES_FOR_CHECK = {'analysis_type': CheckerNames.is_str, 'data_type': CheckerNames.is_str,
                        AGG_PROD_TYPE_KEY: CheckerNames.is_str_or_list_of_str,
                        'country': CheckerNames.is_str_or_list_of_str,
-                       'year': CheckerNames.is_int_or_list_of_int, 'climatic_year': CheckerNames.is_int_or_list_of_int}
+                       'year': CheckerNames.is_int_or_list_of_int, 'climatic_year': CheckerNames.is_int_or_list_of_int,
+                       ROLLING_WINDOWS_KEY: CheckerNames.is_int_or_list_of_int}
 DEFAULT_CY = 'first'
+# all climatic years data of a (country, year): {agg. prod. type (None if no agg. pt selection): tensor}
+PER_AGG_PT_CY_TENSORS = Dict[Optional[str], ClimaticYearsTensor]
 
 
 def set_period_for_analysis(period_start: str, period_end: str) -> (datetime, datetime):
@@ -159,6 +165,8 @@ class DataAnalysis:
     # net demand calculation
     # in JSON dict or list of dicts, then list objects after parsing data
     extra_params: Union[dict, List[dict], List[DataAnalExtraParams]] = None
+    # windows of rolling horizon avg, in number of time-slots (hours) - only used for this analysis type
+    rolling_windows: Union[int, List[int]] = None  # idem above with int or List[int]
 
     def __repr__(self) -> str:
         sep_in_str = '\n- '
@@ -179,6 +187,8 @@ class DataAnalysis:
             repr_str += f'{sep_in_str}period: {temp_period_str}'
         if not self.extra_params == [None]:
             repr_str += f'{sep_in_str}extra-params: {str(self.extra_params)}'
+        if self.analysis_type == ANALYSIS_TYPES.plot_rolling_horizon_avg:
+            repr_str += f'{sep_in_str}rolling windows (nber of time-slots): {self.rolling_windows}'
 
         return repr_str
 
@@ -189,6 +199,8 @@ class DataAnalysis:
         dict_for_check = self.__dict__
         if self.aggreg_prod_types is None:
             del dict_for_check[AGG_PROD_TYPE_KEY]
+        if self.rolling_windows is None:
+            del dict_for_check[ROLLING_WINDOWS_KEY]
         apply_params_type_check(dict_for_check, types_for_check=RAW_TYPES_FOR_CHECK,
                                 param_name='Data analysis params - to set the calc./plot to be done')
 
@@ -233,6 +245,11 @@ class DataAnalysis:
             else:
                 self.aggreg_prod_types = [None]
 
+        if self.rolling_windows is None:
+            self.rolling_windows = ROLLING_WINDOWS_DEFAULT
+        elif isinstance(self.rolling_windows, int):
+            self.rolling_windows = [self.rolling_windows]
+
         self.period_start, self.period_end = (
             set_period_for_analysis(period_start=self.period_start, period_end=self.period_end)
         )
@@ -303,6 +320,12 @@ class DataAnalysis:
                 errors_list.append(f'Too many curves for {self.analysis_type}: {n_curves} '
                                    f'(vs. max allowed {n_curves_max}) - with product of cases:\n* {msg_suffix}')
 
+        # check rolling windows (only for rolling horizon avg)
+        if self.analysis_type == ANALYSIS_TYPES.plot_rolling_horizon_avg:
+            non_positive_windows = [elt for elt in self.rolling_windows if elt <= 0]
+            if len(non_positive_windows) > 0:
+                errors_list.append(f'Non-positive rolling windows: {non_positive_windows}')
+
         # coherence of start and end period
         if self.period_end <= self.period_start:
             errors_list.append(f'Period end {self.period_end.strftime(DATE_FORMAT_IN_JSON)} '
@@ -346,13 +369,16 @@ class DataAnalysis:
     def get_extra_args_idx_to_label_corresp(self) -> Dict[int, str]:
         return {elt.index: elt.label for elt in self.extra_params if elt is not None}
 
-    def apply_analysis(self, per_case_data: Dict[Tuple[str, int, int], pd.DataFrame], fig_style: FigureStyle = None,
-                       per_dim_plot_params: Dict[str, PlotParams] = None, extra_params_labels: Dict[int, str] = None,
-                       dt_suffix_for_output: str = None):
+    def apply_analysis(self, per_case_data: Dict[Tuple[str, int, int], Union[pd.DataFrame, PER_AGG_PT_CY_TENSORS]],
+                       fig_style: FigureStyle = None, per_dim_plot_params: Dict[str, PlotParams] = None,
+                       extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None):
         """
-        Apply 'analysis', either saving data to csv, or plotting it
+        Apply 'analysis', either saving data to csv, plotting it, or saving its statistics (quantiles, duration curve,
+        ramps...) to JSON
         :param per_case_data: per tuple (country, year, climatic year) data in a dict. {tuple: df},
-        or unique dataframe if unique case considered
+        or unique dataframe if unique case considered. Data of a case can also be the - all climatic years - tensors
+        of its (country, year) in a dict {agg. prod. type (None if no agg. pt selection): tensor}, then directly
+        used for this case
         :param fig_style: FigureStyle params, in case a plot be applied
         :param per_dim_plot_params: {plot dimension eg 'zone': parameters to be used for plot color/linestyle/marker}
         :param extra_params_labels: {idx: label} corresp. for extra-parameters (no corresp. for None extra-params)
@@ -368,21 +394,29 @@ class DataAnalysis:
         # loop over (country, year, clim_year) of this analysis
         dates = {}
         values = {}
+        uc_timeseries = UCTimeseries(name=uc_ts_name, data_type=self.data_type, dates=dates,
+                                     values=values, unit=UNITS_PER_DT[self.data_type])
         # get agg. prod. types obtained in data if RES capa factors analysed and no selection requested
         # in input JSON file
         for country, year, clim_year, current_extra_params, agg_pt in (
                 product(self.countries, self.years, self.climatic_years, self.extra_params, self.aggreg_prod_types)):
             try:
                 extra_params_idx = current_extra_params.index if current_extra_params is not None else None
+                current_case_data = per_case_data[(country, year, clim_year, extra_params_idx)]
+                # all climatic years tensors -> case dates and values directly set from them
+                if isinstance(current_case_data, dict):
+                    uc_timeseries.set_case_from_cy_tensor(
+                        case_key=(country, year, clim_year, extra_params_idx, agg_pt),
+                        cy_tensor=current_case_data[agg_pt])
+                    continue
                 # N.B. dates are the same for all agg. prod types - but copied for simplicity here
                 # if no agg. pt selection
                 if agg_pt is None:
-                    current_subdt_data = per_case_data[(country, year, clim_year, extra_params_idx)]
+                    current_subdt_data = current_case_data
                 else:  # multiple sub-dts data concatenated in same df -> select only data for current sub-dt
                     current_subdt_data = (
-                        selec_in_df_based_on_list(df=per_case_data[(country, year, clim_year, extra_params_idx)],
-                                                  selec_col='production_type_agg', selec_vals=[agg_pt],
-                                                  rm_selec_col=True)
+                        selec_in_df_based_on_list(df=current_case_data, selec_col='production_type_agg',
+                                                  selec_vals=[agg_pt], rm_selec_col=True)
                     )
                 current_dates = list(current_subdt_data[date_col])
             except:
@@ -395,8 +429,6 @@ class DataAnalysis:
                 [elt_date.replace(year=year) for elt_date in current_dates]
             values[(country, year, clim_year, extra_params_idx, agg_pt)] = np.array(current_subdt_data[value_col])
 
-        uc_timeseries = UCTimeseries(name=uc_ts_name, data_type=self.data_type, dates=dates,
-                                     values=values, unit=UNITS_PER_DT[self.data_type])
         # And apply calc./plot... and other operations
         if len(values) == 0:
             logging.warning(f'No data obtained for type {self.data_type} -> analysis (plot/save to .csv) not done')
@@ -409,6 +441,14 @@ class DataAnalysis:
                                               per_dim_plot_params=per_dim_plot_params,
                                               extra_params_labels=extra_params_labels,
                                               dt_suffix_for_output=dt_suffix_for_output)
+        elif self.analysis_type == ANALYSIS_TYPES.plot_rolling_horizon_avg:
+            uc_timeseries.plot_rolling_horizon_avg(output_dir=OUTPUT_DATA_ANALYSIS_FOLDER, windows=self.rolling_windows,
+                                                   fig_style=fig_style, per_dim_plot_params=per_dim_plot_params,
+                                                   extra_params_labels=extra_params_labels,
+                                                   dt_suffix_for_output=dt_suffix_for_output)
+        elif self.analysis_type == ANALYSIS_TYPES.calc:
+            uc_timeseries.stats_to_json(output_dir=OUTPUT_DATA_ANALYSIS_FOLDER, extra_params_labels=extra_params_labels,
+                                        dt_suffix_for_output=dt_suffix_for_output)
         elif self.analysis_type in [ANALYSIS_TYPES.extract, ANALYSIS_TYPES.extract_to_mat]:
             # TODO[debug]: to_matrix_format not an arg of this method..., complem_columns missing...
             to_matrix = True if self.analysis_type == ANALYSIS_TYPES.extract_to_mat else False
@@ -1,4 +1,6 @@
+import gzip
 import os
+import shutil
 import warnings
 from itertools import product
 from pathlib import Path
@@ -9,27 +11,33 @@ import pandas as pd
 import numpy as np
 import logging
 from typing import Dict, List, Tuple, Optional, Union
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 import pypsa
 import matplotlib.pyplot as plt
+import xarray as xr
+from linopy import LinearExpression
+from pypsa.descriptors import get_bounds_pu, get_switchable_as_dense
 
 from common.constants.countries import set_country_trigram
 from common.constants.optimisation import OptimSolvers, DEFAULT_OPTIM_SOLVER_PARAMS, SolverParams, \
-    OptimPbCharacteristics, OptimPbTypes
+    OptimPbCharacteristics, OptimPbTypes, MODEL_FILE_FORMATS, ZoneAndTempProdSumConstraint, ConstMultCoeffNames, \
+    CustomConstraintDirection, CUSTOM_CONST_BOUND_UNIT_FACTOR, SolverMethods
 from common.constants.prod_types import get_country_from_unit_name, ProdTypeNames
-from common.constants.pypsa_params import GEN_UNITS_PYPSA_PARAMS
+from common.constants.pypsa_params import GEN_UNITS_PYPSA_PARAMS, PypsaOptimVarNames
 from common.error_msgs import print_errors_list
 from common.fuel_sources import FuelSource
 from common.long_term_uc_io import get_network_figure, FigNamesPrefix, get_output_figure
 from include.uc_postprocessing import UCSummaryMetrics, UCOptimalSolution
 from utils.basic_utils import (lexico_compar_str, rm_elts_with_none_val, rm_elts_in_str, sort_lexicographically,
                                format_with_spaces)
+from utils.dates import set_year_in_date
 from utils.dir_utils import make_dir
+from utils.profiling import profile_stage
 from utils.pypsa_utils import get_network_obj_value
 from utils.serializer import array_serializer
 
 
-@dataclass
+@dataclass(slots=True)
 class GenerationUnitData:
     name: str
     type: str
@@ -48,12 +56,18 @@ class GenerationUnitData:
     soc_min: np.ndarray = None
     soc_max: np.ndarray = None
     state_of_charge_initial: float = None
+    # SOC set points (NaN for time-slots without), e.g. final SOC target of last rolling horizon window
+    state_of_charge_set: np.ndarray = None
+
+    def to_dict(self) -> dict:
+        # N.B. no __dict__ with slots
+        return {attr.name: getattr(self, attr.name) for attr in fields(self)}
 
     def get_non_none_attr_names(self):
-        return [key for key, val in self.__dict__.items() if val is not None]
+        return [key for key, val in self.to_dict().items() if val is not None]
 
     def serialize(self) -> dict:
-        unit_data_dict = self.__dict__
+        unit_data_dict = self.to_dict()
         # (1d) nd array to list
         unit_data_dict = {key: array_serializer(my_array=val, stat_repres=True) if isinstance(val, np.ndarray) else val
                           for key, val in unit_data_dict.items()}
@@ -145,6 +159,9 @@ class PypsaModel:
     network: pypsa.Network = None
     uc_summary_metrics: UCSummaryMetrics = None  # UC summary metrics (ENS, nber of failure hours, costs...)
     optim_solver_params: SolverParams = None
+    # file in which solver basis is saved after each resolution of the (built once) model, and read to warm-start
+    # the next one - see solve_optim_model
+    optim_basis_file: str = None
     DEFAULT_CARRIER = 'ac'
 
     def init_pypsa_network(self, date_idx: pd.Index, date_range: pd.DatetimeIndex = None):
@@ -153,45 +170,60 @@ class PypsaModel:
         if date_range is not None:
             self.network.set_snapshots(date_range[:-1])
 
+    @profile_stage(name='add_gps_coordinates')
     def add_gps_coordinates(self, countries_gps_coords: Dict[str, Tuple[float, float]], carrier_name: str = None):
         if carrier_name is None:
             carrier_name = self.DEFAULT_CARRIER
 
         logging.info('Add GPS coordinates')
-        for country, gps_coords in countries_gps_coords.items():
-            country_bus_name = get_country_bus_name(country=country)
-            self.network.add(GEN_UNITS_PYPSA_PARAMS.bus.capitalize(), name=f'{country_bus_name}',
-                             x=gps_coords[0], y=gps_coords[1], carrier=carrier_name)
+        bus_names = pd.Index([get_country_bus_name(country=country) for country in countries_gps_coords])
+        gps_coords = np.array(list(countries_gps_coords.values()), dtype=float).reshape(-1, 2)
+        self.network.add(GEN_UNITS_PYPSA_PARAMS.bus.capitalize(), bus_names,
+                         x=pd.Series(gps_coords[:, 0], index=bus_names),
+                         y=pd.Series(gps_coords[:, 1], index=bus_names), carrier=carrier_name)
 
+    @profile_stage(name='add_energy_carriers')
     def add_energy_carriers(self, fuel_sources: Dict[str, FuelSource]):
         logging.info('Add energy carriers')
-        for carrier in list(fuel_sources.keys()):
-            self.network.add(GEN_UNITS_PYPSA_PARAMS.carrier.capitalize(), name=carrier,
-                             co2_emissions=fuel_sources[carrier].co2_emissions / 1000)
+        carrier_names = pd.Index(list(fuel_sources.keys()))
+        co2_emissions = pd.Series([fuel_source.co2_emissions / 1000 for fuel_source in fuel_sources.values()],
+                                  index=carrier_names)
+        self.network.add(GEN_UNITS_PYPSA_PARAMS.carrier.capitalize(), carrier_names, co2_emissions=co2_emissions)
 
+    @profile_stage(name='add_per_bus_energy_carriers')
     def add_per_bus_energy_carriers(self, fuel_sources: Dict[str, FuelSource], carrier_name: str = None):
         if carrier_name is None:
             carrier_name = self.DEFAULT_CARRIER
         all_bus_names = self.get_bus_names()
         logging.info(f'Add per-bus energy carriers for: {all_bus_names}')
-        for bus_name in all_bus_names:
-            self.network.add(GEN_UNITS_PYPSA_PARAMS.carrier.capitalize(), name=bus_name,
-                             co2_emissions=fuel_sources[carrier_name].co2_emissions / 1000)
+        self.network.add(GEN_UNITS_PYPSA_PARAMS.carrier.capitalize(), pd.Index(all_bus_names),
+                         co2_emissions=fuel_sources[carrier_name].co2_emissions / 1000)
 
+    @profile_stage(name='add_generators')
     def add_generators(self, generators_data: Dict[str, List[GenerationUnitData]]):
+        """
+        Add generators and storage units, with a single (bulk) network.add call per component class
+        """
         logging.info('Add generators - associated to their respective buses')
+        per_class_units_params = {'Generator': [], 'StorageUnit': []}
+        unit_names = set()
         for country, gen_units_data in generators_data.items():
             country_bus_name = get_country_bus_name(country=country)
             for gen_unit_data in gen_units_data:
-                pypsa_gen_unit_dict = gen_unit_data.__dict__
                 # remove elements with None values, as all attrs were listed in this dict.
-                pypsa_gen_unit_dict = rm_elts_with_none_val(my_dict=pypsa_gen_unit_dict)
+                pypsa_gen_unit_dict = rm_elts_with_none_val(my_dict=gen_unit_data.to_dict())
                 logging.debug(f'{country}, {pypsa_gen_unit_dict}')
                 params_ok = check_gen_unit_params(params=pypsa_gen_unit_dict, n_ts=len(self.network.snapshots))
                 if not params_ok:
                     logging.warning(f'Pb with generator parameters {pypsa_gen_unit_dict} '
                                     f'\n-> generator not added to the PyPSA model')
                     continue
+                # as with per-unit insertion in PyPSA, only first definition of a unit kept
+                if gen_unit_data.name in unit_names:
+                    logging.warning(f'Generation unit {gen_unit_data.name} already defined -> skipped')
+                    continue
+                unit_names.add(gen_unit_data.name)
+                pypsa_gen_unit_dict[GEN_UNITS_PYPSA_PARAMS.bus] = country_bus_name
 
                 # case of storage units, identified via the presence of max_hours param
                 if pypsa_gen_unit_dict.get(GEN_UNITS_PYPSA_PARAMS.max_hours, None) is not None:
@@ -201,9 +233,13 @@ class PypsaModel:
                         init_soc = (pypsa_gen_unit_dict[GEN_UNITS_PYPSA_PARAMS.power_capa]
                                     * pypsa_gen_unit_dict[GEN_UNITS_PYPSA_PARAMS.max_hours] * 0.8)
                         pypsa_gen_unit_dict[GEN_UNITS_PYPSA_PARAMS.soc_init] = init_soc
-                    self.network.add('StorageUnit', bus=f'{country_bus_name}', **pypsa_gen_unit_dict)
+                    per_class_units_params['StorageUnit'].append(pypsa_gen_unit_dict)
                 else:
-                    self.network.add('Generator', bus=f'{country_bus_name}', **pypsa_gen_unit_dict)
+                    per_class_units_params['Generator'].append(pypsa_gen_unit_dict)
+        for class_name, units_params in per_class_units_params.items():
+            if len(units_params) == 0:
+                continue
+            add_bulk_components(network=self.network, class_name=class_name, components_params=units_params)
         generator_names = self.get_generator_names()
         logging.info(f'Considered generators ({len(generator_names)}): '
                      f'{set_per_bus_asset_msg(asset_names=generator_names)}')
@@ -211,18 +247,20 @@ class PypsaModel:
         logging.info(f'Considered storage units ({len(storage_unit_names)}): '
                      f'{set_per_bus_asset_msg(asset_names=storage_unit_names)}')
 
+    @profile_stage(name='add_loads')
     def add_loads(self, demand: Dict[str, pd.DataFrame], carrier_name: str = None):
         if carrier_name is None:
             carrier_name = self.DEFAULT_CARRIER
         logging.info('Add loads - associated to their respective buses')
-        for country in demand:
-            country_bus_name = get_country_bus_name(country=country)
-            load_data = {GEN_UNITS_PYPSA_PARAMS.name: f'{country_bus_name}-load',
-                         GEN_UNITS_PYPSA_PARAMS.bus: f'{country_bus_name}',
-                         GEN_UNITS_PYPSA_PARAMS.carrier: carrier_name,
-                         GEN_UNITS_PYPSA_PARAMS.set_power: demand[country]['value'].values}
-            self.network.add('Load', **load_data)
-
+        bus_names = [get_country_bus_name(country=country) for country in demand]
+        load_names = pd.Index([f'{bus_name}-load' for bus_name in bus_names])
+        # (snapshot x load) array of demand values
+        p_set = pd.DataFrame(np.column_stack([demand[country]['value'].values for country in demand]),
+                             index=self.network.snapshots, columns=load_names)
+        self.network.add('Load', load_names, bus=pd.Series(bus_names, index=load_names), carrier=carrier_name,
+                         p_set=p_set)
+
+    @profile_stage(name='add_interco_links')
     def add_interco_links(self, countries: List[str], interco_capas: Dict[Tuple[str, str], float],
                           carrier_name: str = None):
         if carrier_name is None:
@@ -271,29 +309,85 @@ class PypsaModel:
         if len(links_wo_capa_msg) > 0:
             print_errors_list(error_name='-> interco. links without capacity data', errors_list=links_wo_capa_msg)
 
-        # add to PyPSA network
-        for link in links:
-            if link[GEN_UNITS_PYPSA_PARAMS.power_capa] > 0:
-                self.network.add('Link', **link)
+        # add to PyPSA network - the ones with nonzero capacity, in a single call
+        links = [link for link in links if link[GEN_UNITS_PYPSA_PARAMS.power_capa] > 0]
+        if len(links) > 0:
+            add_bulk_components(network=self.network, class_name='Link', components_params=links)
         link_names = self.get_link_names()
         logging.info(f'Considered links - the ones with nonzero capacity ({len(link_names)}), in alphabetic order '
                      f'of origin: {set_per_origin_bus_links_msg(link_names=link_names)}')
 
-    def build_model_before_adding_custom_const(self):
-        logging.warning('In PyPSA 0.35.1 not possible to build only model without solving it; '
-                        'to add custome constraints it will be solved first "for fun" (ignoring the solution)')
-        # TODO: see if deactivate resolution logs, in cmd windows/log file
-        self.network.optimize(build_only=True, solver_options={'logfile': '/dev/null'})
-
-    def add_sum_of_prod_custom_const(self):
+    @profile_stage(name='add_sum_of_prod_custom_const')
+    def add_sum_of_prod_custom_const(self, sum_prod_constraints: List[ZoneAndTempProdSumConstraint],
+                                     target_year: int):
         """
         Add sum-of-production custom constraints, of the form sum_{z, t} coeff(z, t) * production(z, t) <= ub (or >=, =)
-        N.B. Can be applied to CO2 max emission constraints
-        Returns:
+        N.B. (i) Can be applied to CO2 max emission constraints
+        (ii) To be called after build_optim_model, the model then solved being the one with these constraints
+        (iii) A single vectorized linopy constraint per custom constraint - with one row per period of its temporal
+        granularity -, the Generator-p variable being grouped by the period of each snapshot
+        :param sum_prod_constraints: list of custom constraints, with their bound values and associated dates
+        :param target_year: the one of the PyPSA model snapshots, to set the dates of the bounds - in data
+        calendar - in the model one
         """
-        logging.warning(f'Add custom sum of prod constraints (sum over z,t coeff(z,t) * prod(z, t) <= ub, or >=, =; '
-                        f'used, e.g. for max CO2 emissions) -> to be coded')
-
+        logging.info(f'Add {len(sum_prod_constraints)} custom sum of prod. constraints (sum over z,t '
+                     f'coeff(z,t) * prod(z, t) <= ub, or >=, =; used, e.g. for max CO2 emissions)')
+        linopy_model = self.network.model
+        gen_prod_var = linopy_model.variables[PypsaOptimVarNames.generators_p]
+        snapshots = self.network.snapshots
+        snapshot_weightings = self.network.snapshot_weightings.generators.loc[snapshots]
+        generators = self.network.generators
+        per_gen_coeffs = {
+            ConstMultCoeffNames.co2_emis_factor:
+                generators.carrier.map(self.network.carriers.co2_emissions).fillna(0),
+            ConstMultCoeffNames.variable_cost: generators.marginal_cost
+        }
+        const_signs = {CustomConstraintDirection.upper: '<=', CustomConstraintDirection.lower: '>=',
+                       CustomConstraintDirection.equal: '='}
+        for i_const, constraint in enumerate(sum_prod_constraints):
+            const_name = f'{constraint.type}-{constraint.name}-{i_const}'
+            # generators of the constraint countries, with nonzero coeff. (the only ones contributing to the sum)
+            bus_names = [get_country_bus_name(country=country) for country in constraint.countries]
+            gen_coeffs = per_gen_coeffs[constraint.mult_coeff_name]
+            gen_coeffs = gen_coeffs[generators.bus.isin(bus_names) & (gen_coeffs != 0)]
+            if len(gen_coeffs) == 0:
+                logging.warning(f'No generator with nonzero {constraint.mult_coeff_name} in {constraint.countries} '
+                                f'-> custom constraint {const_name} not added')
+                continue
+            # period of each snapshot, from the dates of the bound values set in target year
+            data_year = constraint.dates[0].year
+            period_dates = pd.DatetimeIndex([set_year_in_date(my_date=my_date,
+                                                              new_year=target_year + my_date.year - data_year)
+                                             for my_date in constraint.dates])
+            period_idx = np.searchsorted(period_dates, snapshots, side='right') - 1
+            is_in_periods = (period_idx >= 0) & (period_idx < len(constraint.bound))
+            if not is_in_periods.all():
+                logging.warning(f'{(~is_in_periods).sum()} snapshots outside of the periods of custom constraint '
+                                f'{const_name} -> not accounted for in it')
+            const_snapshots = snapshots[is_in_periods]
+            period_idx = period_idx[is_in_periods]
+            const_periods = np.unique(period_idx)
+            # periods only partly covered by the snapshots, e.g. in a rolling horizon window
+            n_hours_per_period = (np.diff(period_dates) / pd.Timedelta(hours=1))[const_periods]
+            n_snapshots_per_period = np.bincount(period_idx)[const_periods]
+            if np.any(n_snapshots_per_period < n_hours_per_period):
+                logging.warning(f'Periods of custom constraint {const_name} only partly covered by PyPSA model '
+                                f'snapshots -> full bound applied to the covered part of these periods')
+            # weighted coeffs (snapshot x generator), then sum over generators and per period
+            weighted_coeffs = pd.DataFrame(np.outer(snapshot_weightings.loc[const_snapshots], gen_coeffs),
+                                           index=const_snapshots, columns=gen_coeffs.index)
+            weighted_coeffs.index.name = 'snapshot'
+            weighted_coeffs.columns.name = 'Generator'
+            const_prod = gen_prod_var.sel(snapshot=const_snapshots, Generator=gen_coeffs.index)
+            period_da = xr.DataArray(period_idx, coords={'snapshot': const_snapshots}, name='period')
+            lhs = (const_prod * weighted_coeffs).sum('Generator').groupby(period_da).sum()
+            bound_factor = CUSTOM_CONST_BOUND_UNIT_FACTOR[constraint.mult_coeff_name]
+            rhs = xr.DataArray(constraint.bound[const_periods] * bound_factor, coords={'period': const_periods})
+            linopy_model.add_constraints(lhs, const_signs[constraint.direction], rhs, name=const_name)
+            logging.info(f'Custom constraint {const_name} added, over {len(const_periods)} periods and '
+                         f'{len(gen_coeffs)} generators')
+
+    @profile_stage(name='add_hydro_extreme_levels_constraint')
     def add_hydro_extreme_levels_constraint(self, soc_min: Dict[str, np.ndarray], soc_max: Dict[str, np.ndarray], 
                                             energy_capa: Dict[str, np.ndarray]):
         """
@@ -301,6 +395,7 @@ class PypsaModel:
         :param soc_min: dict {unit name: soc min vector}
         :param soc_max: idem, max
         :param energy_capa: dict {unit name: energy capa value}
+        N.B. To be called after build_optim_model, as add_sum_of_prod_custom_const
         """
         bob = 1
         # check if soc_min/max values induce a real constraint (not all 0/bigger than energy capacity)
@@ -358,10 +453,18 @@ class PypsaModel:
                                            n_bus=len(self.network.buses)))
             plt.close()
 
-    def set_default_optim_solver(self, warning_msg: str):
+    def set_default_optim_solver(self, warning_msg: str, solver_params: SolverParams = None):
+        """
+        Set default solver, keeping the performance profile of solver_params if provided
+        """
         msg_default_solver_used = f'-> default {DEFAULT_OPTIM_SOLVER_PARAMS.name} will be used instead'
         logging.warning(f'{warning_msg} {msg_default_solver_used}')
-        self.optim_solver_params = DEFAULT_OPTIM_SOLVER_PARAMS
+        if solver_params is None:
+            self.optim_solver_params = DEFAULT_OPTIM_SOLVER_PARAMS
+        else:
+            self.optim_solver_params = SolverParams(name=DEFAULT_OPTIM_SOLVER_PARAMS.name,
+                                                    profile_name=solver_params.profile_name,
+                                                    profile=solver_params.profile)
 
     def set_optim_solver(self, solver_params: SolverParams = None):
         # if no solver provided in arg. -> set default one
@@ -373,7 +476,7 @@ class PypsaModel:
             solver_name = solver_params.name
             if solver_name not in all_solver_names:
                 warning_msg = f'Solver name {solver_name} not in allowed list {all_solver_names}'
-                self.set_default_optim_solver(warning_msg=warning_msg)
+                self.set_default_optim_solver(warning_msg=warning_msg, solver_params=solver_params)
             else:
                 self.optim_solver_params = solver_params
             if not self.optim_solver_params.name == DEFAULT_OPTIM_SOLVER_PARAMS.name:
@@ -381,15 +484,25 @@ class PypsaModel:
                 solver_license_file = self.optim_solver_params.license_file
                 if solver_license_file is None:
                     warning_msg = f'Licence file for optim. solver {self.optim_solver_params.name} not provided'
-                    self.set_default_optim_solver(warning_msg=warning_msg)
+                    self.set_default_optim_solver(warning_msg=warning_msg, solver_params=solver_params)
                 else:
                     # license file must be at root of the project
                     if not os.path.exists(path=solver_license_file):
                         warning_msg = f'Licence file {solver_license_file} does not exist (at root of project)'
-                        self.set_default_optim_solver(warning_msg=warning_msg)
+                        self.set_default_optim_solver(warning_msg=warning_msg, solver_params=solver_params)
                     else:
                         os.environ[f'{self.optim_solver_params.name.upper()}_LICENSE_FILE'] = solver_license_file
 
+    def get_solver_options(self) -> dict:
+        """
+        Options passed to the solver, from the performance profile of solver params (none if no profile)
+        """
+        solver_options = self.optim_solver_params.get_solver_options()
+        if len(solver_options) > 0:
+            logging.info(f'Solver {self.optim_solver_params.name} options, from profile '
+                         f'{self.optim_solver_params.profile_name}: {solver_options}')
+        return solver_options
+
     def get_optim_pb_characteristics(self) -> OptimPbCharacteristics:
         """
         N.B. (i) This method can be called only after having optimized network in PyPSA 0.35.1 (model attribute of network
@@ -403,19 +516,131 @@ class PypsaModel:
                                       n_constraints=len(linopy_model.constraints.flat))
 
     def optimize_network(self, year: int, n_countries: int, period_start: datetime, save_lp_file: bool = True,
-                         toy_model_output: bool = False, countries: List[str] = None) -> PYPSA_RESULT_TYPE:
+                         toy_model_output: bool = False, countries: List[str] = None,
+                         model_file_format: str = MODEL_FILE_FORMATS.lp) -> PYPSA_RESULT_TYPE:
         """
         Solve the optimization UC problem associated to current network
+        :param save_lp_file: save the model in a file - written before resolution, from the model then solved
+        :param model_file_format: lp, mps or mps.gz (compressed MPS)
         :returns a tuple (xxx, status of resolution)
         """
         logging.info('Optimise "network" - i.e. solve associated UC problem')
-        result = self.network.optimize(solver_name=self.optim_solver_params.name)
-        logging.info(f'Obtained result: {result}')
+        # build linopy model once - if not already done to add custom constraints -, save it and then solve it
+        self.build_optim_model()
         if save_lp_file:
-            save_lp_model(self.network, year=year, n_countries=n_countries, period_start=period_start,
-                          toy_model_output=toy_model_output, countries=countries)
+            with profile_stage(name='save model file'):
+                save_lp_model(self.network, year=year, n_countries=n_countries, period_start=period_start,
+                              toy_model_output=toy_model_output, countries=countries, file_format=model_file_format)
+        with profile_stage(name='solve_model'):
+            result = self.network.optimize.solve_model(solver_name=self.optim_solver_params.name,
+                                                       solver_options=self.get_solver_options())
+        logging.info(f'Obtained result: {result}')
         return result
 
+    @profile_stage(name='build_optim_model')
+    def build_optim_model(self):
+        """
+        Build the linopy model of current network once, to then add custom constraints to it and/or solve it several
+        times with only some coefficients updated between resolutions (e.g. in a parameter sweep) - see
+        update_gen_marginal_costs, update_gen_p_nom and solve_optim_model
+        """
+        if self.network.model is not None:
+            logging.info('Linopy model of "network" already built (e.g. to add custom constraints) -> not rebuilt')
+            return
+        logging.info('Build linopy model of "network", to be updated and solved successively')
+        self.network.optimize.create_model()
+
+    def check_gen_names_in_network(self, gen_names: List[str], update_name: str):
+        unknown_gen_names = list(set(gen_names) - set(self.network.generators.index))
+        if len(unknown_gen_names) > 0:
+            raise Exception(f'Unknown generators {sorted(unknown_gen_names)} in {update_name} update of PyPSA model '
+                            f'-> STOP')
+
+    def update_gen_marginal_costs(self, new_marginal_costs: Dict[str, float]):
+        """
+        Update marginal costs of some generators, both in network and in the objective function of the already built
+        linopy model - without rebuilding it
+        :param new_marginal_costs: dict {generator name: new marginal cost value}
+        """
+        self.check_gen_names_in_network(gen_names=list(new_marginal_costs), update_name='marginal costs')
+        self.network.generators.loc[list(new_marginal_costs), GEN_UNITS_PYPSA_PARAMS.marginal_cost] = (
+            pd.Series(new_marginal_costs))
+        linopy_model = self.network.model
+        gen_prod_var = linopy_model.variables[PypsaOptimVarNames.generators_p]
+        # remove all generators production terms of the objective, and add them again with updated costs
+        # N.B. (i) as in PyPSA objective definition, weighted by snapshots and only for generators with nonzero costs
+        # (ii) all generators terms reset to also get the ones with zero cost before this update
+        obj_expr = linopy_model.objective.expression
+        is_gen_prod_term = np.isin(obj_expr.vars.values, gen_prod_var.labels.values)
+        other_obj_terms = LinearExpression(obj_expr.data.isel(_term=~is_gen_prod_term), linopy_model)
+        snapshots = self.network.snapshots
+        weighted_costs = (
+            get_switchable_as_dense(self.network, 'Generator', GEN_UNITS_PYPSA_PARAMS.marginal_cost, snapshots)
+            .loc[:, lambda df: (df != 0).any()]
+            .mul(self.network.snapshot_weightings.objective.loc[snapshots], axis=0)
+        )
+        gen_prod_cost = (gen_prod_var.sel({'snapshot': snapshots, 'Generator': weighted_costs.columns})
+                         * weighted_costs).sum()
+        linopy_model.objective = other_obj_terms + gen_prod_cost
+
+    def update_gen_p_nom(self, new_p_noms: Dict[str, float]):
+        """
+        Update nominal power (capacity) of some generators, both in network and in the rhs of their (non-extendable)
+        dispatch bound constraints p_min_pu * p_nom <= p <= p_max_pu * p_nom in the already built linopy model
+        :param new_p_noms: dict {generator name: new p_nom value}
+        """
+        self.check_gen_names_in_network(gen_names=list(new_p_noms), update_name='p_nom')
+        gen_names = pd.Index(list(new_p_noms), name='Generator')
+        self.network.generators.loc[gen_names, 'p_nom'] = pd.Series(new_p_noms)
+        min_pu, max_pu = get_bounds_pu(self.network, 'Generator', self.network.snapshots, gen_names, 'p')
+        p_nom = self.network.generators.p_nom.reindex(gen_names)
+        linopy_model = self.network.model
+        for const_name, bound_pu in {'Generator-fix-p-lower': min_pu, 'Generator-fix-p-upper': max_pu}.items():
+            constraint = linopy_model.constraints[const_name]
+            rhs = constraint.rhs.transpose('snapshot', 'Generator-fix')
+            rhs.loc[{'Generator-fix': list(gen_names)}] = bound_pu.mul(p_nom, axis=1).values
+            constraint.rhs = rhs
+
+    def get_gen_marginal_costs_with_co2_price(self, co2_emis_price: float,
+                                              base_marginal_costs: pd.Series = None) -> Dict[str, float]:
+        """
+        Marginal costs of generators including a CO2 emissions price, with the CO2 emission factors - per MWh
+        produced - of their carriers (the ones used for UC summary metrics)
+        :param co2_emis_price: in €/tCO2
+        :param base_marginal_costs: without CO2 price; by default, the ones currently in network (then to be called
+        only once, otherwise CO2 price cumulated)
+        """
+        if base_marginal_costs is None:
+            base_marginal_costs = self.network.generators.marginal_cost
+        co2_emi_factors = self.network.generators.carrier.map(self.network.carriers.co2_emissions).fillna(0)
+        marginal_costs = base_marginal_costs + co2_emis_price * co2_emi_factors
+        return {gen_name: float(mc) for gen_name, mc in marginal_costs.items()}
+
+    def solve_optim_model(self, warm_start: bool = True) -> PYPSA_RESULT_TYPE:
+        """
+        Solve the already built (and possibly updated) linopy model of current network
+        :param warm_start: start solver from the basis of previous resolution, if saved in optim_basis_file
+        :returns a tuple (xxx, status of resolution)
+        """
+        solve_kwargs = {}
+        solver_profile = self.optim_solver_params.profile
+        if (self.optim_basis_file is not None and solver_profile is not None
+                and solver_profile.method == SolverMethods.ipm_no_crossover):
+            logging.warning(f'No basis obtained with IPM without crossover (solver profile '
+                            f'{self.optim_solver_params.profile_name}) -> solver not warm-started')
+        elif self.optim_basis_file is not None:
+            solve_kwargs['basis_fn'] = self.optim_basis_file
+            if warm_start and os.path.exists(self.optim_basis_file):
+                logging.info(f'Warm-start solver from basis of previous resolution, in {self.optim_basis_file}')
+                solve_kwargs['warmstart_fn'] = self.optim_basis_file
+        logging.info('Solve (already built) linopy model of "network"')
+        with profile_stage(name='solve_model'):
+            result = self.network.optimize.solve_model(solver_name=self.optim_solver_params.name,
+                                                       solver_options=self.get_solver_options(), **solve_kwargs)
+        logging.info(f'Obtained result: {result}')
+        return result
+
+    @profile_stage(name='set_uc_opt_solution')
     def set_uc_opt_solution(self) -> UCOptimalSolution:
         """
         Returns: an object containing variables + methods on the UC optimal solution
@@ -471,6 +696,54 @@ class PypsaModel:
 #         updated_fuel_sources_params = None
 
 
+def set_bulk_components_attrs(network: pypsa.Network, class_name: str, components_params: List[dict]) \
+        -> (pd.Index, Dict[str, pd.Series], Dict[str, pd.DataFrame]):
+    """
+    Assemble parameters of a list of components of a same class, to add them all at once (see add_bulk_components)
+    :param network: to which they will be added
+    :param class_name: PyPSA component class name, e.g. 'Generator'
+    :param components_params: list of per-component dict {attr. name: value}, with name and non-None values only
+    :returns component names, a Series (indexed by names) per static attr. and a (snapshot x component) DataFrame
+    per time-varying one - only with the components having an array value for it, as with per-component insertion.
+    N.B. static values not provided for some components are set to PyPSA defaults
+    """
+    names = pd.Index([params[GEN_UNITS_PYPSA_PARAMS.name] for params in components_params])
+    attr_defaults = network.components[class_name].attrs['default']
+    attr_names = list(dict.fromkeys(attr_name for params in components_params for attr_name in params))
+    attr_names.remove(GEN_UNITS_PYPSA_PARAMS.name)
+    static_attrs = {}
+    varying_attrs = {}
+    for attr_name in attr_names:
+        default_value = attr_defaults.get(attr_name, np.nan)
+        values = [params.get(attr_name, default_value) for params in components_params]
+        is_varying = np.array([np.ndim(value) > 0 for value in values])
+        if is_varying.any():
+            varying_attrs[attr_name] = pd.DataFrame(np.column_stack([value for value, is_var in zip(values, is_varying)
+                                                                     if is_var]),
+                                                    index=network.snapshots, columns=names[is_varying])
+            values = [default_value if is_var else value for value, is_var in zip(values, is_varying)]
+        static_attrs[attr_name] = pd.Series(values, index=names)
+    return names, static_attrs, varying_attrs
+
+
+def add_bulk_components(network: pypsa.Network, class_name: str, components_params: List[dict]):
+    """
+    Add a list of components of a same class to network with one network.add call, and one (snapshot x component)
+    DataFrame per time-varying attr. - instead of per-component insertion
+    """
+    names, static_attrs, varying_attrs = set_bulk_components_attrs(network=network, class_name=class_name,
+                                                                   components_params=components_params)
+    # as in network.add, components already defined are skipped
+    new_names = names.difference(network.static(class_name).index, sort=False)
+    network.add(class_name, names, **static_attrs)
+    for attr_name, attr_values in varying_attrs.items():
+        attr_values = attr_values.loc[:, attr_values.columns.isin(new_names)].rename_axis(columns=class_name)
+        current_values = network.dynamic(class_name).get(attr_name)
+        if current_values is not None and not current_values.empty:
+            attr_values = pd.concat([current_values, attr_values], axis=1)
+        network.dynamic(class_name)[attr_name] = attr_values
+
+
 def get_country_bus_name(country: str) -> str:
     return country.lower()[:3]
 
@@ -510,11 +783,18 @@ def set_period_start_file(year: int, period_start: datetime) -> str:
 
 
 def save_lp_model(network: pypsa.Network, year: int, period_start: datetime, countries: List[str] = None,
-                  n_countries: int = None, add_random_suffix: bool = False, toy_model_output: bool = False):
-    import pypsa.optimization as opt
+                  n_countries: int = None, add_random_suffix: bool = False, toy_model_output: bool = False,
+                  file_format: str = MODEL_FILE_FORMATS.lp):
+    """
+    Save linopy model of a network - the one already built if any (to avoid building it a second time)
+    :param file_format: lp, mps or mps.gz (MPS then compressed with gzip)
+    """
     from common.long_term_uc_io import set_full_lt_uc_output_folder, OutputFolderNames
 
-    m = opt.create_model(network)
+    if network.model is None:
+        logging.info('Linopy model not built yet -> created to be saved')
+        network.optimize.create_model()
+    m = network.model
 
     # set prefix
     n_countries_max_in_prefix = 3
@@ -541,6 +821,13 @@ def save_lp_model(network: pypsa.Network, year: int, period_start: datetime, cou
     output_folder_data = set_full_lt_uc_output_folder(folder_type=OutputFolderNames.data, country=country_output_folder,
                                                       toy_model_output=toy_model_output)
     make_dir(full_path=output_folder_data)
-    lp_filepath = f'{output_folder_data}/model_{file_suffix}.lp'
-    logging.info(f'Save model in .lp file: {lp_filepath}')
-    m.to_file(Path(lp_filepath))
+    lp_filepath = f'{output_folder_data}/model_{file_suffix}.{file_format}'
+    logging.info(f'Save model in .{file_format} file: {lp_filepath}')
+    if file_format == MODEL_FILE_FORMATS.mps_gz:
+        mps_filepath = lp_filepath[:-len('.gz')]
+        m.to_file(Path(mps_filepath), io_api=MODEL_FILE_FORMATS.mps)
+        with open(mps_filepath, 'rb') as f_in, gzip.open(lp_filepath, 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.remove(mps_filepath)
+    else:
+        m.to_file(Path(lp_filepath), io_api=file_format)
@@ -0,0 +1,94 @@
+"""
+Figure jobs, rendered in a background process pool - with matplotlib Agg (non-interactive) backend - from the
+(pickled) network and optimal solution data, so that PNG rendering is not on the critical path of UC runs
+"""
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future
+from datetime import datetime
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Tuple
+
+import matplotlib
+import pypsa
+
+from common.constants.datadims import DataDimensions
+from common.constants.plots import PlotNames
+from common.plot_params import PlotParams
+from include.dataset_builder import PypsaModel
+from include.uc_postprocessing import UCOptimalSolution
+
+DEFAULT_N_FIGURE_WORKERS = 2
+
+
+def init_figure_worker():
+    matplotlib.use('Agg')
+
+
+def plot_pypsa_network(network: pypsa.Network, name: str, toy_model_output: bool = False, country: str = None):
+    pypsa_model = PypsaModel(name=name, network=network)
+    pypsa_model.plot_network(toy_model_output=toy_model_output, country=country)
+
+
+def plot_uc_opt_solution_figures(uc_optimal_solution: UCOptimalSolution, per_dim_plot_params: Dict[str, PlotParams],
+                                 plots_tb_done: List[str], countries: List[str], year: int, climatic_year: int,
+                                 start_horizon: datetime):
+    """
+    Plot the figures of an optimal UC solution listed in plots_tb_done - per country, then at the scale of all
+    countries (Europe)
+    """
+    plot_params_agg_pt = per_dim_plot_params[DataDimensions.agg_prod_type]
+    plot_params_zone = per_dim_plot_params[DataDimensions.zone]
+
+    # plot - first the ones per country
+    for country in countries:
+        # opt. prod profiles 'stacked'
+        if PlotNames.prod_stacked in plots_tb_done:
+            uc_optimal_solution.plot_prod(plot_params_agg_pt=plot_params_agg_pt, country=country, year=year,
+                                          climatic_year=climatic_year, start_horizon=start_horizon)
+        # idem, including stock-like prod units (both cons. and prod.) on the stack of curves
+        if PlotNames.prod_stacked_with_stock in plots_tb_done:
+            uc_optimal_solution.plot_prod(plot_params_agg_pt=plot_params_agg_pt, country=country, year=year,
+                                          climatic_year=climatic_year, start_horizon=start_horizon,
+                                          include_storage=True)
+        # flow in the links
+        if PlotNames.link_flows in plots_tb_done:
+            uc_optimal_solution.plot_link_flows(origin_country=country, year=year, climatic_year=climatic_year,
+                                                start_horizon=start_horizon)
+    # then plots at the scale of all countries (Europe)
+    # 'marginal price' figure
+    if PlotNames.marginal_price in plots_tb_done:
+        uc_optimal_solution.plot_marginal_price(plot_params_zone=plot_params_zone, year=year,
+                                                climatic_year=climatic_year, start_horizon=start_horizon)
+
+
+class FigureJobQueue:
+    """
+    Queue of figure jobs, rendered by a pool of background processes. N.B. 'spawn' processes - not forked from a
+    process possibly running multi-threaded solvers -, and job args pickled -> the ones of a job are a snapshot
+    of the data at submission time
+    """
+    def __init__(self, max_workers: int = DEFAULT_N_FIGURE_WORKERS):
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=get_context('spawn'),
+                                            initializer=init_figure_worker)
+        self.jobs: List[Tuple[str, Future]] = []
+
+    def submit(self, job_name: str, func: Callable, **kwargs):
+        logging.info(f'Figure job {job_name} submitted to background process pool')
+        self.jobs.append((job_name, self.executor.submit(func, **kwargs)))
+
+    def wait(self) -> int:
+        """
+        Wait for all submitted jobs to be done, then shut down the pool
+        Returns: number of failed jobs
+        """
+        n_failed_jobs = 0
+        for job_name, future in self.jobs:
+            try:
+                future.result()
+            except Exception as e:
+                n_failed_jobs += 1
+                logging.error(f'Figure job {job_name} failed: {e}')
+        self.executor.shutdown()
+        logging.info(f'{len(self.jobs) - n_failed_jobs}/{len(self.jobs)} figure jobs done')
+        self.jobs = []
+        return n_failed_jobs
@@ -0,0 +1,164 @@
+"""
+Columnar (array-backed) collection of generation units data: static parameters in typed arrays, and all hourly
+profiles (capa. factors, inflows, SOC levels...) stored in one contiguous (profile x hour) float32 buffer.
+GenerationUnitData objects are then obtained as lightweight views on it - their profiles being views into the
+buffer, without copy -, e.g. to hold many scenario variants of the same units in one process
+"""
+import logging
+from collections import Counter
+from dataclasses import dataclass, field, fields
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from include.dataset_builder import GenerationUnitData, GEN_UNITS_DATA_TYPE
+
+GEN_UNITS_PROFILES_DTYPE = np.float32
+NO_PROFILE_IDX = -1
+GEN_UNIT_ATTR_NAMES = [attr.name for attr in fields(GenerationUnitData)]
+
+
+def is_profile_value(value) -> bool:
+    return value is not None and np.ndim(value) > 0
+
+
+def set_static_param_array(values: list) -> np.ndarray:
+    """
+    Typed array of a static param: float64 - with NaN for None - if only numbers (and None), else object
+    """
+    is_numeric = all(value is None or (isinstance(value, (int, float, np.number)) and not isinstance(value, bool))
+                     for value in values)
+    if is_numeric:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+    return np.array(values, dtype=object)
+
+
+def get_static_param_value(param_values: np.ndarray, unit_idx: int):
+    value = param_values[unit_idx]
+    if param_values.dtype == np.float64:
+        return None if np.isnan(value) else float(value)
+    return value
+
+
+@dataclass
+class GenerationUnitTable:
+    countries: np.ndarray  # country of each unit
+    static_params: Dict[str, np.ndarray]  # {attr. name: (unit,) array of values}
+    profiles: np.ndarray  # contiguous (profile x hour) buffer
+    # {attr. name: (unit,) array with idx of unit profile in buffer, NO_PROFILE_IDX if static value for this unit}
+    profile_idx: Dict[str, np.ndarray] = field(default_factory=dict)
+    # profiles with a length different from the one of the buffer (then not stored in it), {(unit idx, attr. name):
+    # profile} - e.g. inconsistent input data, to be filtered when creating PyPSA model
+    odd_length_profiles: Dict[tuple, np.ndarray] = field(default_factory=dict)
+    country_names: List[str] = None  # incl. the ones without units, to keep them in to_gen_units_data
+
+    @classmethod
+    def from_gen_units_data(cls, gen_units_data: GEN_UNITS_DATA_TYPE) -> 'GenerationUnitTable':
+        """
+        Build table from {country: list of generation units data}, copying all hourly profiles once into the buffer
+        """
+        countries = []
+        units_data = []
+        for country, country_units_data in gen_units_data.items():
+            countries.extend([country] * len(country_units_data))
+            units_data.extend(country_units_data)
+        n_units = len(units_data)
+        # profiles length: the most common one
+        profile_lengths = Counter(len(getattr(unit_data, attr_name)) for unit_data in units_data
+                                  for attr_name in GEN_UNIT_ATTR_NAMES
+                                  if is_profile_value(getattr(unit_data, attr_name)))
+        n_ts = profile_lengths.most_common(1)[0][0] if len(profile_lengths) > 0 else 0
+        n_profiles = profile_lengths.get(n_ts, 0)
+        profiles = np.empty((n_profiles, n_ts), dtype=GEN_UNITS_PROFILES_DTYPE)
+        static_params = {}
+        profile_idx = {}
+        odd_length_profiles = {}
+        i_profile = 0
+        for attr_name in GEN_UNIT_ATTR_NAMES:
+            values = [getattr(unit_data, attr_name) for unit_data in units_data]
+            attr_profile_idx = np.full(n_units, NO_PROFILE_IDX, dtype=np.int64)
+            for i_unit, value in enumerate(values):
+                if not is_profile_value(value):
+                    continue
+                values[i_unit] = None
+                if len(value) == n_ts:
+                    profiles[i_profile] = value
+                    attr_profile_idx[i_unit] = i_profile
+                    i_profile += 1
+                else:
+                    odd_length_profiles[(i_unit, attr_name)] = np.asarray(value)
+            if np.any(attr_profile_idx != NO_PROFILE_IDX):
+                profile_idx[attr_name] = attr_profile_idx
+            static_params[attr_name] = set_static_param_array(values=values)
+        if len(odd_length_profiles) > 0:
+            logging.warning(f'{len(odd_length_profiles)} generation units profiles with length different from '
+                            f'{n_ts} -> not stored in contiguous buffer: '
+                            f'{[(units_data[i].name, attr) for i, attr in odd_length_profiles]}')
+        return cls(countries=np.array(countries, dtype=object), static_params=static_params, profiles=profiles,
+                   profile_idx=profile_idx, odd_length_profiles=odd_length_profiles,
+                   country_names=list(gen_units_data))
+
+    def __len__(self) -> int:
+        return len(self.countries)
+
+    @property
+    def names(self) -> np.ndarray:
+        return self.static_params['name']
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory of the profiles buffer and static params arrays (the object ones counted as pointers)
+        """
+        return self.profiles.nbytes + sum(values.nbytes for values in self.static_params.values())
+
+    def get_unit_profile(self, unit_idx: int, attr_name: str) -> Optional[np.ndarray]:
+        if (unit_idx, attr_name) in self.odd_length_profiles:
+            return self.odd_length_profiles[(unit_idx, attr_name)]
+        if attr_name not in self.profile_idx or self.profile_idx[attr_name][unit_idx] == NO_PROFILE_IDX:
+            return None
+        return self.profiles[self.profile_idx[attr_name][unit_idx]]
+
+    def get_unit_data(self, unit_idx: int) -> GenerationUnitData:
+        """
+        GenerationUnitData view of a unit: static params copied (then can be modified without impacting table),
+        and profiles as views into the buffer
+        """
+        unit_params = {}
+        for attr_name in GEN_UNIT_ATTR_NAMES:
+            unit_profile = self.get_unit_profile(unit_idx=unit_idx, attr_name=attr_name)
+            if unit_profile is not None:
+                unit_params[attr_name] = unit_profile
+            else:
+                unit_params[attr_name] = get_static_param_value(param_values=self.static_params[attr_name],
+                                                                unit_idx=unit_idx)
+        return GenerationUnitData(**unit_params)
+
+    def to_gen_units_data(self) -> GEN_UNITS_DATA_TYPE:
+        """
+        {country: list of generation units data views}, with the same order as the one used to build the table
+        """
+        gen_units_data = {country: [] for country in self.country_names}
+        for unit_idx, country in enumerate(self.countries):
+            gen_units_data[country].append(self.get_unit_data(unit_idx=unit_idx))
+        return gen_units_data
+
+    def copy_with_shared_profiles(self, new_static_params: Dict[str, Dict[str, float]] = None) \
+            -> 'GenerationUnitTable':
+        """
+        Scenario variant of this table, sharing its profiles buffer (not copied)
+        :param new_static_params: {attr. name: {unit name: new value}}, e.g. {'p_nom': {'fra_nuclear': 50000}}
+        """
+        static_params = {attr_name: values.copy() for attr_name, values in self.static_params.items()}
+        if new_static_params is not None:
+            unit_idx = {name: i_unit for i_unit, name in enumerate(self.names)}
+            for attr_name, new_values in new_static_params.items():
+                unknown_units = list(set(new_values) - set(unit_idx))
+                if len(unknown_units) > 0:
+                    raise Exception(f'Unknown generation units {unknown_units} in new {attr_name} values -> STOP')
+                for name, new_value in new_values.items():
+                    static_params[attr_name][unit_idx[name]] = new_value
+        return GenerationUnitTable(countries=self.countries, static_params=static_params, profiles=self.profiles,
+                                   profile_idx=self.profile_idx, odd_length_profiles=self.odd_length_profiles,
+                                   country_names=self.country_names)
+
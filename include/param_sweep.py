@@ -0,0 +1,65 @@
+"""
+Parameter sweep of a UC case - e.g. sensitivity to installed capacities, fuel marginal costs or CO2 price: linopy
+model built once, then only its changed coefficients/rhs updated (p_nom bounds, objective costs) and solver
+warm-started from previous solution between successive resolutions
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict
+
+import pandas as pd
+
+from common.constants.prod_types import get_prod_type_from_unit_name, set_gen_unit_name
+
+
+@dataclass
+class UCSweepCase:
+    name: str
+    # {country: {agg. prod type: capa. (MW)}}, same format as capacities_tb_overwritten in UCRunParams
+    capacities_tb_overwritten: Dict[str, Dict[str, float]] = None
+    # {agg. prod type: marginal cost (€/MWh)}, applied to the generators of this type in all countries
+    marginal_costs: Dict[str, float] = None
+    co2_emis_price: float = None  # €/tCO2, added to marginal costs with the CO2 emission factors of carriers
+
+    def get_gen_p_noms(self, base_p_noms: pd.Series) -> pd.Series:
+        """
+        Nominal power of generators in this case, from the one of the base case (the one of the built model)
+        """
+        p_noms = base_p_noms.copy()
+        if self.capacities_tb_overwritten is None:
+            return p_noms
+        for country, new_power_capas in self.capacities_tb_overwritten.items():
+            for agg_prod_type, new_capa_val in new_power_capas.items():
+                gen_name = set_gen_unit_name(country=country, agg_prod_type=agg_prod_type)
+                if gen_name not in p_noms.index:
+                    logging.warning(f'No generator {gen_name} in PyPSA model -> capacity of {agg_prod_type} in '
+                                    f'{country} not overwritten in sweep case {self.name}')
+                    continue
+                p_noms[gen_name] = new_capa_val
+        return p_noms
+
+    def get_gen_marginal_costs(self, base_marginal_costs: pd.Series) -> pd.Series:
+        """
+        Marginal costs of generators in this case - without CO2 price -, from the ones of the base case
+        """
+        marginal_costs = base_marginal_costs.copy()
+        if self.marginal_costs is None:
+            return marginal_costs
+        gen_prod_types = pd.Series({gen_name: get_prod_type_from_unit_name(prod_unit_name=gen_name)
+                                    for gen_name in marginal_costs.index})
+        for agg_prod_type, new_marginal_cost in self.marginal_costs.items():
+            is_current_prod_type = gen_prod_types == agg_prod_type
+            if not is_current_prod_type.any():
+                logging.warning(f'No generator of type {agg_prod_type} in PyPSA model -> marginal cost not '
+                                f'overwritten in sweep case {self.name}')
+                continue
+            marginal_costs[is_current_prod_type] = new_marginal_cost
+        return marginal_costs
+
+
+def get_changed_values(new_values: pd.Series, current_values: pd.Series) -> Dict[str, float]:
+    """
+    Values that differ from the current ones - the only ones to be updated in the linopy model
+    """
+    is_changed = new_values.ne(current_values.reindex(new_values.index))
+    return {name: float(val) for name, val in new_values[is_changed].items()}
@@ -0,0 +1,166 @@
+"""
+Rolling horizon resolution of UC problem: period split into successive (overlapping) windows, each one solved with
+some "ring guard" days at its end - discarded in the results -, and final storage State-Of-Charge (SOC) of its kept
+part used as initial SOC of the next window. Storage units with cyclic SOC over the full period end the last window
+with the initial SOC of the first one
+"""
+import logging
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pypsa
+
+from common.constants.optimisation import ZoneAndTempProdSumConstraint
+from include.dataset_builder import GEN_UNITS_DATA_TYPE
+from include.uc_postprocessing import UCOptimalSolution
+from utils.dates import get_period_str
+
+
+@dataclass
+class RollingHorizonParams:
+    # days of each window kept in results (a week by default), then "ring guard" days only used to avoid end of
+    # horizon effects (in particular full storage discharge) -> same as default UC period of 9 days
+    n_days_kept: int = 7
+    n_guard_days: int = 2
+
+    def __post_init__(self):
+        if self.n_days_kept < 1 or self.n_guard_days < 0:
+            raise Exception(f'Rolling horizon with {self.n_days_kept} kept and {self.n_guard_days} ring guard days; '
+                            f'at least 1 (resp. 0) kept (resp. ring guard) day(s) needed')
+
+
+@dataclass
+class RollingHorizonWindow:
+    start: datetime
+    kept_end: datetime  # end of the part kept in results (excluded)
+    end: datetime  # end of the optimisation period, ring guard days incl. (excluded)
+
+    def __repr__(self) -> str:
+        return (f'window {get_period_str(period_start=self.start, period_end=self.end)} '
+                f'(kept until {self.kept_end:%Y/%m/%d})')
+
+
+def set_rolling_horizon_windows(period_start: datetime, period_end: datetime,
+                                rolling_horizon_params: RollingHorizonParams) -> List[RollingHorizonWindow]:
+    """
+    Split [period_start, period_end) into successive windows, kept parts covering the period without overlap.
+    N.B. ring guard days are truncated at the end of the period, and a last window shorter than the kept duration
+    is merged with the previous one (e.g., Dec. 31th of a full year, in ISO week 1 of next year -> no weekly
+    hydro data)
+    """
+    kept_duration = timedelta(days=rolling_horizon_params.n_days_kept)
+    guard_duration = timedelta(days=rolling_horizon_params.n_guard_days)
+    windows = []
+    window_start = period_start
+    while window_start < period_end:
+        kept_end = window_start + kept_duration
+        if period_end - kept_end < kept_duration:
+            kept_end = period_end
+        windows.append(RollingHorizonWindow(start=window_start, kept_end=kept_end,
+                                            end=min(kept_end + guard_duration, period_end)))
+        window_start = kept_end
+    return windows
+
+
+def set_window_sum_prod_constraints(sum_prod_constraints: List[ZoneAndTempProdSumConstraint],
+                                    window: RollingHorizonWindow) -> List[ZoneAndTempProdSumConstraint]:
+    """
+    Custom sum-of-prod. constraints of the full UC period restricted to the kept part of a window, the bound of each
+    of their periods being prorated to its duration in [window.start, window.kept_end) -> window bounds summing to
+    the full period ones, kept parts of the windows covering the period without overlap.
+    N.B. ring guard days are not constrained, their solution being discarded
+    """
+    window_constraints = []
+    for constraint in sum_prod_constraints:
+        window_bound = []
+        window_dates = []
+        for i_period, period_bound in enumerate(constraint.bound):
+            period_start, period_end = constraint.dates[i_period], constraint.dates[i_period + 1]
+            kept_start, kept_end = max(period_start, window.start), min(period_end, window.kept_end)
+            if kept_start >= kept_end:
+                continue
+            window_bound.append(period_bound * (kept_end - kept_start) / (period_end - period_start))
+            window_dates.append(kept_start)
+        if len(window_bound) == 0:
+            continue
+        window_dates.append(min(constraint.dates[-1], window.kept_end))
+        window_constraints.append(replace(constraint, bound=np.array(window_bound), dates=window_dates))
+    return window_constraints
+
+
+@dataclass
+class RollingHorizonWindowResult:
+    window: RollingHorizonWindow
+    kept_solution: UCOptimalSolution  # without ring guard days
+    snapshot_weightings: pd.Series  # of the kept snapshots
+    cost: float  # of the kept part
+    init_soc: Dict[str, float]  # initial SOC of the storage units handed off from previous window
+
+
+def get_final_soc(uc_opt_solution: UCOptimalSolution) -> Dict[str, float]:
+    """
+    SOC of storage units at the end of the (kept part of a) solution
+    """
+    if uc_opt_solution.storage_soc is None or len(uc_opt_solution.storage_soc) == 0:
+        return {}
+    return {unit_name: float(soc) for unit_name, soc in uc_opt_solution.storage_soc.iloc[-1].items()}
+
+
+def get_cyclic_units_init_soc(network: pypsa.Network) -> Dict[str, float]:
+    """
+    Initial SOC of the storage units with cyclic SOC of a solved network, i.e. their SOC at its last snapshot
+    """
+    storage_units = network.storage_units
+    cyclic_units = storage_units.index[storage_units.cyclic_state_of_charge.astype(bool)]
+    if len(cyclic_units) == 0:
+        return {}
+    last_soc = network.storage_units_t.state_of_charge.iloc[-1]
+    return {unit_name: float(last_soc[unit_name]) for unit_name in cyclic_units}
+
+
+def get_handed_off_init_soc(network: pypsa.Network) -> Dict[str, float]:
+    """
+    Initial SOC of the storage units without cyclic SOC of a network - e.g. handed off from previous window
+    """
+    storage_units = network.storage_units
+    storage_units = storage_units[~storage_units.cyclic_state_of_charge.astype(bool)]
+    return {unit_name: float(soc) for unit_name, soc in storage_units.state_of_charge_initial.items()}
+
+
+def set_storage_init_soc(generation_units_data: GEN_UNITS_DATA_TYPE, init_soc: Dict[str, float]):
+    """
+    Set initial SOC of storage units, e.g. with the final one of previous rolling horizon window. N.B. cyclic SOC
+    deactivated for these units, otherwise PyPSA ignores initial SOC
+    """
+    units_with_init_soc = []
+    for units_data in generation_units_data.values():
+        for unit_data in units_data:
+            if unit_data.name in init_soc:
+                unit_data.state_of_charge_initial = init_soc[unit_data.name]
+                unit_data.cyclic_state_of_charge = False
+                units_with_init_soc.append(unit_data.name)
+    missing_units = set(init_soc) - set(units_with_init_soc)
+    if len(missing_units) > 0:
+        logging.warning(f'Storage units {sorted(missing_units)} of previous window not in generation units data '
+                        f'-> final SOC not handed off')
+
+
+
+def set_storage_final_soc(generation_units_data: GEN_UNITS_DATA_TYPE, final_soc: Dict[str, float],
+                          n_time_slots: int):
+    """
+    Set final SOC target of storage units - e.g. for the last rolling horizon window, with the initial SOC of the
+    first one, as with cyclic SOC over the full period. Target removed for the units not in final_soc
+    :param n_time_slots: of the optimisation period, target being set at the last one
+    """
+    for units_data in generation_units_data.values():
+        for unit_data in units_data:
+            if unit_data.name in final_soc:
+                soc_set = np.full(n_time_slots, np.nan)
+                soc_set[-1] = final_soc[unit_data.name]
+                unit_data.state_of_charge_set = soc_set
+            else:
+                unit_data.state_of_charge_set = None
@@ -52,6 +52,10 @@ class Timeseries:
         if self.dates is not None:
             logging.warning(f'Timeseries dates will be overwritten based on period start/end '
                             f'and timescale {self.timescale}')
+        # whole period "granularity": a single value, for [period_start, period_end[
+        if self.timescale == WHOLE_PERIOD_GRANULARITY:
+            self.dates = [period_start, period_end]
+            return
         if self.timescale in [Timescale.day, Timescale.week]:
             period_start_day = datetime(year=period_start.year, month=period_start.month, day=period_start.day)
             period_end_day = datetime(year=period_end.year, month=period_end.month, day=period_end.day)
@@ -91,6 +95,9 @@ class Timeseries:
         :param period_start: start of the period (included)
         :param period_end: end of the period, NOT included
         """
+        # whole period "granularity": single value, already for the full period
+        if self.timescale == WHOLE_PERIOD_GRANULARITY:
+            return
         if self.timescale == Timescale.day:
             start_hour = period_start.hour
             if start_hour > 0:
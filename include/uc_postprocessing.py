@@ -2,6 +2,7 @@ import logging
 import warnings
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass, asdict
 from typing import Dict, List, Union, Optional
@@ -12,11 +13,12 @@ from matplotlib import pyplot as plt
 from common.constants.countries import set_country_trigram
 from common.constants.prod_types import STOCK_LIKE_PROD_TYPES, ProdTypeNames, add_suffix_to_storage_unit_col, \
     get_prod_type_from_unit_name, set_gen_unit_name
-from common.long_term_uc_io import FigNamesPrefix, get_output_figure, get_figure_file_named, get_opt_power_file, \
-    get_storage_opt_dec_file, get_marginal_prices_file, get_link_flow_opt_dec_file, get_uc_summary_file
+from common.long_term_uc_io import FigNamesPrefix, get_output_figure, get_figure_file_named, get_uc_summary_file, \
+    UC_RESULT_FAMILIES, UC_RESULT_FILE_FORMATS
 from common.plot_params import PlotParams
 from utils.basic_utils import format_with_spaces, get_default_values, dict_to_str
 from utils.df_utils import rename_df_columns, sort_out_cols_with_zero_values
+from utils.uc_results_writer import get_uc_result_writer
 
 
 OUTPUT_DATE_COL = 'date'
@@ -91,10 +93,10 @@ def set_col_order_for_plot(df: pd.DataFrame, cols_ordered: List[str], is_prod_ty
 
 
 def set_full_cols_for_storage_df(df: pd.DataFrame, col_suffix: str) -> pd.DataFrame:
-    old_cols = list(df.columns)
-    new_cols = {col: f'{col}_{col_suffix}' for col in old_cols}
-    df = rename_df_columns(df=df, old_to_new_cols=new_cols)
-    return df
+    """
+    N.B. df not modified (columns renamed in returned df)
+    """
+    return df.add_suffix(f'_{col_suffix}')
 
 
 @dataclass
@@ -146,6 +148,23 @@ class UCSummaryMetrics:
                  f'{dict_to_str(d=self.per_country_co2_emissions, nbers_with_spaces=True)}')
         return uc_summary_metrics_str
 
+    def to_flat_dict(self) -> Dict[str, float]:
+        """
+        Flat version of the metrics - per country ones with {metric}_{country} keys (e.g., ens_france), to be
+        a row of a table gathering the metrics of multiple UC cases
+        """
+        per_country_prefix = 'per_country_'
+        flat_dict = {}
+        for key, val in asdict(self).items():
+            if val is None:
+                continue
+            if key.startswith(per_country_prefix):
+                metric_name = key[len(per_country_prefix):]
+                flat_dict |= {f'{metric_name}_{country}': country_val for country, country_val in val.items()}
+            else:
+                flat_dict[key] = val
+        return flat_dict
+
     def json_dump(self, year: int, climatic_year: int, start_horizon: datetime, country: str = 'europe',
                   toy_model_output: bool = False):
         summary_dict = asdict(self)
@@ -191,6 +210,48 @@ class UCOptimalSolution:
         self.sde_dual: pd.DataFrame = None
         self.link_capa_dual: pd.DataFrame = None
 
+    def get_df_attr_names(self) -> List[str]:
+        return [attr_name for attr_name, val in self.__dict__.items() if isinstance(val, pd.DataFrame)]
+
+    def select_period(self, start: datetime, end: datetime) -> 'UCOptimalSolution':
+        """
+        Copy of this solution restricted to the snapshots in [start, end) - e.g., to remove the "ring guard" days
+        of a rolling horizon window
+        """
+        uc_opt_solution = UCOptimalSolution(network_name=self.name)
+        for attr_name in self.get_df_attr_names():
+            df = getattr(self, attr_name)
+            setattr(uc_opt_solution, attr_name, df[(start <= df.index) & (df.index < end)].copy())
+        return uc_opt_solution
+
+    def get_weighted_prod_per_unit(self, snapshot_weightings: pd.Series) -> np.ndarray:
+        """
+        Sum over snapshots of weighted production of each unit (column of prod), in a single matrix product
+        (snapshot weights @ prod), on the NumPy values of the prod. df (not copied)
+        """
+        snapshot_weights = snapshot_weightings.reindex(self.prod.index).to_numpy()
+        return snapshot_weights @ self.prod.to_numpy()
+
+    def get_prod_unit_country_idx(self, countries: List[str]) -> np.ndarray:
+        """
+        Idx in countries of the country (bus) of each prod. unit - from its name prefix -, -1 if not in countries
+        """
+        unit_buses = self.prod.columns.str.split('_').str[0]
+        return pd.Index(countries).get_indexer(unit_buses)
+
+    def calc_total_cost(self, snapshot_weightings: pd.Series, gen_marginal_costs: pd.Series,
+                        storage_marginal_costs: pd.Series) -> float:
+        """
+        Total cost of generators and storage units dispatch - i.e. objective value of UC pb, but that can be
+        calculated on a sub-period
+        """
+        gen_cost = self.get_weighted_prod_per_unit(snapshot_weightings=snapshot_weightings) \
+            @ gen_marginal_costs.reindex(self.prod.columns).fillna(0).to_numpy()
+        storage_weights = snapshot_weightings.reindex(self.storage_prod.index).to_numpy()
+        storage_cost = (storage_weights @ self.storage_prod.to_numpy()) \
+            @ storage_marginal_costs.reindex(self.storage_prod.columns).fillna(0).to_numpy()
+        return float(gen_cost + storage_cost)
+
     def get_prod_var_opt(self, network: pypsa.Network):
         self.prod = network.generators_t.p
 
@@ -248,6 +309,9 @@ class UCOptimalSolution:
                                                   is_prod_type_cols=True, stock_cons_first=True)
             if rm_all_zero_curves:
                 current_prod = sort_out_cols_with_zero_values(df=current_prod, abs_val_threshold=1e-2)
+            # values of solver precision order (e.g., -1e-8 storage prod.) set to 0, as stacked plot needs curves
+            # with a unique sign
+            current_prod = current_prod.mask(current_prod.abs() < 1e-2, 0)
             # TODO: put alpha into plot_params.json
             current_prod.div(1e3).plot.area(subplots=False, ylabel='GW', color=plot_params_agg_pt.per_case_color,
                                             alpha=0.3)
@@ -319,73 +383,59 @@ class UCOptimalSolution:
                         )
             plt.close()
 
-    def save_decisions_to_csv(self, year: int, climatic_year: int, start_horizon: datetime,
-                              rename_snapshot_col: bool = True, toy_model_output: bool = False,
-                              country: str = 'europe'):
+    def set_decisions_dfs(self, rename_snapshot_col: bool = True) -> Dict[str, pd.DataFrame]:
+        """
+        Optimal decisions dfs to be saved, per result family - solution dfs not modified
+        """
         # TODO: check if unique country and in this case (i) suppress country prefix in asset names
         # opt prod decisions for all but Storage assets
-        opt_p_csv_file = get_opt_power_file(country=country, year=year, climatic_year=climatic_year,
-                                            start_horizon=start_horizon, toy_model_output=toy_model_output)
-        logging.info(f'Save - all but Storage assets - optimal dispatch decisions to csv file {opt_p_csv_file}')
-        df_prod_opt = self.prod
-        if rename_snapshot_col:
-            df_prod_opt.index.name = OUTPUT_DATE_COL
-        # cast to int to avoid useless numeric precisions and associated... issues!
-        df_prod_opt = df_prod_opt.astype(int)
-        df_prod_opt.to_csv(opt_p_csv_file)
-        # then storage assets decisions
-        storage_opt_dec_csv_file = \
-            get_storage_opt_dec_file(country=country, year=year, climatic_year=climatic_year,
-                                     start_horizon=start_horizon, toy_model_output=toy_model_output)
-        logging.info(f'Save Storage optimal decisions to csv file {storage_opt_dec_csv_file}')
-        # join the 3 Storage result dfs
-        df_prod_opt = self.storage_prod
-        df_cons_opt = self.storage_cons
-        df_soc_opt = self.storage_soc
-        # rename first the different columns -> adding prod/cons/soc suffixes
-        df_prod_opt = set_full_cols_for_storage_df(df=df_prod_opt, col_suffix='prod')
-        df_cons_opt = set_full_cols_for_storage_df(df=df_cons_opt, col_suffix='cons')
-        df_soc_opt = set_full_cols_for_storage_df(df=df_soc_opt, col_suffix='soc')
-        df_storage_all_decs = df_prod_opt.join(df_cons_opt).join(df_soc_opt)
-        if rename_snapshot_col:
-            df_storage_all_decs.index.name = OUTPUT_DATE_COL
         # cast to int to avoid useless numeric precisions and associated... issues!
-        df_storage_all_decs = df_storage_all_decs.astype(int)
-        df_storage_all_decs.to_csv(storage_opt_dec_csv_file)
-        # and finally link flow decisions
-        link_flow_opt_dec_csv_file = \
-            get_link_flow_opt_dec_file(country=country, year=year, climatic_year=climatic_year,
-                                       start_horizon=start_horizon, toy_model_output=toy_model_output)
-        logging.info(f'Save link flow optimal decisions to csv file {link_flow_opt_dec_csv_file}')
-        df_link_flow_opt_direct = self.link_flow_direct
-        df_link_flow_opt_reverse = self.link_flow_reverse
-        # add reverse suffix to reverse flows
+        df_prod_opt = self.prod.astype(int)
+        # then storage assets decisions: join the 3 Storage result dfs, renaming first the different columns
+        # -> adding prod/cons/soc suffixes
+        df_storage_all_decs = (set_full_cols_for_storage_df(df=self.storage_prod, col_suffix='prod')
+                               .join(set_full_cols_for_storage_df(df=self.storage_cons, col_suffix='cons'))
+                               .join(set_full_cols_for_storage_df(df=self.storage_soc, col_suffix='soc'))
+                               .astype(int))
+        # and finally link flow decisions, adding reverse suffix to reverse flows
         new_cols = []
-        for flow_col in df_link_flow_opt_reverse.columns:
+        for flow_col in self.link_flow_reverse.columns:
             flow_col_split = flow_col.split('_')
             new_cols.append(f'{flow_col_split[0]}-reverse_{flow_col_split[1]}')
-        df_link_flow_opt_reverse.columns = new_cols
-        df_link_flow_opt = pd.concat([df_link_flow_opt_direct, df_link_flow_opt_reverse], axis=1)
-        if rename_snapshot_col:
-            df_link_flow_opt.index.name = OUTPUT_DATE_COL
-        # cast to int to avoid useless numeric precisions and associated... issues!
-        df_link_flow_opt = df_link_flow_opt.astype(int)
-        df_link_flow_opt.to_csv(link_flow_opt_dec_csv_file)
-
-    def save_marginal_prices_to_csv(self, year: int, climatic_year: int, start_horizon: datetime,
-                                    rename_snapshot_col: bool = True, toy_model_output: bool = False,
-                                    country: str = 'europe'):
-        logging.info('Save marginal prices decisions to .csv file')
-        marginal_prices_csv_file = get_marginal_prices_file(country=country, year=year,
-                                                            climatic_year=climatic_year,
-                                                            start_horizon=start_horizon,
-                                                            toy_model_output=toy_model_output)
-        df_sde_dual_var_opt = self.sde_dual
+        df_link_flow_opt = pd.DataFrame(np.hstack([self.link_flow_direct.to_numpy(),
+                                                   self.link_flow_reverse.to_numpy()]).astype(int),
+                                        index=self.link_flow_direct.index,
+                                        columns=list(self.link_flow_direct.columns) + new_cols)
+        decisions_dfs = {UC_RESULT_FAMILIES.opt_power: df_prod_opt,
+                         UC_RESULT_FAMILIES.storage_opt_decisions: df_storage_all_decs,
+                         UC_RESULT_FAMILIES.link_flow_opt_decisions: df_link_flow_opt}
         if rename_snapshot_col:
-            df_sde_dual_var_opt.index.name = OUTPUT_DATE_COL
+            for df in decisions_dfs.values():
+                df.index.name = OUTPUT_DATE_COL
+        return decisions_dfs
+
+    def set_marginal_prices_df(self, rename_snapshot_col: bool = True) -> pd.DataFrame:
         # do NOT cast this df, given that price values can be accurate at some decimals
         # -> may be useful to observe the correspondence with (input) marginal cost values
-        df_sde_dual_var_opt.to_csv(marginal_prices_csv_file)
+        if rename_snapshot_col:
+            return self.sde_dual.rename_axis(index=OUTPUT_DATE_COL)
+        return self.sde_dual
+
+    def save_results(self, year: int, climatic_year: int, start_horizon: datetime, rename_snapshot_col: bool = True,
+                     toy_model_output: bool = False, country: str = 'europe',
+                     file_format: str = UC_RESULT_FILE_FORMATS.csv):
+        """
+        Save optimal decisions (prod., storage, link flows) and marginal prices, all with the same writer
+        :param file_format: csv (one file per result family), or parquet (single partitioned dataset for all
+        runs, e.g. for batch runs)
+        """
+        result_writer = get_uc_result_writer(file_format=file_format, country=country, year=year,
+                                             climatic_year=climatic_year, start_horizon=start_horizon,
+                                             toy_model_output=toy_model_output)
+        results = self.set_decisions_dfs(rename_snapshot_col=rename_snapshot_col)
+        results[UC_RESULT_FAMILIES.marginal_prices] = \
+            self.set_marginal_prices_df(rename_snapshot_col=rename_snapshot_col)
+        result_writer.write_all(results=results)
 
     def get_prod_given_bus(self, bus_name: str) -> Optional[pd.DataFrame]:
         if self.prod is None:
@@ -396,22 +446,38 @@ class UCOptimalSolution:
         current_cols = [col for col in self.prod.columns if col.startswith(prod_unit_prefix)]
         return self.prod[current_cols]
 
+    def calc_per_country_sum(self, countries: List[str], unit_values: np.ndarray,
+                             country_idx: np.ndarray = None) -> Dict[str, float]:
+        """
+        Sum of per-unit values grouped by country (bus) of the units
+        """
+        if country_idx is None:
+            country_idx = self.get_prod_unit_country_idx(countries=countries)
+        is_in_countries = country_idx >= 0
+        per_country_sum = np.bincount(country_idx[is_in_countries], weights=unit_values[is_in_countries],
+                                      minlength=len(countries))
+        return {country: float(val) for country, val in zip(countries, per_country_sum)}
+
     def calc_co2_emissions(self, countries: List[str], snapshot_weightings: pd.DataFrame, co2_emi_factors: pd.DataFrame,
-                           per_country: bool = False) \
-            -> Union[float, Dict[str, float]]:
+                           per_country: bool = False, weighted_prod: np.ndarray = None,
+                           country_idx: np.ndarray = None) -> Union[float, Dict[str, float]]:
+        """
+        :param weighted_prod: weighted production per unit - see get_weighted_prod_per_unit -, to avoid
+        calculating it again if already done
+        :param country_idx: country idx of prod. units - see get_prod_unit_country_idx -, idem
+        """
+        if weighted_prod is None:
+            weighted_prod = self.get_weighted_prod_per_unit(snapshot_weightings=snapshot_weightings)
+        # units with no CO2 emission factor (carrier without it) are not emitting
+        unit_co2_emissions = weighted_prod * co2_emi_factors.reindex(self.prod.columns).fillna(0).to_numpy()
         if per_country:
-            per_country_co2_emissions = {}
-            for country in countries:
-                current_prod_var_opt = self.get_prod_given_bus(bus_name=country)
-                per_country_co2_emissions[country] = (
-                    float(current_prod_var_opt.multiply(snapshot_weightings, axis=0)
-                          .multiply(co2_emi_factors, axis=1).sum().sum())
-                )
-            return per_country_co2_emissions
-        return self.prod.multiply(snapshot_weightings, axis=0).multiply(co2_emi_factors, axis=1).sum().sum()
+            return self.calc_per_country_sum(countries=countries, unit_values=unit_co2_emissions,
+                                             country_idx=country_idx)
+        return float(unit_co2_emissions.sum())
 
     def calc_per_country_total_cost(self, countries: List[str], snapshot_weightings: pd.DataFrame,
-                                    marginal_costs: pd.DataFrame, is_operational_cost: bool = False) \
+                                    marginal_costs: pd.DataFrame, is_operational_cost: bool = False,
+                                    weighted_prod: np.ndarray = None, country_idx: np.ndarray = None) \
             -> Dict[str, float]:
         """
         Calculate per-country (bus) total cost over the considered horizon: sum_t sum_{prod unit i} marginal
@@ -420,54 +486,62 @@ class UCOptimalSolution:
         :param snapshot_weightings: weights of the different "snapshots" (time-slots in PyPSA terminology)
         :param marginal_costs: of different prod. types considered
         :param is_operational_cost: in this case do not integrate failure penalty cost in this calculation
+        :param weighted_prod: weighted production per unit, if already calculated
+        :param country_idx: country idx of prod. units, if already calculated
         """
-        per_country_total_cost = {}
-        for country in countries:
-            current_prod_var_opt = self.get_prod_given_bus(bus_name=country)
-            if is_operational_cost:
-                # drop failure column from df TODO: set failure column name from constants (functions)
-                current_prod_var_opt = current_prod_var_opt.drop(f'{country}_failure', axis=1)
-            per_country_total_cost[country] = (
-                float(current_prod_var_opt.multiply(snapshot_weightings, axis=0)
-                      .multiply(marginal_costs, axis=1).sum().sum())
-            )
-        return per_country_total_cost
+        if weighted_prod is None:
+            weighted_prod = self.get_weighted_prod_per_unit(snapshot_weightings=snapshot_weightings)
+        unit_costs = weighted_prod * marginal_costs.reindex(self.prod.columns).fillna(0).to_numpy()
+        if is_operational_cost:
+            # failure units not accounted for TODO: set failure column name from constants (functions)
+            unit_costs = np.where(self.prod.columns.str.endswith('_failure'), 0, unit_costs)
+        return self.calc_per_country_sum(countries=countries, unit_values=unit_costs, country_idx=country_idx)
 
     def set_uc_summary_metrics(self, network: pypsa.Network, total_cost: float,
-                               failure_penalty: float = None) -> UCSummaryMetrics:
+                               failure_penalty: float = None, snapshot_weightings: pd.Series = None) \
+            -> UCSummaryMetrics:
+        """
+        N.B. snapshot_weightings to be provided if solution is not on the snapshots of network (e.g., stitched
+        rolling horizon solution); by default, the ones of network
+        """
         logging.info('Set UC summary metrics')
-        failure_prod_cols = [col for col in self.prod.columns if col.endswith('_failure')]
-        df_failure_opt = self.prod[failure_prod_cols]
-        per_country_ens = {key: float(val) for key, val in dict(df_failure_opt.sum()).items()}
-        per_country_n_failure_h = {key: int(val) for key, val in dict((df_failure_opt > 0).sum(axis=0)).items()}
-        # remove '_failure' suffix from two previous dict. keys
-        per_country_ens = {key.split('_')[0]: val for key, val in per_country_ens.items()}
-        per_country_n_failure_h = {key.split('_')[0]: val for key, val in per_country_n_failure_h.items()}
+        if snapshot_weightings is None:
+            snapshot_weightings = network.snapshot_weightings.generators
+        is_failure_col = self.prod.columns.str.endswith('_failure')
+        failure_countries = [col.split('_')[0] for col in self.prod.columns[is_failure_col]]
+        failure_opt = self.prod.to_numpy()[:, is_failure_col]
+        per_country_ens = dict(zip(failure_countries, failure_opt.sum(axis=0).tolist()))
+        per_country_n_failure_h = dict(zip(failure_countries, (failure_opt > 0).sum(axis=0).tolist()))
         if failure_penalty is not None:
             eur_failure_volume = sum(per_country_ens.values())
             eur_total_ope_cost = total_cost - failure_penalty * eur_failure_volume
         else:
             eur_total_ope_cost = None
-        # co2 emissions
+        # co2 emissions and costs, from weighted prod. per unit - calculated once - grouped by country
         countries = list(set(network.buses.index))
+        weighted_prod = self.get_weighted_prod_per_unit(snapshot_weightings=snapshot_weightings)
+        country_idx = self.get_prod_unit_country_idx(countries=countries)
         co2_emi_factors = network.generators.carrier.map(network.carriers.co2_emissions)
-        total_co2_emissions = (
-            self.calc_co2_emissions(countries=countries, snapshot_weightings=network.snapshot_weightings.generators,
-                                    co2_emi_factors=co2_emi_factors)
-        )
         per_country_co2_emissions = (
-            self.calc_co2_emissions(countries=countries, snapshot_weightings=network.snapshot_weightings.generators,
-                                    co2_emi_factors=co2_emi_factors, per_country=True)
+            self.calc_co2_emissions(countries=countries, snapshot_weightings=snapshot_weightings,
+                                    co2_emi_factors=co2_emi_factors, per_country=True, weighted_prod=weighted_prod,
+                                    country_idx=country_idx)
+        )
+        total_co2_emissions = (
+            self.calc_co2_emissions(countries=countries, snapshot_weightings=snapshot_weightings,
+                                    co2_emi_factors=co2_emi_factors, weighted_prod=weighted_prod)
         )
         per_country_total_cost = (
             self.calc_per_country_total_cost(countries=countries,
-                                             snapshot_weightings=network.snapshot_weightings.generators,
-                                             marginal_costs=network.generators.marginal_cost)
+                                             snapshot_weightings=snapshot_weightings,
+                                             marginal_costs=network.generators.marginal_cost,
+                                             weighted_prod=weighted_prod, country_idx=country_idx)
         )
         per_country_total_operational_cost = (
             self.calc_per_country_total_cost(countries=countries,
-                                             snapshot_weightings=network.snapshot_weightings.generators,
-                                             marginal_costs=network.generators.marginal_cost, is_operational_cost=True)
+                                             snapshot_weightings=snapshot_weightings,
+                                             marginal_costs=network.generators.marginal_cost, is_operational_cost=True,
+                                             weighted_prod=weighted_prod, country_idx=country_idx)
         )
         # attention convert to GWh/M€ and int to get smaller values for synthesis. TODO: check CO2 emissions unit!
         cost_conversion_factor = 1e-6
@@ -483,3 +557,23 @@ class UCOptimalSolution:
                                                 for c, val in per_country_total_operational_cost.items()},
             per_country_co2_emissions={c: int(val * co2_emis_conversion_factor) for
                                        c, val in per_country_co2_emissions.items()})
+
+
+def concat_uc_opt_solutions(uc_opt_solutions: List[UCOptimalSolution]) -> UCOptimalSolution:
+    """
+    Stitch solutions of successive (non-overlapping) periods into one. N.B. the set of units can vary from one
+    period to another (e.g., hydro unit modeled as a generator or a storage depending on data over the period)
+    -> zero values set for a unit over the periods where it is not in a solution df
+    """
+    uc_opt_solution = UCOptimalSolution(network_name=uc_opt_solutions[0].name)
+    for attr_name in uc_opt_solutions[0].get_df_attr_names():
+        dfs = [getattr(elt, attr_name) for elt in uc_opt_solutions]
+        all_cols = set().union(*[df.columns for df in dfs])
+        partial_cols = all_cols - set.intersection(*[set(df.columns) for df in dfs])
+        df_concat = pd.concat(dfs)
+        if len(partial_cols) > 0:
+            logging.info(f'Columns {sorted(partial_cols)} of {attr_name} not in all stitched solutions '
+                         f'-> set to 0 where missing')
+            df_concat[list(partial_cols)] = df_concat[list(partial_cols)].fillna(0)
+        setattr(uc_opt_solution, attr_name, df_concat)
+    return uc_opt_solution
@@ -11,9 +11,14 @@ from common.constants.data_analysis_types import COMMON_PLOT_YEAR
 from common.constants.datatypes import PLOT_YLABEL_PER_DT
 from common.plot_params import PlotParams
 from utils.basic_utils import set_years_suffix, CLIM_YEARS_SUFFIX
+from utils.climatic_years_tensor import ClimaticYearsTensor
 from utils.dates import set_year_in_date, set_temporal_period_str
 from utils.df_utils import set_key_columns
 from utils.plot import simple_plot, set_temporal_period_title, FigureStyle, set_curve_style_attrs, CurveStyleAttrs
+from utils.rolling_avg import calc_rolling_avg_of_series
+from utils.ts_statistics import calc_duration_curve, calc_ts_stats, TimeseriesStats, DURATION_CURVE_N_POINTS_MAX, \
+    N_TOP_SLOTS_DEFAULT, QUANTILE_LEVELS_DEFAULT
+from utils.write import json_dump
 
 NAME_SEP = '_'
 SUBNAME_SEP = '-'
@@ -136,6 +141,22 @@ class UCTimeseries:
         if unit is not None:
             self.unit = unit
 
+    def set_case_from_cy_tensor(self, case_key: Tuple[str, int, int, Optional[int], Optional[str]],
+                                cy_tensor: ClimaticYearsTensor):
+        """
+        Set dates and values of a (country, year, clim year, extra-params idx, agg. pt) case directly from the
+        (climatic year x date) tensor of its (country, year, agg. pt) - values being a view on a tensor row
+        """
+        _, year, climatic_year = case_key[:3]
+        if not cy_tensor.has_climatic_year(climatic_year=climatic_year):
+            raise KeyError(f'Climatic year {climatic_year} not in tensor data')
+        if self.dates is None:
+            self.dates = {}
+        if self.values is None:
+            self.values = {}
+        self.dates[case_key] = cy_tensor.get_dates_in_year(year=year)
+        self.values[case_key] = cy_tensor.get_cy_values(climatic_year=climatic_year)
+
     def set_output_dates(self, is_plot: bool) -> Union[List[int], List[datetime]]:
         # per (country, year, clim year, extra-params case, agg. pt) values
         if isinstance(self.values, dict):
@@ -172,10 +193,9 @@ class UCTimeseries:
         # per (country, year, clim year) values
         if isinstance(self.values, dict):
             # saving to csv file -> concatenate the values of all (country, year, clim year, ...) cases
+            # (in a single array, not to have a Python object per value)
             if not is_plot:
-                output_vals = []
-                for key, vals in self.values.items():
-                    output_vals.extend(vals)
+                output_vals = np.concatenate([np.asarray(vals) for vals in self.values.values()])
             # plot -> dict. except if of length 1 and not treated before...
             # TODO: manage it more properly before (normally should be the case for RES CF plot
             #  with unique agg prod type selected)
@@ -247,6 +267,61 @@ class UCTimeseries:
                 del df_to_csv[col]
         df_to_csv.to_csv(output_file, index=None)
 
+    def calc_stats(self, quantile_levels: Tuple[float, ...] = QUANTILE_LEVELS_DEFAULT,
+                   n_duration_points_max: int = DURATION_CURVE_N_POINTS_MAX, n_top: int = N_TOP_SLOTS_DEFAULT) \
+            -> Union[TimeseriesStats, Dict[tuple, TimeseriesStats]]:
+        """
+        Calculate statistics (quantiles, duration curve, ramps, top-N time-slots) of the timeseries - per
+        (country, year, clim year, extra-params case, agg. pt) if multiple cases -, by chunks of values
+        """
+        stats_params = {'quantile_levels': quantile_levels, 'n_duration_points_max': n_duration_points_max,
+                        'n_top': n_top}
+        if isinstance(self.values, dict):
+            return {key: calc_ts_stats(values=np.asarray(vals), **stats_params) for key, vals in self.values.items()}
+        return calc_ts_stats(values=np.asarray(self.values), **stats_params)
+
+    def stats_to_json(self, output_dir: str, extra_params_labels: Dict[int, str] = None,
+                      dt_suffix_for_output: str = None, with_duration_curve: bool = True, **stats_params):
+        """
+        Save statistics of the timeseries - summary arrays only, not its values - in a JSON file
+        :param output_dir: in which JSON file must be saved
+        :param extra_params_labels: {idx: label} corresp. for extra-parameters (no corresp. for None extra-params)
+        :param dt_suffix_for_output: suffix to be added to datatype in output files to identify them in specific cases
+        :param with_duration_curve: save (possibly downsampled) duration curves?
+        :param stats_params: to be passed to calc_stats
+        """
+        ts_stats = self.calc_stats(**stats_params)
+        if isinstance(ts_stats, dict):
+            column_names = ['country', 'year', 'climatic_year', 'extra_params', 'aggreg_prod_type']
+            stats_data = []
+            for key, case_stats in ts_stats.items():
+                # extra-params idx replaced by label, if not None (idx kept if no labels provided)
+                key_vals = list(key)
+                if key_vals[-2] is not None and extra_params_labels is not None:
+                    key_vals[-2] = extra_params_labels[key_vals[-2]]
+                case_dict = {col: val for col, val in zip(column_names, key_vals) if val is not None}
+                case_dict |= case_stats.to_dict(dates=self.dates[key] if isinstance(self.dates, dict) else None,
+                                                with_duration_curve=with_duration_curve)
+                stats_data.append(case_dict)
+            all_dates = None
+            if isinstance(self.dates, dict):
+                all_dates = [elt_date for dates_val in self.dates.values() if len(dates_val) > 0
+                             for elt_date in (min(dates_val), max(dates_val))]
+        else:
+            stats_data = [ts_stats.to_dict(dates=self.dates, with_duration_curve=with_duration_curve)]
+            all_dates = self.dates
+        if all_dates is not None and len(all_dates) > 0:
+            temp_period_str = set_temporal_period_str(min_date=min(all_dates), max_date=max(all_dates),
+                                                      print_year=False, date_sep='-')
+            temp_period_suffix = f'_{temp_period_str}'
+        else:
+            temp_period_suffix = ''
+        name_with_added_suffix = self.get_name_with_added_dt_suffix(data_type_suffix=dt_suffix_for_output)
+        output_file = os.path.join(output_dir, f'{name_with_added_suffix.lower()}{temp_period_suffix}_stats.json')
+        logging.info(f'Save statistics of {self.name} ({len(stats_data)} case(s)) in {output_file}')
+        json_dump(data={'data_type': self.data_type, 'unit': self.unit, 'stats': stats_data}, filepath=output_file,
+                  options={'indent': 2})
+
     def set_plot_ylabel(self) -> str:
         ylabel = PLOT_YLABEL_PER_DT[self.data_type]
         if self.unit is not None:
@@ -326,7 +401,8 @@ class UCTimeseries:
         return curve_style_attrs
 
     def plot(self, output_dir: str, fig_style: FigureStyle = None, per_dim_plot_params: Dict[str, PlotParams] = None,
-             extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None):
+             extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None,
+             title_prefix: str = None):
         """
         Plot (UC) timeseries
         :param output_dir: in which figure will be saved
@@ -335,6 +411,7 @@ class UCTimeseries:
         defined in plot_params.json file)
         :param extra_params_labels: corresp. between extra. parameters index and labels
         :param dt_suffix_for_output: suffix to be added to datatype in output files to identify them in specific cases
+        :param title_prefix: to be added before temporal period in plot title
         """
         # get name with added suffix to identify this specific file
         name_with_added_dt_suffix = self.get_name_with_added_dt_suffix(data_type_suffix=dt_suffix_for_output)
@@ -354,12 +431,13 @@ class UCTimeseries:
         # catch DeprecationWarnings TODO: fix/more robust way to catch them?
         with warnings.catch_warnings():
             warnings.simplefilter("ignore")
-            simple_plot(x=x, y=y, fig_file=fig_file, title=self.set_plot_title(), xlabel=xlabel,
+            simple_plot(x=x, y=y, fig_file=fig_file, title=self.set_plot_title(dt_suffix=title_prefix), xlabel=xlabel,
                         ylabel=self.set_plot_ylabel(), fig_style=fig_style, curve_style_attrs=curve_style_attrs)
 
     def plot_duration_curve(self, output_dir: str, as_a_percentage: bool = False, fig_style: FigureStyle = None,
                             per_dim_plot_params: Dict[str, PlotParams] = None,
-                            extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None):
+                            extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None,
+                            n_points_max: int = DURATION_CURVE_N_POINTS_MAX):
         """
         Plot (UC) timeseries duration curve(s)
         :param output_dir: in which figure will be saved
@@ -369,24 +447,28 @@ class UCTimeseries:
         defined in plot_params.json file)
         :param extra_params_labels: corresp. between extra. parameters index and labels
         :param dt_suffix_for_output: suffix to be added to datatype in output files to identify them in specific cases
+        :param n_points_max: max. number of points per duration curve, downsampled above (long horizons)
         """
         y = self.set_output_values(is_plot=True)
-        # sort values in descending order
+        # values in descending order - at (1-based) ranks downsampled if more than max. number of points
         # per (country, year, climatic year) values
         if isinstance(y, dict):
-            y_desc_order = {key: np.sort(vals)[::-1] for key, vals in y.items()}
+            ranks_and_desc_vals = {key: calc_duration_curve(values=np.asarray(vals), n_points_max=n_points_max)
+                                   for key, vals in y.items()}
             first_key = list(y)[0]
-            n_vals = len(y_desc_order[first_key])
+            ranks, _ = ranks_and_desc_vals[first_key]
+            n_vals = len(y[first_key])
+            y_desc_order = {key: desc_vals for key, (_, desc_vals) in ranks_and_desc_vals.items()}
             attrs_in_legend = self.set_attrs_in_plot_legend()
             y_desc_order = set_y_with_label_as_key(y=y_desc_order, extra_params_labels=extra_params_labels,
                                                    attrs_in_legend=attrs_in_legend)
         else:
-            y_desc_order = np.sort(y)[::-1]
-            n_vals = len(y_desc_order)
+            ranks, y_desc_order = calc_duration_curve(values=np.asarray(y), n_points_max=n_points_max)
+            n_vals = len(y)
         # this calculation is done assuming uniform time-slot duration
-        duration_curve = np.arange(1, n_vals + 1)
-        if as_a_percentage:
-            duration_curve = np.cumsum(duration_curve) / len(duration_curve)
+        duration_curve = ranks
+        if as_a_percentage:  # cumulated sum of ranks 1, ..., r at rank r
+            duration_curve = ranks * (ranks + 1) / 2 / n_vals
             xlabel = 'Duration (%)'
         else:
             xlabel = 'Duration (nber of time-slots - hours)'
@@ -409,8 +491,46 @@ class UCTimeseries:
                         title=f'{self.set_plot_title(dt_suffix="duration curve")}', xlabel=xlabel,
                         ylabel=self.set_plot_ylabel(), fig_style=fig_style, curve_style_attrs=curve_style_attrs)
 
-    def plot_rolling_horizon_avg(self):
-        bob = 1
+    def calc_rolling_horizon_avg(self, windows: List[int]) -> Dict[int, Union[np.ndarray, Dict[tuple, np.ndarray]]]:
+        """
+        Rolling horizon averages of the timeseries - of all (country, year, clim year, extra-params case, agg. pt)
+        cases at once, their values being stacked in a matrix
+        :param windows: lengths of the rolling windows, in number of time-slots
+        :returns {window: averages}, with averages per case if multiple ones
+        """
+        if isinstance(self.values, dict):
+            return calc_rolling_avg_of_series(series=self.values, windows=windows)
+        rolling_avgs = calc_rolling_avg_of_series(series={None: self.values}, windows=windows)
+        return {window: window_avgs[None] for window, window_avgs in rolling_avgs.items()}
+
+    def plot_rolling_horizon_avg(self, output_dir: str, windows: List[int], fig_style: FigureStyle = None,
+                                 per_dim_plot_params: Dict[str, PlotParams] = None,
+                                 extra_params_labels: Dict[int, str] = None, dt_suffix_for_output: str = None):
+        """
+        Plot (UC) timeseries rolling horizon averages - one figure per window
+        :param output_dir: in which figures will be saved
+        :param windows: lengths of the rolling windows, in number of time-slots (hours)
+        :param fig_style: FigureStyle object to define some style attrs for plot
+        :param per_dim_plot_params: per plot dimension (zone, year, climatic year) plot parameter values (the ones
+        defined in plot_params.json file)
+        :param extra_params_labels: corresp. between extra. parameters index and labels
+        :param dt_suffix_for_output: suffix to be added to datatype in output files to identify them in specific cases
+        """
+        n_slots = len(list(self.values.values())[0]) if isinstance(self.values, dict) else len(self.values)
+        windows_in_horizon = [window for window in windows if window <= n_slots]
+        if len(windows_in_horizon) < len(windows):
+            logging.warning(f'Rolling windows {[window for window in windows if window > n_slots]} longer than '
+                            f'horizon of data ({n_slots} time-slots) -> not plotted')
+        rolling_avgs = self.calc_rolling_horizon_avg(windows=windows_in_horizon)
+        for window, window_avgs in rolling_avgs.items():
+            rolling_avg_suffix = f'rolling-avg-{window}h'
+            current_dt_suffix = rolling_avg_suffix if dt_suffix_for_output is None \
+                else f'{dt_suffix_for_output}_{rolling_avg_suffix}'
+            rolling_avg_ts = UCTimeseries(name=self.name, data_type=self.data_type, values=window_avgs,
+                                          unit=self.unit, dates=self.dates)
+            rolling_avg_ts.plot(output_dir=output_dir, fig_style=fig_style, per_dim_plot_params=per_dim_plot_params,
+                                extra_params_labels=extra_params_labels, dt_suffix_for_output=current_dt_suffix,
+                                title_prefix=f'rolling avg. over {window}h')
 
 
 def list_of_uc_timeseries_to_df(uc_timeseries: List[UCTimeseries]) -> pd.DataFrame:
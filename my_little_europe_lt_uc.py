@@ -1,33 +1,43 @@
 import logging
 import os.path
+from copy import deepcopy
 from typing import Dict, Tuple, List, Optional
 
 import pandas as pd
+import pypsa
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from common.constants.datadims import DataDimensions
 from common.constants.extract_eraa_data import ERAADatasetDescr
-from common.constants.optimisation import OPTIM_RESOL_STATUS, DEFAULT_OPTIM_SOLVER_PARAMS, SolverParams
-from common.constants.plots import PlotNames
+from common.constants.optimisation import OPTIM_RESOL_STATUS, DEFAULT_OPTIM_SOLVER_PARAMS, MODEL_FILE_FORMATS, \
+    SolverParams
+from common.constants.plots import FIGURE_MODES, FigureModes
 from common.constants.usage_params_json import EnvPhaseNames
 from common.error_msgs import infeas_debugging_hints_msg
 from common.fuel_sources import set_fuel_sources_from_json, DUMMY_FUEL_SOURCES, FuelSource
 from common.logger import init_logger, stop_logger, deactivate_verbose_warnings, TITLE_LOG_SEP
-from common.long_term_uc_io import set_full_lt_uc_output_folder
+from common.long_term_uc_io import set_full_lt_uc_output_folder, get_uc_sweep_basis_file, get_uc_sweep_summary_file, \
+    UC_RESULT_FILE_FORMATS, get_uc_profile_file
 from common.plot_params import PlotParamsKeysInJson
 from common.uc_run_params import UCRunParams
 from include.dataset import Dataset
 from include.dataset_builder import PypsaModel
-from include.uc_postprocessing import UCSummaryMetrics
+from include.figure_jobs import FigureJobQueue, plot_pypsa_network, plot_uc_opt_solution_figures
+from include.param_sweep import UCSweepCase, get_changed_values
+from include.rolling_horizon import RollingHorizonParams, RollingHorizonWindowResult, get_cyclic_units_init_soc, \
+    get_final_soc, get_handed_off_init_soc, set_rolling_horizon_windows, set_storage_final_soc, set_storage_init_soc, \
+    set_window_sum_prod_constraints
+from include.uc_postprocessing import UCOptimalSolution, UCSummaryMetrics, concat_uc_opt_solutions
 from include_runner.overwrite_uc_run_params import apply_fixed_uc_run_params
-from utils.basic_utils import print_non_default
-from utils.dates import get_period_str
+from utils.basic_utils import get_default_values, print_non_default
+from utils.dates import get_period_str, set_target_year_in_period
+from utils.profiling import STAGE_PROFILER, profile_stage
 from utils.read import (read_and_check_uc_run_params, read_and_check_pypsa_static_params,
                         read_given_phase_specific_key_from_plot_params,
                         read_plot_params, read_usage_params, read_solver_params)
 
 
+@profile_stage(name='get_needed_eraa_data')
 def get_needed_eraa_data(uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr,
                          debug_mode: bool = False, debug_output_folder: str = None) -> Dataset:
     """
@@ -77,17 +87,18 @@ def check_min_pypsa_params_provided(eraa_dataset: Dataset):
         pypsa_min_unit_params_per_agg_pt=pypsa_static_params.min_unit_params_per_agg_pt)
 
 
+@profile_stage(name='create_pypsa_network_model')
 def create_pypsa_network_model(name: str, uc_run_params: UCRunParams, eraa_dataset: Dataset,
                                zones_gps_coords: Dict[str, Tuple[float, float]],
-                               fuel_sources: Dict[str, FuelSource]) -> PypsaModel:
+                               fuel_sources: Dict[str, FuelSource], plot_network: bool = True,
+                               figure_job_queue: FigureJobQueue = None) -> PypsaModel:
     logging.info(f'{TITLE_LOG_SEP} III) Create PyPSA UC model {TITLE_LOG_SEP}')
     pypsa_model = PypsaModel(name=name)
     date_idx = eraa_dataset.demand[uc_run_params.selected_countries[0]].index
-    horizon = pd.date_range(
-        start=uc_run_params.uc_period_start.replace(year=uc_run_params.selected_target_year),
-        end=uc_run_params.uc_period_end.replace(year=uc_run_params.selected_target_year),
-        freq='h'
-    )
+    horizon_start, horizon_end = set_target_year_in_period(period_start=uc_run_params.uc_period_start,
+                                                           period_end=uc_run_params.uc_period_end,
+                                                           target_year=uc_run_params.selected_target_year)
+    horizon = pd.date_range(start=horizon_start, end=horizon_end, freq='h')
     pypsa_model.init_pypsa_network(date_idx=date_idx, date_range=horizon)
     # add GPS coordinates
     selec_countries_gps_coords = \
@@ -102,7 +113,8 @@ def create_pypsa_network_model(name: str, uc_run_params: UCRunParams, eraa_datas
     with_hydro_custom_const = False  # TODO: set to True/make it a parameter when adding SOC min/max level in model
     with_sum_of_prod_custom_const = len(uc_run_params.sum_prod_constraints) > 0
     if with_hydro_custom_const or with_sum_of_prod_custom_const:
-        pypsa_model.build_model_before_adding_custom_const()
+        # linopy model built once here, custom constraints added to it and this same model then solved
+        pypsa_model.build_optim_model()
     if with_hydro_custom_const:
         # get reservoir extreme generation and level values, as well as energy capacities
         # (to see if constraints will be useless)
@@ -110,8 +122,11 @@ def create_pypsa_network_model(name: str, uc_run_params: UCRunParams, eraa_datas
         pypsa_model.add_hydro_extreme_levels_constraint(soc_min=hydro_soc_min, soc_max=hydro_soc_max,
                                                         energy_capa=hydro_e_capa)
     if with_sum_of_prod_custom_const:
-        pypsa_model.add_sum_of_prod_custom_const()
+        pypsa_model.add_sum_of_prod_custom_const(sum_prod_constraints=uc_run_params.sum_prod_constraints,
+                                                 target_year=uc_run_params.selected_target_year)
     logging.info(f'PyPSA network main properties: {pypsa_model.network}')
+    if not plot_network:
+        return pypsa_model
     # plot network  
     # name of current "phase" (of the course), the one associated to this script:
     # a multi-zone (Eur.) Unit Commitment model
@@ -121,13 +136,20 @@ def create_pypsa_network_model(name: str, uc_run_params: UCRunParams, eraa_datas
                                                        param_to_be_set=PlotParamsKeysInJson.fig_style)
     )
     print_non_default(obj=fig_style, obj_name=f'FigureStyle - for phase {phase_name}', log_level='debug')
-    pypsa_model.plot_network(toy_model_output=False)
+    with profile_stage(name='network figure'):
+        if figure_job_queue is None:
+            pypsa_model.plot_network(toy_model_output=False)
+        else:
+            # copy of network without timeseries (and linopy model) -> light to be sent to background process
+            figure_job_queue.submit(job_name='network figure', func=plot_pypsa_network,
+                                    network=pypsa_model.network.copy(with_time=False), name=pypsa_model.name)
     return pypsa_model
 
 
+@profile_stage(name='solve_pypsa_network_model')
 def solve_pypsa_network_model(pypsa_model: PypsaModel, year: int, n_countries: int, uc_period_start: datetime,
-                              solver_params: SolverParams = DEFAULT_OPTIM_SOLVER_PARAMS) \
-        -> Tuple[str, str]:
+                              solver_params: SolverParams = DEFAULT_OPTIM_SOLVER_PARAMS, save_lp_file: bool = True,
+                              model_file_format: str = MODEL_FILE_FORMATS.lp) -> Tuple[str, str]:
     """
     Solve PyPSA network (UC) model, using an optimisation solver
     :param pypsa_model: to be solved
@@ -135,12 +157,16 @@ def solve_pypsa_network_model(pypsa_model: PypsaModel, year: int, n_countries: i
     :param n_countries: in the considered network
     :param uc_period_start: date of the beginning of UC pb
     :param solver_params: name/license file, if not default solver (highs) used
+    :param save_lp_file: N.B. LP file name does not depend on climatic year -> to be deactivated when running
+    multiple cases in parallel
+    :param model_file_format: lp, mps or mps.gz (compressed MPS)
     """
     logging.info(f'{TITLE_LOG_SEP} IV) Get a solution for European UC model {TITLE_LOG_SEP}')
     # use alternatively set_optim_solver(name='gurobi', license_file='gurobi.lic') to use Gurobi,
     # with gurobi.lic file provided at root of this project (see readme.md on procedure to obtain such a lic file)
     pypsa_model.set_optim_solver(solver_params=solver_params)
-    result = pypsa_model.optimize_network(year=year, n_countries=n_countries, period_start=uc_period_start)
+    result = pypsa_model.optimize_network(year=year, n_countries=n_countries, period_start=uc_period_start,
+                                          save_lp_file=save_lp_file, model_file_format=model_file_format)
     # Get optim. pb main characteristics (to check if coherent with resolution time?!)
     optim_pb_characts = pypsa_model.get_optim_pb_characteristics()
     logging.info(f'Corresp. to solved {str(optim_pb_characts)}')
@@ -148,73 +174,19 @@ def solve_pypsa_network_model(pypsa_model: PypsaModel, year: int, n_countries: i
 
 
 def save_data_and_fig_results(pypsa_model: PypsaModel, uc_run_params: UCRunParams,
-                              result_optim_status: str) -> Optional[UCSummaryMetrics]:
+                              result_optim_status: str, with_figures: bool = True,
+                              result_file_format: str = UC_RESULT_FILE_FORMATS.csv,
+                              figure_job_queue: FigureJobQueue = None) -> Optional[UCSummaryMetrics]:
     pypsa_opt_resol_status = OPTIM_RESOL_STATUS.optimal
     # if optimal resolution status, save output data and plot associated figures
     if result_optim_status == pypsa_opt_resol_status:
         # get objective value, and associated optimal decisions / dual variables
         objective_value = pypsa_model.get_opt_value(pypsa_resol_status=pypsa_opt_resol_status)
         uc_optimal_solution = pypsa_model.set_uc_opt_solution()
-        # get plot parameters associated to aggreg. production types
-        per_dim_plot_params = read_plot_params()
-        plots_tb_done = (
-            read_given_phase_specific_key_from_plot_params(phase_name=EnvPhaseNames.multizones_uc_model,
-                                                           param_to_be_set=PlotParamsKeysInJson.plots_tb_done)
-        )
-        plot_params_agg_pt = per_dim_plot_params[DataDimensions.agg_prod_type]
-        plot_params_zone = per_dim_plot_params[DataDimensions.zone]
-
-        # plot - first the ones per country
-        for country in uc_run_params.selected_countries:
-            # opt. prod profiles 'stacked'
-            if PlotNames.prod_stacked in plots_tb_done:
-                (uc_optimal_solution.plot_prod(plot_params_agg_pt=plot_params_agg_pt, country=country,
-                                               year=uc_run_params.selected_target_year,
-                                               climatic_year=uc_run_params.selected_climatic_year,
-                                               start_horizon=uc_run_params.uc_period_start)
-                 )
-            # idem, including stock-like prod units (both cons. and prod.) on the stack of curves
-            if PlotNames.prod_stacked_with_stock in plots_tb_done:
-                uc_optimal_solution.plot_prod(plot_params_agg_pt=plot_params_agg_pt, country=country,
-                                              year=uc_run_params.selected_target_year,
-                                              climatic_year=uc_run_params.selected_climatic_year,
-                                              start_horizon=uc_run_params.uc_period_start,
-                                              include_storage=True)
-            # flow in the links
-            if PlotNames.link_flows in plots_tb_done:
-                (uc_optimal_solution.plot_link_flows(origin_country=country, year=uc_run_params.selected_target_year,
-                                                     climatic_year=uc_run_params.selected_climatic_year,
-                                                     start_horizon=uc_run_params.uc_period_start)
-                 )
-        # then plots at the scale of all countries (Europe)
-        # 'marginal price' figure
-        if PlotNames.marginal_price in plots_tb_done:
-            (uc_optimal_solution.plot_marginal_price(plot_params_zone=plot_params_zone,
-                                                     year=uc_run_params.selected_target_year,
-                                                     climatic_year=uc_run_params.selected_climatic_year,
-                                                     start_horizon=uc_run_params.uc_period_start)
-             )
-
-        # save optimal prod. decision to an output file
-        (uc_optimal_solution.save_decisions_to_csv(year=uc_run_params.selected_target_year,
-                                                   climatic_year=uc_run_params.selected_climatic_year,
-                                                   start_horizon=uc_run_params.uc_period_start)
-         )
-
-        # save marginal prices to an output file
-        (uc_optimal_solution.save_marginal_prices_to_csv(year=uc_run_params.selected_target_year,
-                                                         climatic_year=uc_run_params.selected_climatic_year,
-                                                         start_horizon=uc_run_params.uc_period_start)
-         )
-        # set UC summary metrics (Energy Not Served, number of failure hours, costs)
-        uc_summary_metrics = (
-            uc_optimal_solution.set_uc_summary_metrics(network=pypsa_model.network, total_cost=objective_value,
-                                                       failure_penalty=uc_run_params.failure_penalty)
-        )
-        uc_summary_metrics.json_dump(year=uc_run_params.selected_target_year,
-                                     climatic_year=uc_run_params.selected_climatic_year,
-                                     start_horizon=uc_run_params.uc_period_start)
-        return uc_summary_metrics
+        return save_uc_opt_solution_results(uc_optimal_solution=uc_optimal_solution, network=pypsa_model.network,
+                                            objective_value=objective_value, uc_run_params=uc_run_params,
+                                            with_figures=with_figures, result_file_format=result_file_format,
+                                            figure_job_queue=figure_job_queue)
     else:
         logging.info(f'Optimisation resolution status is not {pypsa_opt_resol_status} '
                      f'-> output data (resp. figures) cannot be saved (resp. plotted), '
@@ -226,8 +198,328 @@ def save_data_and_fig_results(pypsa_model: PypsaModel, uc_run_params: UCRunParam
         return None
 
 
+@profile_stage(name='save_uc_opt_solution_results')
+def save_uc_opt_solution_results(uc_optimal_solution: UCOptimalSolution, network: pypsa.Network,
+                                 objective_value: float, uc_run_params: UCRunParams, with_figures: bool = True,
+                                 snapshot_weightings: pd.Series = None,
+                                 result_file_format: str = UC_RESULT_FILE_FORMATS.csv,
+                                 figure_job_queue: FigureJobQueue = None) -> UCSummaryMetrics:
+    """
+    Plot figures, save output data and UC summary metrics of an optimal UC solution
+    :param uc_optimal_solution
+    :param network: PyPSA network of this solution - or of the last window in rolling horizon mode
+    :param objective_value: total cost of the solution
+    :param uc_run_params
+    :param with_figures: plot the figures listed in plot params
+    :param snapshot_weightings: if solution is not on the snapshots of network; by default, the ones of network
+    :param result_file_format: of optimal decisions and prices output files, csv or parquet
+    :param figure_job_queue: if provided, figures rendered in its background processes (deferred mode)
+    """
+    # plot figures - directly, or in background if a figure job queue is provided
+    if with_figures:
+        figure_job_kwargs = {
+            'per_dim_plot_params': read_plot_params(),
+            'plots_tb_done': read_given_phase_specific_key_from_plot_params(
+                phase_name=EnvPhaseNames.multizones_uc_model, param_to_be_set=PlotParamsKeysInJson.plots_tb_done),
+            'countries': uc_run_params.selected_countries, 'year': uc_run_params.selected_target_year,
+            'climatic_year': uc_run_params.selected_climatic_year, 'start_horizon': uc_run_params.uc_period_start
+        }
+        with profile_stage(name='UC solution figures'):
+            if figure_job_queue is None:
+                plot_uc_opt_solution_figures(uc_optimal_solution=uc_optimal_solution, **figure_job_kwargs)
+            else:
+                figure_job_queue.submit(job_name='UC solution figures', func=plot_uc_opt_solution_figures,
+                                        uc_optimal_solution=uc_optimal_solution, **figure_job_kwargs)
+
+    # save optimal decisions and marginal prices to output files
+    with profile_stage(name='save_results'):
+        (uc_optimal_solution.save_results(year=uc_run_params.selected_target_year,
+                                          climatic_year=uc_run_params.selected_climatic_year,
+                                          start_horizon=uc_run_params.uc_period_start, file_format=result_file_format)
+         )
+    # set UC summary metrics (Energy Not Served, number of failure hours, costs)
+    with profile_stage(name='UC summary metrics'):
+        uc_summary_metrics = (
+            uc_optimal_solution.set_uc_summary_metrics(network=network, total_cost=objective_value,
+                                                       failure_penalty=uc_run_params.failure_penalty,
+                                                       snapshot_weightings=snapshot_weightings)
+        )
+        uc_summary_metrics.json_dump(year=uc_run_params.selected_target_year,
+                                     climatic_year=uc_run_params.selected_climatic_year,
+                                     start_horizon=uc_run_params.uc_period_start)
+    return uc_summary_metrics
+
+
+def run_uc_case(network_name: str, uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr,
+                fuel_sources: Dict[str, FuelSource], solver_params: SolverParams, debug_mode: bool = False,
+                debug_output_folder: str = None, plot_network: bool = True, save_lp_file: bool = True,
+                model_file_format: str = MODEL_FILE_FORMATS.lp, with_figures: bool = True,
+                result_file_format: str = UC_RESULT_FILE_FORMATS.csv, figure_job_queue: FigureJobQueue = None) \
+        -> Optional[UCSummaryMetrics]:
+    """
+    Run UC for a given (target year, climatic year, period) case, from already read and checked parameters
+    :param network_name: just to set associated attribute in PyPSA network
+    :param uc_run_params: of this case
+    :param eraa_data_descr
+    :param fuel_sources
+    :param solver_params
+    :param debug_mode: to save some intermediate data in (JSON) files to more easily debug
+    :param debug_output_folder: in which intermediate data must be saved
+    :param plot_network: to save the (case independent) network figure
+    :param save_lp_file: to save the model in a file - before its resolution
+    :param model_file_format: lp, mps or mps.gz (compressed MPS)
+    :param with_figures: plot the per-case figures (prod., link flows, prices) listed in plot params
+    :param result_file_format: of optimal decisions and prices output files, csv or parquet (e.g. for batch runs)
+    :param figure_job_queue: if provided, figures rendered in its background processes (deferred mode)
+    """
+    # Get needed data (demand, RES Capa. Factors, installed generation capacities)
+    eraa_dataset = get_needed_eraa_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr,
+                                        debug_mode=debug_mode, debug_output_folder=debug_output_folder)
+    # and check that minimal parameters needed for model creation have been provided
+    # -> to avoid 'obscure crash' hereafter
+    check_min_pypsa_params_provided(eraa_dataset=eraa_dataset)
+
+    # create PyPSA network
+    pypsa_model = create_pypsa_network_model(name=network_name, uc_run_params=uc_run_params, eraa_dataset=eraa_dataset,
+                                             zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                             fuel_sources=fuel_sources, plot_network=plot_network,
+                                             figure_job_queue=figure_job_queue)
+
+    result = solve_pypsa_network_model(pypsa_model=pypsa_model, year=uc_run_params.selected_target_year,
+                                       n_countries=len(uc_run_params.selected_countries),
+                                       uc_period_start=uc_run_params.uc_period_start, solver_params=solver_params,
+                                       save_lp_file=save_lp_file, model_file_format=model_file_format)
+
+    return save_data_and_fig_results(pypsa_model=pypsa_model, uc_run_params=uc_run_params,
+                                     result_optim_status=result[1], with_figures=with_figures,
+                                     result_file_format=result_file_format, figure_job_queue=figure_job_queue)
+
+
+def solve_rolling_horizon_windows(network_name: str, uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr,
+                                  fuel_sources: Dict[str, FuelSource], solver_params: SolverParams,
+                                  rolling_horizon_params: RollingHorizonParams, debug_mode: bool = False,
+                                  debug_output_folder: str = None, plot_network: bool = True,
+                                  figure_job_queue: FigureJobQueue = None) \
+        -> Tuple[PypsaModel, UCRunParams, str, List[RollingHorizonWindowResult]]:
+    """
+    Solve successively the windows of a UC case in rolling horizon mode - see run_uc_case_rolling_horizon
+    :returns model and UC run params of the last solved window, status of its resolution, and results of the
+    windows solved up to optimality (all of them if last status is optimal)
+    """
+    windows = set_rolling_horizon_windows(period_start=uc_run_params.uc_period_start,
+                                          period_end=uc_run_params.uc_period_end,
+                                          rolling_horizon_params=rolling_horizon_params)
+    n_windows = len(windows)
+    logging.info(f'Rolling horizon resolution with {n_windows} windows of {rolling_horizon_params.n_days_kept} days '
+                 f'(+ {rolling_horizon_params.n_guard_days} ring guard days)')
+    target_year = uc_run_params.selected_target_year
+    n_countries = len(uc_run_params.selected_countries)
+    window_results = []
+    final_soc = {}
+    period_init_soc = {}
+    pypsa_model = None
+    window_uc_run_params = None
+    result = None
+    for i_window, window in enumerate(windows):
+        logging.info(f'{TITLE_LOG_SEP} Rolling horizon {window} ({i_window + 1}/{n_windows}) {TITLE_LOG_SEP}')
+        window_uc_run_params = deepcopy(uc_run_params)
+        window_uc_run_params.set_uc_period(start=window.start, end=window.end)
+        # custom sum-of-prod. constraints of the full period prorated to the kept part of the window
+        window_uc_run_params.sum_prod_constraints = \
+            set_window_sum_prod_constraints(sum_prod_constraints=uc_run_params.sum_prod_constraints, window=window)
+        eraa_dataset = get_needed_eraa_data(uc_run_params=window_uc_run_params, eraa_data_descr=eraa_data_descr,
+                                            debug_mode=debug_mode and i_window == 0,
+                                            debug_output_folder=debug_output_folder)
+        if i_window == 0:
+            check_min_pypsa_params_provided(eraa_dataset=eraa_dataset)
+        # SOC hand-off from previous window
+        set_storage_init_soc(generation_units_data=eraa_dataset.generation_units_data, init_soc=final_soc)
+        # and, in last window, units with cyclic SOC over the full period back to the initial SOC of the first one
+        with_final_soc_target = i_window == n_windows - 1 and len(period_init_soc) > 0
+        if with_final_soc_target:
+            n_time_slots = int((window.end - window.start) / timedelta(hours=1))
+            set_storage_final_soc(generation_units_data=eraa_dataset.generation_units_data,
+                                  final_soc=period_init_soc, n_time_slots=n_time_slots)
+        pypsa_model = create_pypsa_network_model(name=network_name, uc_run_params=window_uc_run_params,
+                                                 eraa_dataset=eraa_dataset,
+                                                 zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                                 fuel_sources=fuel_sources, plot_network=plot_network and i_window == 0,
+                                                 figure_job_queue=figure_job_queue)
+        result = solve_pypsa_network_model(pypsa_model=pypsa_model, year=target_year, n_countries=n_countries,
+                                           uc_period_start=window.start, solver_params=solver_params,
+                                           save_lp_file=False)
+        if result[1] != OPTIM_RESOL_STATUS.optimal and with_final_soc_target:
+            logging.warning(f'Resolution status of last rolling horizon window with final SOC target of the storage '
+                            f'units with cyclic SOC is {result[1]} -> solved again without this target')
+            set_storage_final_soc(generation_units_data=eraa_dataset.generation_units_data, final_soc={},
+                                  n_time_slots=n_time_slots)
+            pypsa_model = create_pypsa_network_model(name=network_name, uc_run_params=window_uc_run_params,
+                                                     eraa_dataset=eraa_dataset,
+                                                     zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                                     fuel_sources=fuel_sources, plot_network=False)
+            result = solve_pypsa_network_model(pypsa_model=pypsa_model, year=target_year, n_countries=n_countries,
+                                               uc_period_start=window.start, solver_params=solver_params,
+                                               save_lp_file=False)
+        if result[1] != OPTIM_RESOL_STATUS.optimal:
+            logging.info(f'Rolling horizon stopped at {window}')
+            break
+        network = pypsa_model.network
+        if i_window == 0:
+            period_init_soc = get_cyclic_units_init_soc(network=network)
+        # keep solution without ring guard days
+        kept_start, kept_end = set_target_year_in_period(period_start=window.start, period_end=window.kept_end,
+                                                         target_year=target_year)
+        kept_solution = pypsa_model.set_uc_opt_solution().select_period(start=kept_start, end=kept_end)
+        snapshot_weightings = network.snapshot_weightings.generators
+        snapshot_weightings = snapshot_weightings[(kept_start <= snapshot_weightings.index)
+                                                  & (snapshot_weightings.index < kept_end)]
+        kept_cost = kept_solution.calc_total_cost(snapshot_weightings=snapshot_weightings,
+                                                  gen_marginal_costs=network.generators.marginal_cost,
+                                                  storage_marginal_costs=network.storage_units.marginal_cost)
+        window_results.append(RollingHorizonWindowResult(window=window, kept_solution=kept_solution,
+                                                         snapshot_weightings=snapshot_weightings, cost=kept_cost,
+                                                         init_soc=get_handed_off_init_soc(network=network)))
+        final_soc = get_final_soc(uc_opt_solution=kept_solution)
+    return pypsa_model, window_uc_run_params, result[1], window_results
+
+
+def run_uc_case_rolling_horizon(network_name: str, uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr,
+                                fuel_sources: Dict[str, FuelSource], solver_params: SolverParams,
+                                rolling_horizon_params: RollingHorizonParams, debug_mode: bool = False,
+                                debug_output_folder: str = None, plot_network: bool = True,
+                                with_figures: bool = True, figure_job_queue: FigureJobQueue = None) \
+        -> Optional[UCSummaryMetrics]:
+    """
+    Run UC for a given case in rolling horizon mode, e.g. to get a full year solution in bounded memory: UC period
+    split into successive windows - solved with their ring guard days, then removed -, the final storage SOC of a
+    window being the initial one of the next one. Solutions of the windows are stitched into one. Custom sum-of-prod.
+    constraints (e.g. max CO2 emissions) are applied to the kept part of each window, with prorated bounds.
+    N.B. storage units with cyclic SOC: cyclic over the first window only, then the final SOC of the last window is
+    set to the initial SOC of the first one - as with a cyclic SOC over the full period. If last window infeasible
+    with this target, it is solved without it (then with a free final SOC, e.g. reservoirs possibly emptied)
+    :param rolling_horizon_params: number of kept and ring guard days of each window
+    other params: see run_uc_case; N.B. LP file is not saved in this mode
+    """
+    pypsa_model, window_uc_run_params, optim_status, window_results = (
+        solve_rolling_horizon_windows(network_name=network_name, uc_run_params=uc_run_params,
+                                      eraa_data_descr=eraa_data_descr, fuel_sources=fuel_sources,
+                                      solver_params=solver_params, rolling_horizon_params=rolling_horizon_params,
+                                      debug_mode=debug_mode, debug_output_folder=debug_output_folder,
+                                      plot_network=plot_network, figure_job_queue=figure_job_queue)
+    )
+    if optim_status != OPTIM_RESOL_STATUS.optimal:
+        return save_data_and_fig_results(pypsa_model=pypsa_model, uc_run_params=window_uc_run_params,
+                                         result_optim_status=optim_status, with_figures=with_figures,
+                                         figure_job_queue=figure_job_queue)
+
+    logging.info(f'Stitch solutions of the {len(window_results)} rolling horizon windows')
+    uc_optimal_solution = concat_uc_opt_solutions(uc_opt_solutions=[elt.kept_solution for elt in window_results])
+    # N.B. static attributes of network (buses, generators costs...) are the same for all windows
+    return save_uc_opt_solution_results(uc_optimal_solution=uc_optimal_solution, network=pypsa_model.network,
+                                        objective_value=sum(elt.cost for elt in window_results),
+                                        uc_run_params=uc_run_params, with_figures=with_figures,
+                                        snapshot_weightings=pd.concat([elt.snapshot_weightings
+                                                                       for elt in window_results]),
+                                        figure_job_queue=figure_job_queue)
+
+
+def run_uc_case_sweep(network_name: str, uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr,
+                      fuel_sources: Dict[str, FuelSource], solver_params: SolverParams, sweep_cases: List[UCSweepCase],
+                      debug_mode: bool = False, debug_output_folder: str = None, warm_start: bool = True) \
+        -> Dict[str, Optional[UCSummaryMetrics]]:
+    """
+    Run a sweep over capacities, fuel marginal costs and/or CO2 price for a given UC case: PyPSA network and linopy
+    model built once, then for each sweep case only the changed p_nom bounds/objective costs updated before solving
+    again - solver warm-started from the basis of previous resolution
+    :param sweep_cases: each one defined w.r.t. the base case of uc_run_params/input data (not the previous case)
+    :param warm_start: reuse solver basis between successive resolutions. N.B. HiGHS then skips presolve -> faster
+    for small steps between cases, possibly slower for big ones
+    other params: see run_uc_case; N.B. only UC summary metrics are saved in this mode, in a consolidated table
+    :returns dict {sweep case name: UC summary metrics, None if not optimal}
+    """
+    eraa_dataset = get_needed_eraa_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr,
+                                        debug_mode=debug_mode, debug_output_folder=debug_output_folder)
+    check_min_pypsa_params_provided(eraa_dataset=eraa_dataset)
+    pypsa_model = create_pypsa_network_model(name=network_name, uc_run_params=uc_run_params, eraa_dataset=eraa_dataset,
+                                             zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                             fuel_sources=fuel_sources, plot_network=False)
+    pypsa_model.set_optim_solver(solver_params=solver_params)
+    pypsa_model.build_optim_model()
+    # basis file proper to this run (removed at its end) -> not shared with concurrent sweeps, and basis of a
+    # previous sweep not used to warm-start the first resolution
+    sweep_run_id = f'{datetime.now().strftime("%Y%m%d-%H%M%S")}-{os.getpid()}'
+    pypsa_model.optim_basis_file = get_uc_sweep_basis_file(run_id=sweep_run_id)
+    try:
+        return solve_uc_sweep_cases(pypsa_model=pypsa_model, uc_run_params=uc_run_params, sweep_cases=sweep_cases,
+                                    warm_start=warm_start)
+    finally:
+        remove_basis_file(pypsa_model=pypsa_model)
+
+
+def remove_basis_file(pypsa_model: PypsaModel):
+    if pypsa_model.optim_basis_file is not None and os.path.exists(pypsa_model.optim_basis_file):
+        os.remove(pypsa_model.optim_basis_file)
+
+
+def solve_uc_sweep_cases(pypsa_model: PypsaModel, uc_run_params: UCRunParams, sweep_cases: List[UCSweepCase],
+                         warm_start: bool = True) -> Dict[str, Optional[UCSummaryMetrics]]:
+    """
+    Solve the cases of a sweep - see run_uc_case_sweep - successively updating the linopy model of pypsa_model
+    """
+    base_p_noms = pypsa_model.network.generators.p_nom.copy()
+    base_marginal_costs = pypsa_model.network.generators.marginal_cost.copy()
+
+    n_cases = len(sweep_cases)
+    per_case_uc_summary_metrics = {}
+    summary_table_rows = []
+    for i_case, sweep_case in enumerate(sweep_cases):
+        logging.info(f'{TITLE_LOG_SEP} Sweep case {sweep_case.name} ({i_case + 1}/{n_cases}) {TITLE_LOG_SEP}')
+        # update only changed coefficients/rhs of the linopy model
+        gen_marginal_costs = sweep_case.get_gen_marginal_costs(base_marginal_costs=base_marginal_costs)
+        if sweep_case.co2_emis_price is not None:
+            gen_marginal_costs = pd.Series(
+                pypsa_model.get_gen_marginal_costs_with_co2_price(co2_emis_price=sweep_case.co2_emis_price,
+                                                                  base_marginal_costs=gen_marginal_costs)
+            )
+        changed_p_noms = get_changed_values(new_values=sweep_case.get_gen_p_noms(base_p_noms=base_p_noms),
+                                            current_values=pypsa_model.network.generators.p_nom)
+        changed_marginal_costs = get_changed_values(new_values=gen_marginal_costs,
+                                                    current_values=pypsa_model.network.generators.marginal_cost)
+        logging.info(f'Update p_nom of {len(changed_p_noms)} and marginal cost of {len(changed_marginal_costs)} '
+                     f'generators in linopy model')
+        if len(changed_p_noms) > 0:
+            pypsa_model.update_gen_p_nom(new_p_noms=changed_p_noms)
+        if len(changed_marginal_costs) > 0:
+            pypsa_model.update_gen_marginal_costs(new_marginal_costs=changed_marginal_costs)
+        result = pypsa_model.solve_optim_model(warm_start=warm_start)
+
+        if result[1] == OPTIM_RESOL_STATUS.optimal:
+            objective_value = pypsa_model.get_opt_value(pypsa_resol_status=result[1])
+            uc_optimal_solution = pypsa_model.set_uc_opt_solution()
+            uc_summary_metrics = (
+                uc_optimal_solution.set_uc_summary_metrics(network=pypsa_model.network, total_cost=objective_value,
+                                                           failure_penalty=uc_run_params.failure_penalty)
+            )
+            summary_table_rows.append({'sweep_case': sweep_case.name, 'status': result[1]}
+                                      | uc_summary_metrics.to_flat_dict())
+        else:
+            logging.warning(f'Optimisation resolution status of sweep case {sweep_case.name} is {result[1]} '
+                            f'-> None UCSummaryMetrics, and next case not warm-started from its basis')
+            remove_basis_file(pypsa_model=pypsa_model)
+            uc_summary_metrics = None
+            summary_table_rows.append({'sweep_case': sweep_case.name, 'status': result[1]})
+        per_case_uc_summary_metrics[sweep_case.name] = uc_summary_metrics
+
+    summary_file = get_uc_sweep_summary_file()
+    pd.DataFrame(summary_table_rows).to_csv(summary_file, index=False)
+    logging.info(f'UC summary metrics of the {n_cases} sweep cases saved in {summary_file}')
+    return per_case_uc_summary_metrics
+
+
 def run(network_name: str = 'my little europe', solver_params: SolverParams = None,
-        fixed_uc_run_params: UCRunParams = None, fixed_run_params_fields: List[str] = None, extra_params: dict = None):
+        fixed_uc_run_params: UCRunParams = None, fixed_run_params_fields: List[str] = None, extra_params: dict = None,
+        rolling_horizon_params: RollingHorizonParams = None, sweep_cases: List[UCSweepCase] = None,
+        figure_mode: str = FIGURE_MODES.synchronous):
     """
     Run N-zones European Unit Commitment model
     :param network_name: just to set associated attribute in PyPSA network
@@ -239,11 +531,25 @@ def run(network_name: str = 'my little europe', solver_params: SolverParams = No
         - log_level: it will overwrite the one defined in usage parameters JSON file
         - debug_mode: activated to save some intermediate data/results in (JSON) output files
     to more easily debug the code
+        - save_lp_file: save the model in a file (True by default)
+        - model_file_format: format of this file, lp (default), mps or mps.gz (compressed MPS)
+        - profile_stages: to record wall/CPU time and peak RSS of the main stages of the run, saved in a JSON
+    timeline next to the UC summary file (False by default)
+        - trace_mallocs: to also record Python allocations in these stages, with tracemalloc - which significantly
+    slows down the run (False by default)
+    :param rolling_horizon_params: if provided, UC period solved in rolling horizon mode (successive windows with
+    storage SOC hand-off) - e.g. for a full year simulation
+    :param sweep_cases: if provided, parameter sweep over these cases (capacities, fuel marginal costs and/or CO2
+    price), the model being built once and only updated between cases - only UC summary metrics then saved
+    :param figure_mode: synchronous (figures rendered during the run), deferred (rendered in background
+    processes, the run only waiting for them at its very end) or none (no figures)
     """
     if extra_params is None:
         extra_params = {}
 
     run_start = time.time()
+    if extra_params.get('profile_stages', False):
+        STAGE_PROFILER.start(with_tracemalloc=extra_params.get('trace_mallocs', False))
     output_folder = set_full_lt_uc_output_folder()
 
     # deactivate some annoying and useless warnings in pypsa/pandas
@@ -265,9 +571,10 @@ def run(network_name: str = 'my little europe', solver_params: SolverParams = No
     # set fuel sources objects from JSON
     fuel_sources = set_fuel_sources_from_json()
 
-    eraa_data_descr, uc_run_params = (
-        read_and_check_uc_run_params(phase_name=EnvPhaseNames.multizones_uc_model, usage_params=usage_params)
-    )
+    with profile_stage(name='read_and_check_uc_run_params'):
+        eraa_data_descr, uc_run_params = (
+            read_and_check_uc_run_params(phase_name=EnvPhaseNames.multizones_uc_model, usage_params=usage_params)
+        )
 
     if fixed_uc_run_params is not None:
         uc_run_params = (
@@ -275,36 +582,59 @@ def run(network_name: str = 'my little europe', solver_params: SolverParams = No
                                       eraa_data_descr=eraa_data_descr, fixed_run_params_fields=fixed_run_params_fields)
         )
 
-    # Get needed data (demand, RES Capa. Factors, installed generation capacities)
     if 'debug_mode' in extra_params:
         debug_mode = extra_params['debug_mode']
     else:
         debug_mode = False
-    eraa_dataset = get_needed_eraa_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr,
-                                        debug_mode=debug_mode, debug_output_folder=output_folder)
-    # and check that minimal parameters needed for model creation have been provided
-    # -> to avoid 'obscure crash' hereafter
-    check_min_pypsa_params_provided(eraa_dataset=eraa_dataset)
-
-    # create PyPSA network
-    pypsa_model = create_pypsa_network_model(name=network_name, uc_run_params=uc_run_params, eraa_dataset=eraa_dataset,
-                                             zones_gps_coords=eraa_data_descr.gps_coordinates,
-                                             fuel_sources=fuel_sources)
-
     # get solver params from JSON file if not provided in arg of this function
     if solver_params is None:
         solver_params = read_solver_params()
-    result = solve_pypsa_network_model(pypsa_model=pypsa_model, year=uc_run_params.selected_target_year,
-                                       n_countries=len(uc_run_params.selected_countries),
-                                       uc_period_start=uc_run_params.uc_period_start, solver_params=solver_params)
-
-    uc_summary_metrics = save_data_and_fig_results(pypsa_model=pypsa_model, uc_run_params=uc_run_params,
-                                                   result_optim_status=result[1])
+    avail_figure_modes = get_default_values(obj=FigureModes)
+    if figure_mode not in avail_figure_modes:
+        raise Exception(f'Unknown figure mode {figure_mode}; it must be in {avail_figure_modes} -> STOP')
+    if rolling_horizon_params is not None and sweep_cases is not None:
+        raise Exception('Rolling horizon and parameter sweep modes cannot be used together -> STOP')
+    with_figures = not figure_mode == FIGURE_MODES.none
+    figure_job_queue = FigureJobQueue() if figure_mode == FIGURE_MODES.deferred else None
+    if sweep_cases is not None:
+        uc_summary_metrics = run_uc_case_sweep(network_name=network_name, uc_run_params=uc_run_params,
+                                               eraa_data_descr=eraa_data_descr, fuel_sources=fuel_sources,
+                                               solver_params=solver_params, sweep_cases=sweep_cases,
+                                               debug_mode=debug_mode, debug_output_folder=output_folder)
+    elif rolling_horizon_params is None:
+        uc_summary_metrics = run_uc_case(network_name=network_name, uc_run_params=uc_run_params,
+                                         eraa_data_descr=eraa_data_descr, fuel_sources=fuel_sources,
+                                         solver_params=solver_params, debug_mode=debug_mode,
+                                         debug_output_folder=output_folder,
+                                         save_lp_file=extra_params.get('save_lp_file', True),
+                                         model_file_format=extra_params.get('model_file_format',
+                                                                            MODEL_FILE_FORMATS.lp),
+                                         plot_network=with_figures, with_figures=with_figures,
+                                         figure_job_queue=figure_job_queue)
+    else:
+        uc_summary_metrics = (
+            run_uc_case_rolling_horizon(network_name=network_name, uc_run_params=uc_run_params,
+                                        eraa_data_descr=eraa_data_descr, fuel_sources=fuel_sources,
+                                        solver_params=solver_params, rolling_horizon_params=rolling_horizon_params,
+                                        debug_mode=debug_mode, debug_output_folder=output_folder,
+                                        plot_network=with_figures, with_figures=with_figures,
+                                        figure_job_queue=figure_job_queue)
+        )
 
     run_end = time.time()
 
     logging.info(f'{TITLE_LOG_SEP} THE END of ERAA-PyPSA long-term UC simulation! '
                  f'(after {run_end - run_start:.2f}s) {TITLE_LOG_SEP}:\n{str(uc_summary_metrics)}')
+    if figure_job_queue is not None:
+        logging.info('Wait for figures rendered in background')
+        with profile_stage(name='wait for background figures'):
+            figure_job_queue.wait()
+        logging.info(f'Figures done (after {time.time() - run_start:.2f}s)')
+    if STAGE_PROFILER.enabled:
+        STAGE_PROFILER.json_dump(file=get_uc_profile_file(country='europe', year=uc_run_params.selected_target_year,
+                                                          climatic_year=uc_run_params.selected_climatic_year,
+                                                          start_horizon=uc_run_params.uc_period_start))
+        STAGE_PROFILER.stop()
     stop_logger()
 
 
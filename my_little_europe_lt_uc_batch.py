@@ -0,0 +1,301 @@
+"""
+Batch of N-zones European Unit Commitment runs, over a grid of (target year, climatic year, period) cases
+-> JSON parameters read and checked once, then cases solved in parallel in a pool of processes; per-case outputs
+saved as in my_little_europe_lt_uc.py, plus a consolidated table of UC summary metrics
+"""
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from copy import deepcopy
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from common.constants.extract_eraa_data import ERAADatasetDescr
+from common.constants.optimisation import SolverParams, FAST_LP_SOLVER_PROFILE
+from common.constants.usage_params_json import EnvPhaseNames
+from common.error_msgs import uncoherent_param_stop
+from common.fuel_sources import set_fuel_sources_from_json, FuelSource
+from common.logger import init_logger, stop_logger, deactivate_verbose_warnings, TITLE_LOG_SEP
+from common.long_term_uc_io import DATE_FORMAT, get_output_file_suffix, get_uc_batch_summary_file, \
+    set_full_lt_uc_output_folder, UC_RESULT_FILE_FORMATS
+from common.uc_run_params import UCRunParams, coherent_target_year
+from my_little_europe_lt_uc import run_uc_case
+from utils.read import read_and_check_uc_run_params, read_usage_params, read_solver_params
+
+
+@dataclass
+class UCBatchCaseStatus:
+    optimal: str = 'optimal'
+    not_optimal: str = 'not-optimal'
+    error: str = 'error'
+
+
+UC_BATCH_CASE_STATUS = UCBatchCaseStatus()
+
+
+@dataclass(frozen=True)
+class UCCase:
+    target_year: int
+    climatic_year: int
+    uc_period_start: datetime
+    uc_period_end: datetime
+
+    def __repr__(self) -> str:
+        return (f'UC case (year {self.target_year}, climatic year {self.climatic_year}, '
+                f'period start {self.uc_period_start:%Y/%m/%d})')
+
+    def get_file_suffix(self) -> str:
+        return get_output_file_suffix(country='europe', year=self.target_year, climatic_year=self.climatic_year,
+                                      start_horizon=self.uc_period_start)
+
+    def set_uc_run_params(self, uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr) -> UCRunParams:
+        """
+        Get a copy of (common) UC run params with the values of this case
+        """
+        case_uc_run_params = deepcopy(uc_run_params)
+        case_uc_run_params.set_target_year(year=self.target_year)
+        # 'all' aggreg. prod. types selection -> the ones available for the target year of this case
+        if self.target_year in eraa_data_descr.available_target_years:
+            case_uc_run_params.set_all_selected_prod_types(eraa_data_descr=eraa_data_descr)
+        case_uc_run_params.set_climatic_year(climatic_year=self.climatic_year)
+        case_uc_run_params.set_is_stress_test(avail_cy_stress_test=eraa_data_descr.available_climatic_years_stress_test)
+        if (self.uc_period_start, self.uc_period_end) != (uc_run_params.uc_period_start, uc_run_params.uc_period_end):
+            case_uc_run_params.set_uc_period(start=self.uc_period_start, end=self.uc_period_end)
+            # custom constraints bounds depend on period
+            case_uc_run_params.set_sum_prod_constraints(available_countries=eraa_data_descr.available_countries)
+        return case_uc_run_params
+
+
+@dataclass
+class UCCaseResult:
+    uc_case: UCCase
+    is_stress_test: bool
+    status: str
+    run_time: float
+    uc_summary_metrics: Optional[Dict[str, float]] = None  # flat version, see UCSummaryMetrics.to_flat_dict
+    error_msg: Optional[str] = None
+
+    def to_table_row(self) -> dict:
+        table_row = {'target_year': self.uc_case.target_year, 'climatic_year': self.uc_case.climatic_year,
+                     'is_stress_test': self.is_stress_test,
+                     'uc_period_start': self.uc_case.uc_period_start.strftime(DATE_FORMAT),
+                     'uc_period_end': self.uc_case.uc_period_end.strftime(DATE_FORMAT),
+                     'status': self.status, 'run_time_s': round(self.run_time, 2)}
+        if self.uc_summary_metrics is not None:
+            table_row |= self.uc_summary_metrics
+        if self.error_msg is not None:
+            table_row['error_msg'] = self.error_msg
+        return table_row
+
+
+@dataclass
+class UCBatchSharedInputs:
+    """
+    Inputs common to all cases of a batch, read and checked once in main process then sent once to each worker
+    """
+    network_name: str
+    eraa_data_descr: ERAADatasetDescr
+    uc_run_params: UCRunParams
+    fuel_sources: Dict[str, FuelSource]
+    solver_params: SolverParams
+    log_level: str
+    output_folder: str
+    with_figures: bool = False
+    result_file_format: str = UC_RESULT_FILE_FORMATS.parquet
+
+
+# set in each worker process by init_uc_batch_worker
+UC_BATCH_SHARED_INPUTS: Optional[UCBatchSharedInputs] = None
+
+
+def set_uc_cases_grid(target_years: List[int], climatic_years: List[int],
+                      uc_periods: List[Tuple[datetime, datetime]]) -> List[UCCase]:
+    """
+    Set all (target year, climatic year, period) combinations - ordered by target year, so that the data files of a
+    same year are mostly read by the same workers
+    """
+    return [UCCase(target_year=target_year, climatic_year=climatic_year, uc_period_start=period_start,
+                   uc_period_end=period_end)
+            for target_year in target_years for climatic_year in climatic_years
+            for period_start, period_end in uc_periods]
+
+
+def get_all_climatic_years(eraa_data_descr: ERAADatasetDescr, with_stress_test: bool = True) -> List[int]:
+    climatic_years = list(eraa_data_descr.available_climatic_years)
+    if with_stress_test and eraa_data_descr.available_climatic_years_stress_test is not None:
+        climatic_years.extend([cy for cy in eraa_data_descr.available_climatic_years_stress_test
+                               if cy not in climatic_years])
+    return climatic_years
+
+
+def check_uc_cases(uc_cases: List[UCCase], uc_run_params: UCRunParams, eraa_data_descr: ERAADatasetDescr):
+    """
+    Check (target year, climatic year) and aggreg. prod. types selection of all cases in main process -> stop before
+    starting any resolution if some of them are unknown
+    """
+    errors_list = []
+    for uc_case in uc_cases:
+        case_uc_run_params = uc_case.set_uc_run_params(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+        case_errors = case_uc_run_params.coherence_check_ty_and_cy(eraa_data_descr=eraa_data_descr)
+        # prod. types available for target year -> can be checked only if coherent TY
+        if coherent_target_year(errors_list=case_errors):
+            case_errors.extend(case_uc_run_params.coherence_check_prod_types(eraa_data_descr=eraa_data_descr))
+        errors_list.extend(case_errors)
+    if len(errors_list) > 0:
+        uncoherent_param_stop(param_errors=list(dict.fromkeys(errors_list)))
+
+
+def init_uc_batch_worker(shared_inputs: UCBatchSharedInputs):
+    global UC_BATCH_SHARED_INPUTS
+    UC_BATCH_SHARED_INPUTS = shared_inputs
+    deactivate_verbose_warnings()
+
+
+def run_uc_batch_case(uc_case: UCCase) -> UCCaseResult:
+    """
+    Run a UC case in a worker process, with its own log file. Errors are caught so that one case failing does not
+    stop the full batch
+    """
+    shared_inputs = UC_BATCH_SHARED_INPUTS
+    case_start = time.time()
+    init_logger(logger_dir=shared_inputs.output_folder, logger_name=f'eraa_lt_uc_pb_{uc_case.get_file_suffix()}.log',
+                log_level=shared_inputs.log_level)
+    logging.info(f'Start {uc_case} in process {os.getpid()}')
+    is_stress_test = None
+    try:
+        uc_run_params = uc_case.set_uc_run_params(uc_run_params=shared_inputs.uc_run_params,
+                                                  eraa_data_descr=shared_inputs.eraa_data_descr)
+        is_stress_test = uc_run_params.is_stress_test
+        # network figure is the same for all cases, and LP file name does not depend on climatic year
+        # -> not saved in batch mode
+        uc_summary_metrics = run_uc_case(network_name=shared_inputs.network_name, uc_run_params=uc_run_params,
+                                         eraa_data_descr=shared_inputs.eraa_data_descr,
+                                         fuel_sources=deepcopy(shared_inputs.fuel_sources),
+                                         solver_params=shared_inputs.solver_params, plot_network=False,
+                                         save_lp_file=False, with_figures=shared_inputs.with_figures,
+                                         result_file_format=shared_inputs.result_file_format)
+    except Exception as e:
+        logging.error(f'{uc_case} failed: {e}\n{traceback.format_exc()}')
+        stop_logger()
+        return UCCaseResult(uc_case=uc_case, is_stress_test=is_stress_test, status=UC_BATCH_CASE_STATUS.error,
+                            run_time=time.time() - case_start, error_msg=str(e))
+
+    if uc_summary_metrics is None:
+        status = UC_BATCH_CASE_STATUS.not_optimal
+        flat_uc_summary_metrics = None
+    else:
+        status = UC_BATCH_CASE_STATUS.optimal
+        flat_uc_summary_metrics = uc_summary_metrics.to_flat_dict()
+    case_run_time = time.time() - case_start
+    logging.info(f'{uc_case} done in {case_run_time:.2f}s, with status {status}')
+    stop_logger()
+    return UCCaseResult(uc_case=uc_case, is_stress_test=is_stress_test, status=status, run_time=case_run_time,
+                        uc_summary_metrics=flat_uc_summary_metrics)
+
+
+def run_batch(network_name: str = 'my little europe', target_years: List[int] = None,
+              climatic_years: List[int] = None, uc_periods: List[Tuple[datetime, datetime]] = None,
+              max_workers: int = None, solver_params: SolverParams = None,
+              solver_profile: str = FAST_LP_SOLVER_PROFILE, with_figures: bool = False,
+              result_file_format: str = UC_RESULT_FILE_FORMATS.parquet, extra_params: dict = None) -> pd.DataFrame:
+    """
+    Run N-zones European Unit Commitment model over a grid of cases, in parallel
+    :param network_name: just to set associated attribute in PyPSA network
+    :param target_years: list of target years; if None, the one of input JSON files
+    :param climatic_years: list of climatic years; if None, all available ones - including stress test ones
+    :param uc_periods: list of (start, end) UC periods; if None, the one of input JSON files
+    :param max_workers: number of processes used; if None, number of CPUs
+    :param solver_params: optimisation solver name/license_file; if None read from JSON file
+    :param solver_profile: name of the solver performance profile - in solver params JSON file - used if
+    solver_params is None; fast-LP (IPM without crossover) by default for batch adequacy runs
+    :param with_figures: plot per-case figures (prod., link flows, prices)
+    :param result_file_format: of per-case optimal decisions and prices; parquet by default -> all cases in a
+    single dataset, partitioned by (target year, climatic year, period start); csv also possible
+    :param extra_params: dict to gather some additional parameters for dev. usage / debug
+        - log_level: it will overwrite the one defined in usage parameters JSON file
+    :returns table of UC summary metrics, with one row per case - also saved in a CSV file
+    """
+    if extra_params is None:
+        extra_params = {}
+
+    batch_start = time.time()
+    output_folder = set_full_lt_uc_output_folder()
+    deactivate_verbose_warnings()
+
+    usage_params = read_usage_params()
+    log_level = extra_params.get('log_level', usage_params.log_level)
+    init_logger(logger_dir=output_folder, logger_name='eraa_lt_uc_batch.log', log_level=log_level)
+    logging.info(f'Start ERAA-PyPSA long-term European UC batch simulation for network: {network_name}')
+
+    logging.info(f'{TITLE_LOG_SEP} I) Read UC run parameters - once for all cases {TITLE_LOG_SEP}')
+    fuel_sources = set_fuel_sources_from_json()
+    eraa_data_descr, uc_run_params = (
+        read_and_check_uc_run_params(phase_name=EnvPhaseNames.multizones_uc_model, usage_params=usage_params)
+    )
+    if solver_params is None:
+        solver_params = read_solver_params(profile_name=solver_profile)
+
+    if target_years is None:
+        target_years = [uc_run_params.selected_target_year]
+    if climatic_years is None:
+        climatic_years = get_all_climatic_years(eraa_data_descr=eraa_data_descr)
+    if uc_periods is None:
+        uc_periods = [(uc_run_params.uc_period_start, uc_run_params.uc_period_end)]
+    uc_cases = set_uc_cases_grid(target_years=target_years, climatic_years=climatic_years, uc_periods=uc_periods)
+    check_uc_cases(uc_cases=uc_cases, uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+    n_cases = len(uc_cases)
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    max_workers = max(1, min(max_workers, n_cases))
+    # share CPUs between workers if number of solver threads not set in profile -> avoid oversubscription
+    if solver_params.profile is not None and solver_params.profile.threads is None:
+        n_threads = max(1, os.cpu_count() // max_workers)
+        solver_params = replace(solver_params, profile=replace(solver_params.profile, threads=n_threads))
+        logging.info(f'{n_threads} solver thread(s) per UC case')
+
+    logging.info(f'{TITLE_LOG_SEP} II) Run {n_cases} UC cases with {max_workers} processes {TITLE_LOG_SEP}')
+    logging.info(f'Target years {target_years}, climatic years {climatic_years}, '
+                 f'period starts {[period_start.strftime("%Y/%m/%d") for period_start, _ in uc_periods]}; '
+                 f'per-case logs in {output_folder}')
+    shared_inputs = UCBatchSharedInputs(network_name=network_name, eraa_data_descr=eraa_data_descr,
+                                        uc_run_params=uc_run_params, fuel_sources=fuel_sources,
+                                        solver_params=solver_params, log_level=log_level,
+                                        output_folder=output_folder, with_figures=with_figures,
+                                        result_file_format=result_file_format)
+    uc_case_results = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=init_uc_batch_worker,
+                             initargs=(shared_inputs,)) as executor:
+        futures = [executor.submit(run_uc_batch_case, uc_case) for uc_case in uc_cases]
+        for i_case, future in enumerate(as_completed(futures)):
+            uc_case_result = future.result()
+            uc_case_results.append(uc_case_result)
+            logging.info(f'[{i_case + 1}/{n_cases}] {uc_case_result.uc_case}: {uc_case_result.status} '
+                         f'({uc_case_result.run_time:.2f}s)')
+
+    logging.info(f'{TITLE_LOG_SEP} III) Save consolidated UC summary metrics {TITLE_LOG_SEP}')
+    # same order as grid of cases, whatever the order of completion
+    case_order = {uc_case: i_case for i_case, uc_case in enumerate(uc_cases)}
+    uc_case_results.sort(key=lambda result: case_order[result.uc_case])
+    df_summary = pd.DataFrame([result.to_table_row() for result in uc_case_results])
+    summary_file = get_uc_batch_summary_file()
+    df_summary.to_csv(summary_file, index=False)
+    logging.info(f'UC summary metrics of the {n_cases} cases saved in {summary_file}')
+    failed_cases = [result.uc_case for result in uc_case_results if result.status != UC_BATCH_CASE_STATUS.optimal]
+    if len(failed_cases) > 0:
+        logging.warning(f'{len(failed_cases)} case(s) without optimal solution: {failed_cases}')
+
+    batch_end = time.time()
+    logging.info(f'{TITLE_LOG_SEP} THE END of ERAA-PyPSA long-term UC batch simulation! '
+                 f'(after {batch_end - batch_start:.2f}s) {TITLE_LOG_SEP}')
+    stop_logger()
+    return df_summary
+
+
+if __name__ == '__main__':
+    # all available climatic years - including stress test ones - for the two ERAA target years
+    run_batch(target_years=[2025, 2033])
@@ -331,17 +331,11 @@ if optim_status == pypsa_opt_resol_status:
 
     # Save optimal decisions to output csv files -> you can have look in more detail to the obtained solution
     print('Save optimal dispatch decisions to .csv file')
-    # (Per unit type) Production decisions
-    uc_optimal_solution.save_decisions_to_csv(year=uc_run_params.selected_target_year,
-                                              climatic_year=uc_run_params.selected_climatic_year,
-                                              start_horizon=uc_run_params.uc_period_start, toy_model_output=True,
-                                              country=country)
-
-    # Marginal prices
-    uc_optimal_solution.save_marginal_prices_to_csv(year=uc_run_params.selected_target_year,
-                                                    climatic_year=uc_run_params.selected_climatic_year,
-                                                    start_horizon=uc_run_params.uc_period_start, toy_model_output=True,
-                                                    country=country)
+    # (Per unit type) Production decisions, storage and link flow ones, and marginal prices
+    uc_optimal_solution.save_results(year=uc_run_params.selected_target_year,
+                                     climatic_year=uc_run_params.selected_climatic_year,
+                                     start_horizon=uc_run_params.uc_period_start, toy_model_output=True,
+                                     country=country)
 else:
     print(f'Optimisation resolution status is not {pypsa_opt_resol_status} '
           f'-> output data (resp. figures) cannot be saved (resp. plotted), excepting installed capas one')
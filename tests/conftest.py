@@ -0,0 +1,47 @@
+"""
+Shared fixtures of the tests - run from the root of this project (data and input paths being relative to it) with:
+python -m pytest tests
+"""
+import logging
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+os.chdir(ROOT_DIR)
+
+from common.constants.extract_eraa_data import ERAADatasetDescr
+from common.uc_run_params import UCRunParams
+from utils.read import set_eraa_data_descr, set_json_params_fixed
+
+
+@pytest.fixture(scope='session')
+def eraa_data_descr() -> ERAADatasetDescr:
+    return set_eraa_data_descr(json_params_fixed=set_json_params_fixed())
+
+
+def set_test_uc_run_params(eraa_data_descr: ERAADatasetDescr, selected_prod_types: dict, target_year: int = 2025,
+                           climatic_year: int = 1989, period_start: str = '1900/1/1', period_end: str = '1900/1/8',
+                           **other_params) -> UCRunParams:
+    """
+    UC run params processed and checked as when read from JSON files - but independent of the JSON files to be
+    modified by users
+    """
+    uc_run_params = UCRunParams(selected_climatic_year=climatic_year, selected_countries=list(selected_prod_types),
+                                selected_target_year=target_year, selected_prod_types=selected_prod_types,
+                                uc_period_start=period_start, uc_period_end=period_end, failure_power_capa=1e10,
+                                failure_penalty=1e5, **other_params)
+    uc_run_params.process(available_countries=eraa_data_descr.available_countries)
+    uc_run_params.set_is_stress_test(avail_cy_stress_test=eraa_data_descr.available_climatic_years_stress_test)
+    uc_run_params.coherence_check(eraa_data_descr=eraa_data_descr)
+    return uc_run_params
+
+
+@pytest.fixture(autouse=True)
+def quiet_logging():
+    logging.disable(logging.INFO)
+    yield
+    logging.disable(logging.NOTSET)
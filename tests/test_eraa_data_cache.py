@@ -0,0 +1,78 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+import utils.eraa_data_cache
+from common.long_term_uc_io import COLUMN_NAMES, FILES_FORMAT
+from utils.eraa_data_cache import get_cache_file, get_signature_file, is_cache_valid, read_eraa_csv, \
+    write_file_atomically
+from utils.eraa_data_reader import filter_input_data
+from utils.eraa_data_store import ERAADataKey, ERAADataStore
+
+
+@pytest.fixture
+def csv_file(tmp_path) -> str:
+    df = pd.DataFrame({COLUMN_NAMES.climatic_year: [1989] * 3 + [1990] * 3,
+                       COLUMN_NAMES.date: ['1900-01-01 00:00:00', '1900-01-01 01:00:00', '1900-01-01 02:00:00'] * 2,
+                       COLUMN_NAMES.value: [1.5, 2.5, 3.5, 4.5, 5.5, 6.5]})
+    file = str(tmp_path / 'demand_2025_france.csv')
+    df.to_csv(file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep, index=False)
+    return file
+
+
+def test_concurrent_cache_writes(csv_file):
+    # e.g. workers of a process pool started without cache -> all write it
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        dfs = list(executor.map(lambda _: read_eraa_csv(csv_file=csv_file), range(16)))
+    cache_file = get_cache_file(csv_file=csv_file)
+    assert is_cache_valid(csv_file=csv_file, cache_file=cache_file)
+    # only complete cache and signature files, no temporary one left
+    expected_files = [cache_file, get_signature_file(cache_file=cache_file)]
+    assert sorted(os.listdir(os.path.dirname(cache_file))) == sorted(os.path.basename(elt) for elt in expected_files)
+    df_cached = read_eraa_csv(csv_file=csv_file)
+    for df in dfs:
+        pd.testing.assert_frame_equal(df, df_cached)
+
+
+def test_interrupted_write_keeps_previous_file(tmp_path):
+    file = str(tmp_path / 'data.txt')
+
+    def complete_write(tmp_file: str):
+        with open(tmp_file, 'w') as f:
+            f.write('complete')
+
+    def interrupted_write(tmp_file: str):
+        with open(tmp_file, 'w') as f:
+            f.write('part')
+        raise OSError('disk full')
+
+    write_file_atomically(file=file, write_func=complete_write)
+    with pytest.raises(OSError):
+        write_file_atomically(file=file, write_func=interrupted_write)
+    assert os.listdir(tmp_path) == ['data.txt']
+    with open(file, 'r') as f:
+        assert f.read() == 'complete'
+
+
+@pytest.mark.parametrize('climatic_year', [1989, 1990, 2000])
+def test_only_cy_rows_read_without_cache(csv_file, monkeypatch, climatic_year):
+    monkeypatch.setattr(utils.eraa_data_cache, 'USE_ERAA_DATA_CACHE', False)
+    eraa_data_store = ERAADataStore()
+    data_key = ERAADataKey(datatype='demand', target_year=2025, country='france')
+    period = (datetime(year=1900, month=1, day=1, hour=1), datetime(year=1900, month=1, day=2))
+    df_cy = eraa_data_store.get_ts_data(key=data_key, csv_file=csv_file, climatic_year=climatic_year, period=period)
+    # only rows of the climatic year read and stored, no binary cache written
+    assert data_key not in eraa_data_store
+    cy_stored_data = eraa_data_store._data[ERAADataKey(datatype='demand', target_year=2025, country='france',
+                                                       climatic_year=climatic_year)]
+    assert len(cy_stored_data.df) == (3 if climatic_year in [1989, 1990] else 0)
+    assert not os.path.exists(get_cache_file(csv_file=csv_file))
+    # same as full file read, then filtered
+    df_full = read_eraa_csv(csv_file=csv_file)
+    df_expected = filter_input_data(df=df_full, date_col=COLUMN_NAMES.date,
+                                    climatic_year_col=COLUMN_NAMES.climatic_year, period_start=period[0],
+                                    period_end=period[1], climatic_year=climatic_year)
+    pd.testing.assert_frame_equal(df_cy, df_expected)
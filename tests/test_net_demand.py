@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from common.constants.datatypes import DATATYPE_NAMES
+from common.constants.extract_eraa_data import FAILURE_ASSET
+from common.long_term_uc_io import COLUMN_NAMES
+from include.dataset import Dataset, set_cf_matrix
+from conftest import set_test_uc_run_params
+
+
+def get_countries_data(eraa_data_descr, uc_run_params, datatypes_selec) -> Dataset:
+    eraa_dataset = Dataset(source=f'eraa_{eraa_data_descr.eraa_edition}',
+                           agg_prod_types_with_cf_data=eraa_data_descr.agg_prod_types_with_cf_data)
+    eraa_dataset.get_countries_data(uc_run_params=uc_run_params,
+                                    aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def,
+                                    datatypes_selec=datatypes_selec)
+    return eraa_dataset
+
+
+def test_cf_matrix_without_cf_data():
+    dates = pd.date_range(start='1900-01-01', periods=24, freq='h')
+    cf_matrix, pts_with_cf_data, pts_wo_cf_data, cf_dates = (
+        set_cf_matrix(df_agg_cf=None, cf_agg_prod_types_tb_read=['solar_pv'], dates=dates))
+    assert cf_matrix.shape == (0, len(dates))
+    assert pts_with_cf_data == [] and pts_wo_cf_data == ['solar_pv']
+    assert cf_dates.equals(dates)
+
+
+def test_net_demand_of_country_without_cf_prod_type(eraa_data_descr):
+    # no prod. type with CF data in Germany -> net demand = demand - hydro RoR prod.
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'france': ['nuclear', 'wind_onshore'],
+                                                                'germany': ['coal', FAILURE_ASSET]})
+    eraa_dataset = get_countries_data(eraa_data_descr=eraa_data_descr, uc_run_params=uc_run_params,
+                                      datatypes_selec=[DATATYPE_NAMES.net_demand])
+    ref_dataset = get_countries_data(eraa_data_descr=eraa_data_descr, uc_run_params=uc_run_params,
+                                     datatypes_selec=[DATATYPE_NAMES.demand, DATATYPE_NAMES.hydro_ror])
+    value_col = COLUMN_NAMES.value
+    expected_net_demand = (np.array(ref_dataset.demand['germany'][value_col], dtype=np.float64)
+                           - np.array(ref_dataset.hydro_ror_data['germany'][value_col]))
+    assert np.array_equal(np.array(eraa_dataset.net_demand['germany'][value_col]), expected_net_demand)
+    # and CF prod. types accounted for in France
+    expected_fra_net_demand = np.array(ref_dataset.demand['france'][value_col], dtype=np.float64)
+    assert np.all(np.array(eraa_dataset.net_demand['france'][value_col]) < expected_fra_net_demand)
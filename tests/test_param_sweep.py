@@ -0,0 +1,69 @@
+from typing import Dict
+
+import pandas as pd
+import pytest
+
+from common.constants.optimisation import DEFAULT_OPTIM_SOLVER_PARAMS, OPTIM_RESOL_STATUS
+from common.fuel_sources import set_fuel_sources_from_json
+from include.dataset_builder import PypsaModel
+from include.param_sweep import UCSweepCase, get_changed_values
+from my_little_europe_lt_uc import create_pypsa_network_model, get_needed_eraa_data
+from conftest import set_test_uc_run_params
+
+
+def set_test_pypsa_model(eraa_data_descr, uc_run_params, gen_params_tb_set: Dict[str, pd.Series] = None) \
+        -> PypsaModel:
+    eraa_dataset = get_needed_eraa_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+    pypsa_model = create_pypsa_network_model(name='test sweep', uc_run_params=uc_run_params, eraa_dataset=eraa_dataset,
+                                             zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                             fuel_sources=set_fuel_sources_from_json(), plot_network=False)
+    if gen_params_tb_set is not None:
+        for param_name, param_values in gen_params_tb_set.items():
+            pypsa_model.network.generators.loc[param_values.index, param_name] = param_values
+    pypsa_model.set_optim_solver(solver_params=DEFAULT_OPTIM_SOLVER_PARAMS)
+    pypsa_model.build_optim_model()
+    return pypsa_model
+
+
+def solve_and_get_opt_value(pypsa_model: PypsaModel) -> float:
+    result = pypsa_model.solve_optim_model(warm_start=False)
+    assert result[1] == OPTIM_RESOL_STATUS.optimal
+    return pypsa_model.get_opt_value(pypsa_resol_status=result[1])
+
+
+@pytest.mark.parametrize('sweep_case', [
+    UCSweepCase(name='capas', capacities_tb_overwritten={'france': {'nuclear': 30000}, 'germany': {'coal': 0}}),
+    UCSweepCase(name='costs', marginal_costs={'nuclear': 60, 'coal': 20}),
+    UCSweepCase(name='co2-price', co2_emis_price=150),
+    UCSweepCase(name='all', capacities_tb_overwritten={'france': {'nuclear': 30000}},
+                marginal_costs={'coal': 20}, co2_emis_price=150)
+])
+def test_updated_model_same_objective_as_rebuilt_one(eraa_data_descr, sweep_case):
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'france': ['all'], 'germany': ['all']},
+                                           period_start='1900/1/1', period_end='1900/1/3')
+    # base model solved, then its p_nom bounds and objective costs updated - as in run_uc_case_sweep
+    updated_model = set_test_pypsa_model(eraa_data_descr=eraa_data_descr, uc_run_params=uc_run_params)
+    base_opt_value = solve_and_get_opt_value(pypsa_model=updated_model)
+    generators = updated_model.network.generators
+    new_p_noms = sweep_case.get_gen_p_noms(base_p_noms=generators.p_nom)
+    new_marginal_costs = sweep_case.get_gen_marginal_costs(base_marginal_costs=generators.marginal_cost)
+    if sweep_case.co2_emis_price is not None:
+        new_marginal_costs = pd.Series(
+            updated_model.get_gen_marginal_costs_with_co2_price(co2_emis_price=sweep_case.co2_emis_price,
+                                                                base_marginal_costs=new_marginal_costs)
+        )
+    changed_p_noms = get_changed_values(new_values=new_p_noms, current_values=generators.p_nom)
+    changed_marginal_costs = get_changed_values(new_values=new_marginal_costs, current_values=generators.marginal_cost)
+    assert len(changed_p_noms) + len(changed_marginal_costs) > 0
+    if len(changed_p_noms) > 0:
+        updated_model.update_gen_p_nom(new_p_noms=changed_p_noms)
+    if len(changed_marginal_costs) > 0:
+        updated_model.update_gen_marginal_costs(new_marginal_costs=changed_marginal_costs)
+    updated_opt_value = solve_and_get_opt_value(pypsa_model=updated_model)
+    # model rebuilt from a network with the same values
+    rebuilt_model = set_test_pypsa_model(eraa_data_descr=eraa_data_descr, uc_run_params=uc_run_params,
+                                         gen_params_tb_set={'p_nom': new_p_noms, 'marginal_cost': new_marginal_costs})
+    rebuilt_opt_value = solve_and_get_opt_value(pypsa_model=rebuilt_model)
+    assert updated_opt_value != pytest.approx(base_opt_value, rel=1e-6)
+    assert updated_opt_value == pytest.approx(rebuilt_opt_value, rel=1e-6)
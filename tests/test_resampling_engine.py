@@ -0,0 +1,56 @@
+"""
+Golden test of the NumPy (all zones at once) resampling engine, resample_and_distribute_per_zone, vs. the pandas
+per-zone resample_and_distribute function - on hydro data of data/ERAA_2023-2 folder
+"""
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from common.constants.datatypes import DATATYPE_NAMES
+from common.long_term_uc_io import COLUMN_NAMES, DT_SUBFOLDERS, HYDRO_DATA_RESAMPLE_METHODS, \
+    HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, HYDRO_TS_GRANULARITY, HYDRO_VALUE_COLUMNS, INPUT_ERAA_FOLDER
+from include.dataset import set_final_hydro_key_cols
+from utils.df_utils import resample_and_distribute, resample_and_distribute_per_zone, selec_in_df_based_on_list
+from utils.eraa_data_reader import filter_input_data, read_and_process_hydro_data
+
+HYDRO_DTS = [DATATYPE_NAMES.hydro_ror, DATATYPE_NAMES.hydro_inflows, DATATYPE_NAMES.hydro_levels_min]
+CLIMATIC_YEARS = [1982, 1989, 2016]
+# period start not always on a Monday, to check the case of weekly data starting before it
+PERIODS = [(datetime(1900, 1, 1), datetime(1900, 1, 8)), (datetime(1900, 1, 3), datetime(1900, 1, 20)),
+           (datetime(1900, 3, 7, 5), datetime(1900, 6, 1)), (datetime(1900, 1, 1), datetime(1900, 12, 24))]
+
+
+@pytest.fixture(scope='module')
+def per_dt_hydro_data() -> dict:
+    hydro_folder = os.path.join(INPUT_ERAA_FOLDER, DT_SUBFOLDERS.hydro)
+    return {hydro_dt: read_and_process_hydro_data(hydro_dt=hydro_dt, folder=hydro_folder) for hydro_dt in HYDRO_DTS}
+
+
+@pytest.mark.parametrize('period', PERIODS, ids=[f'{start:%m%d%H}-{end:%m%d}' for start, end in PERIODS])
+@pytest.mark.parametrize('climatic_year', CLIMATIC_YEARS)
+@pytest.mark.parametrize('hydro_dt', HYDRO_DTS)
+def test_per_zone_resampling_same_as_pandas_one(per_dt_hydro_data, hydro_dt, climatic_year, period):
+    df_hydro_all = per_dt_hydro_data[hydro_dt]
+    # including a zone without data
+    zones = sorted(set(df_hydro_all[COLUMN_NAMES.zone])) + ['atlantis']
+    df_hydro_data = filter_input_data(df=df_hydro_all, date_col=COLUMN_NAMES.date,
+                                      climatic_year_col=COLUMN_NAMES.climatic_year, period_start=period[0],
+                                      period_end=period[1], climatic_year=climatic_year)
+    # same args as in get_hydro_data
+    resample_args = {'date_col': COLUMN_NAMES.date, 'value_cols': HYDRO_VALUE_COLUMNS[hydro_dt],
+                     'key_cols': set_final_hydro_key_cols(hydro_dt=hydro_dt),
+                     'method': HYDRO_DATA_RESAMPLE_METHODS[hydro_dt],
+                     'start_date': min(period[0], min(df_hydro_data[COLUMN_NAMES.date])),
+                     'end_date': period[1] - timedelta(hours=1),
+                     'resample_divisor': 24 if HYDRO_TS_GRANULARITY[hydro_dt] == 'day' else 7 * 24,
+                     'fill_na_vals': HYDRO_LEVELS_RESAMPLE_FILLNA_VALS, 'freq': 'h'}
+    new_resampled = resample_and_distribute_per_zone(df=df_hydro_data, zone_col=COLUMN_NAMES.zone, zones=zones,
+                                                     **resample_args)
+    for zone in zones:
+        zone_df = selec_in_df_based_on_list(df=df_hydro_data, selec_col=COLUMN_NAMES.zone, selec_vals=[zone],
+                                            rm_selec_col=True)
+        ref_resampled = resample_and_distribute(df=zone_df, **resample_args) if len(zone_df) > 0 else pd.DataFrame()
+        pd.testing.assert_frame_equal(ref_resampled, new_resampled[zone], check_freq=False,
+                                      check_index_type=len(ref_resampled) > 0)
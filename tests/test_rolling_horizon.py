@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.constants.optimisation import DEFAULT_OPTIM_SOLVER_PARAMS, OPTIM_RESOL_STATUS, WHOLE_PERIOD_GRANULARITY
+from common.constants.temporal import Timescale
+from common.fuel_sources import set_fuel_sources_from_json
+from include.rolling_horizon import RollingHorizonParams, get_final_soc, set_rolling_horizon_windows, \
+    set_window_sum_prod_constraints
+from include.uc_postprocessing import concat_uc_opt_solutions
+from my_little_europe_lt_uc import solve_rolling_horizon_windows
+from utils.dates import set_target_year_in_period
+from conftest import set_test_uc_run_params
+
+
+@pytest.mark.parametrize('temporal_granularity, upper_bound', [(Timescale.week, [1, 2, 3]),
+                                                               (Timescale.day, list(range(1, 22))),
+                                                               (WHOLE_PERIOD_GRANULARITY, [6])])
+def test_window_sum_prod_constraints_prorated_to_kept_days(eraa_data_descr, temporal_granularity, upper_bound):
+    max_co2_emis_constraints = {'temporal_granularity': temporal_granularity,
+                                'cases': [{'countries': ['france', 'germany'], 'upper_bound': upper_bound}]}
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'france': ['nuclear'], 'germany': ['coal']},
+                                           period_start='1900/1/1', period_end='1900/1/22',
+                                           max_co2_emis_constraints=max_co2_emis_constraints)
+    [full_constraint] = uc_run_params.sum_prod_constraints
+    # kept parts of 5 days -> not aligned with weeks
+    windows = set_rolling_horizon_windows(period_start=uc_run_params.uc_period_start,
+                                          period_end=uc_run_params.uc_period_end,
+                                          rolling_horizon_params=RollingHorizonParams(n_days_kept=5, n_guard_days=2))
+    total_bound = 0
+    for window in windows:
+        [window_constraint] = set_window_sum_prod_constraints(
+            sum_prod_constraints=uc_run_params.sum_prod_constraints, window=window)
+        assert window_constraint.dates[0] == window.start and window_constraint.dates[-1] == window.kept_end
+        assert len(window_constraint.dates) == len(window_constraint.bound) + 1
+        total_bound += window_constraint.bound.sum()
+    assert total_bound == pytest.approx(full_constraint.bound.sum())
+    # first window: first 5 days of the first week (or period)
+    [first_constraint] = set_window_sum_prod_constraints(sum_prod_constraints=uc_run_params.sum_prod_constraints,
+                                                         window=windows[0])
+    n_days_in_first_period = (full_constraint.dates[1] - full_constraint.dates[0]).days
+    if temporal_granularity != Timescale.day:
+        assert first_constraint.bound[0] == pytest.approx(full_constraint.bound[0] * 5 / n_days_in_first_period)
+    # full-period constraint not modified
+    assert np.array_equal(full_constraint.bound, np.array(upper_bound, dtype=float))
+    assert full_constraint.dates[-1] == datetime(year=1900, month=1, day=22)
+
+
+def test_multi_window_soc_hand_off_and_stitching(eraa_data_descr):
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'france': ['all'], 'germany': ['all']},
+                                           period_start='1900/1/1', period_end='1900/1/22')
+    pypsa_model, _, optim_status, window_results = (
+        solve_rolling_horizon_windows(network_name='test rolling horizon', uc_run_params=uc_run_params,
+                                      eraa_data_descr=eraa_data_descr, fuel_sources=set_fuel_sources_from_json(),
+                                      solver_params=DEFAULT_OPTIM_SOLVER_PARAMS,
+                                      rolling_horizon_params=RollingHorizonParams(n_days_kept=7, n_guard_days=2),
+                                      plot_network=False)
+    )
+    assert optim_status == OPTIM_RESOL_STATUS.optimal
+    assert len(window_results) == 3
+    target_year = uc_run_params.selected_target_year
+    # initial SOC of window k+1 = SOC of window k at the end of its kept part (last hour before kept_end)
+    for prev_result, next_result in zip(window_results[:-1], window_results[1:]):
+        _, kept_end = set_target_year_in_period(period_start=prev_result.window.start,
+                                                period_end=prev_result.window.kept_end, target_year=target_year)
+        assert prev_result.kept_solution.storage_soc.index[-1] == kept_end - timedelta(hours=1)
+        final_soc = get_final_soc(uc_opt_solution=prev_result.kept_solution)
+        assert len(next_result.init_soc) > 0
+        for unit_name, init_soc in next_result.init_soc.items():
+            assert init_soc == pytest.approx(final_soc[unit_name])
+    # stitched solution: continuous hourly index over the full period, without ring guard days
+    stitched_solution = concat_uc_opt_solutions(uc_opt_solutions=[elt.kept_solution for elt in window_results])
+    period_start, period_end = set_target_year_in_period(period_start=uc_run_params.uc_period_start,
+                                                         period_end=uc_run_params.uc_period_end,
+                                                         target_year=target_year)
+    expected_index = pd.date_range(start=period_start, end=period_end, freq='h', inclusive='left')
+    for df in [stitched_solution.prod, stitched_solution.storage_soc]:
+        assert df.index.equals(expected_index)
+    # total cost of the stitched solution = sum of the costs of the windows
+    network = pypsa_model.network
+    stitched_cost = stitched_solution.calc_total_cost(
+        snapshot_weightings=pd.concat([elt.snapshot_weightings for elt in window_results]),
+        gen_marginal_costs=network.generators.marginal_cost,
+        storage_marginal_costs=network.storage_units.marginal_cost)
+    assert stitched_cost == pytest.approx(sum(elt.cost for elt in window_results))
+    # final SOC target of the last window (units with cyclic SOC over the full period) reached
+    soc_set = network.storage_units_t.state_of_charge_set
+    assert soc_set.shape[1] > 0
+    for unit_name in soc_set.columns:
+        assert network.storage_units_t.state_of_charge[unit_name].iloc[-1] == pytest.approx(soc_set[unit_name].iloc[-1])
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from common.constants.optimisation import DEFAULT_OPTIM_SOLVER_PARAMS, OPTIM_RESOL_STATUS
+from common.constants.temporal import Timescale
+from common.fuel_sources import set_fuel_sources_from_json
+from include.dataset_builder import PypsaModel, get_country_bus_name
+from my_little_europe_lt_uc import create_pypsa_network_model, get_needed_eraa_data, solve_pypsa_network_model
+from conftest import set_test_uc_run_params
+
+COUNTRIES = ['france', 'germany']
+N_HOURS_PER_WEEK = 7 * 24
+
+
+def solve_test_pypsa_model(eraa_data_descr, uc_run_params) -> (PypsaModel, float):
+    eraa_dataset = get_needed_eraa_data(uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+    pypsa_model = create_pypsa_network_model(name='test co2 cap', uc_run_params=uc_run_params,
+                                             eraa_dataset=eraa_dataset,
+                                             zones_gps_coords=eraa_data_descr.gps_coordinates,
+                                             fuel_sources=set_fuel_sources_from_json(), plot_network=False)
+    result = solve_pypsa_network_model(pypsa_model=pypsa_model, year=uc_run_params.selected_target_year,
+                                       n_countries=len(COUNTRIES), uc_period_start=uc_run_params.uc_period_start,
+                                       solver_params=DEFAULT_OPTIM_SOLVER_PARAMS, save_lp_file=False)
+    assert result[1] == OPTIM_RESOL_STATUS.optimal
+    return pypsa_model, pypsa_model.get_opt_value(pypsa_resol_status=result[1])
+
+
+def get_weekly_co2_emissions(network) -> np.ndarray:
+    """
+    Sum over each week of weights x prod. x CO2 emission factor of the generators of the considered countries (in t)
+    """
+    generators = network.generators
+    co2_factors = generators.carrier.map(network.carriers.co2_emissions).fillna(0)
+    co2_factors = co2_factors[generators.bus.isin([get_country_bus_name(country=country) for country in COUNTRIES])]
+    weighted_prod = network.generators_t.p[co2_factors.index].mul(network.snapshot_weightings.generators, axis=0)
+    hourly_emissions = weighted_prod.values @ co2_factors.values
+    return hourly_emissions.reshape(-1, N_HOURS_PER_WEEK).sum(axis=1)
+
+
+def test_weekly_co2_cap_respected_and_binding(eraa_data_descr):
+    # 2 full weeks, starting on a Monday. N.B. selected_prod_types completed with all countries when processed
+    # -> a new dict for each run params
+    common_params = {'eraa_data_descr': eraa_data_descr, 'period_start': '1900/1/1', 'period_end': '1900/1/15'}
+    uc_run_params = set_test_uc_run_params(selected_prod_types={country: ['all'] for country in COUNTRIES},
+                                           **common_params)
+    uncapped_model, uncapped_opt_value = solve_test_pypsa_model(eraa_data_descr=eraa_data_descr,
+                                                                uc_run_params=uc_run_params)
+    uncapped_emissions = get_weekly_co2_emissions(network=uncapped_model.network)
+    assert len(uncapped_emissions) == 2 and np.all(uncapped_emissions > 0)
+    # weekly cap (in Mt) below uncapped emissions
+    upper_bound = list(np.round(0.8 * uncapped_emissions / 1e6, 3))
+    max_co2_emis_constraints = {'temporal_granularity': Timescale.week,
+                                'cases': [{'countries': COUNTRIES, 'upper_bound': upper_bound}]}
+    capped_uc_run_params = set_test_uc_run_params(selected_prod_types={country: ['all'] for country in COUNTRIES},
+                                                  max_co2_emis_constraints=max_co2_emis_constraints,
+                                                  **common_params)
+    capped_model, capped_opt_value = solve_test_pypsa_model(eraa_data_descr=eraa_data_descr,
+                                                            uc_run_params=capped_uc_run_params)
+    capped_emissions = get_weekly_co2_emissions(network=capped_model.network)
+    assert np.all(capped_emissions <= np.array(upper_bound) * 1e6 * (1 + 1e-6))
+    # cap binding -> more expensive dispatch
+    assert capped_opt_value > uncapped_opt_value
@@ -0,0 +1,56 @@
+import pytest
+
+from common.constants.datatypes import DATATYPE_NAMES
+from common.constants.extract_eraa_data import FAILURE_ASSET
+from include.dataset import Dataset
+from my_little_europe_lt_uc_batch import UCCase, check_uc_cases
+from conftest import set_test_uc_run_params
+
+
+def set_uc_case(uc_run_params, target_year: int) -> UCCase:
+    return UCCase(target_year=target_year, climatic_year=uc_run_params.selected_climatic_year,
+                  uc_period_start=uc_run_params.uc_period_start, uc_period_end=uc_run_params.uc_period_end)
+
+
+def test_all_prod_types_set_for_case_target_year(eraa_data_descr):
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'poland': ['all'], 'france': ['all']})
+    case_uc_run_params = set_uc_case(uc_run_params=uc_run_params, target_year=2033).set_uc_run_params(
+        uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+    for country in ['poland', 'france']:
+        assert (set(case_uc_run_params.selected_prod_types[country])
+                == set(eraa_data_descr.available_aggreg_prod_types[country][2033]) | {FAILURE_ASSET})
+    # common params not modified
+    assert 'nuclear' not in uc_run_params.selected_prod_types['poland']
+    assert 'oil' in uc_run_params.selected_prod_types['france']
+
+
+def test_case_2033_has_2033_capacities(eraa_data_descr):
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr, selected_prod_types={'poland': ['all']})
+    per_year_capas = {}
+    for target_year in [2025, 2033]:
+        case_uc_run_params = set_uc_case(uc_run_params=uc_run_params, target_year=target_year).set_uc_run_params(
+            uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+        eraa_dataset = Dataset(source=f'eraa_{eraa_data_descr.eraa_edition}',
+                               agg_prod_types_with_cf_data=eraa_data_descr.agg_prod_types_with_cf_data)
+        eraa_dataset.get_countries_data(uc_run_params=case_uc_run_params,
+                                        aggreg_prod_types_def=eraa_data_descr.aggreg_prod_types_def,
+                                        datatypes_selec=[DATATYPE_NAMES.installed_capa])
+        df_capas = eraa_dataset.agg_gen_capa_data['poland']
+        per_year_capas[target_year] = df_capas.set_index('production_type_agg')['power_capacity']
+    # nuclear and wind offshore only in Poland 2033 ERAA data
+    for prod_type in ['nuclear', 'wind_offshore']:
+        assert prod_type not in per_year_capas[2025].index
+        assert per_year_capas[2033][prod_type] > 0
+    assert per_year_capas[2033]['coal'] < per_year_capas[2025]['coal']
+
+
+def test_check_uc_cases_stops_if_prod_type_unavailable_for_case_target_year(eraa_data_descr):
+    # coal not available in Germany in 2033
+    uc_run_params = set_test_uc_run_params(eraa_data_descr=eraa_data_descr,
+                                           selected_prod_types={'germany': ['coal', FAILURE_ASSET]})
+    check_uc_cases(uc_cases=[set_uc_case(uc_run_params=uc_run_params, target_year=2025)],
+                   uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
+    with pytest.raises(SystemExit):
+        check_uc_cases(uc_cases=[set_uc_case(uc_run_params=uc_run_params, target_year=2033)],
+                       uc_run_params=uc_run_params, eraa_data_descr=eraa_data_descr)
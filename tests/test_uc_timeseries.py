@@ -0,0 +1,30 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from include.uc_timeseries import UCTimeseries
+
+
+def set_test_uc_timeseries(extra_params: list) -> UCTimeseries:
+    dates = list(pd.date_range(start='2025-01-01', periods=48, freq='h'))
+    rng = np.random.default_rng(seed=0)
+    cases = [('france', 2025, 1989, extra_param_idx, None) for extra_param_idx in extra_params]
+    return UCTimeseries(name='demand', data_type='demand', unit='mw',
+                        values={case: rng.random(len(dates)) for case in cases},
+                        dates={case: dates for case in cases})
+
+
+@pytest.mark.parametrize('extra_params, extra_params_labels, expected_extra_params', [
+    ([None], None, [None]),
+    ([0, 1], None, [0, 1]),
+    ([None, 1], {1: 'high-demand'}, [None, 'high-demand'])
+])
+def test_stats_to_json_extra_params(tmp_path, extra_params, extra_params_labels, expected_extra_params):
+    uc_timeseries = set_test_uc_timeseries(extra_params=extra_params)
+    uc_timeseries.stats_to_json(output_dir=str(tmp_path), extra_params_labels=extra_params_labels)
+    [stats_file] = list(tmp_path.glob('*_stats.json'))
+    with open(stats_file) as f:
+        stats_data = json.load(f)['stats']
+    assert [case_stats.get('extra_params') for case_stats in stats_data] == expected_extra_params
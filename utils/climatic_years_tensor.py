@@ -0,0 +1,191 @@
+"""
+Dense (climatic year x date) arrays of ERAA timeseries data -> all the climatic years of a (country, target year,
+datatype) file obtained from a single read of this file, e.g. for analyses over all climatic years (duration curves,
+climatic-year averages...) instead of one read and filter per climatic year
+"""
+import logging
+import warnings
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.long_term_uc_io import COLUMN_NAMES
+
+# 4 bytes per value is enough for plots/statistics (ERAA demand values being integers, and capa. factors with 3
+# decimals)
+CY_TENSOR_DTYPE = np.float32
+
+
+@dataclass
+class ClimaticYearsTensor:
+    values: np.ndarray  # of shape (number of climatic years, number of dates), NaN where no data
+    climatic_years: np.ndarray  # (sorted) climatic years, i.e. index of the rows of values
+    dates: pd.DatetimeIndex  # (sorted) dates - in the fictive calendar year of ERAA data -, i.e. index of the columns
+    _per_year_dates: Dict[int, List[datetime]] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        self._cy_row = {int(cy): i for i, cy in enumerate(self.climatic_years)}
+
+    def __repr__(self) -> str:
+        return (f'ClimaticYearsTensor of {len(self.climatic_years)} climatic years * {len(self.dates)} dates '
+                f'({self.values.dtype})')
+
+    @property
+    def n_bytes(self) -> int:
+        return self.values.nbytes
+
+    def has_climatic_year(self, climatic_year: int) -> bool:
+        return climatic_year in self._cy_row
+
+    def get_cy_values(self, climatic_year: int) -> np.ndarray:
+        """
+        Values of a climatic year - a view on the tensor row, not to be modified in place
+        """
+        return self.values[self._cy_row[climatic_year]]
+
+    def get_dates_in_year(self, year: int) -> List[datetime]:
+        """
+        Dates with year set to a given (target) year - calculated once per year, as common to all climatic years
+        """
+        if year not in self._per_year_dates:
+            self._per_year_dates[year] = [elt_date.replace(year=year) for elt_date in self.dates]
+        return self._per_year_dates[year]
+
+    def select_climatic_years(self, climatic_years: List[int]) -> 'ClimaticYearsTensor':
+        rows = [self._cy_row[cy] for cy in climatic_years if cy in self._cy_row]
+        return ClimaticYearsTensor(values=self.values[rows], climatic_years=self.climatic_years[rows],
+                                   dates=self.dates)
+
+    def reindex(self, climatic_years: np.ndarray, dates: pd.DatetimeIndex, fill_value: float = np.nan) -> np.ndarray:
+        """
+        Values on a given (climatic year x date) grid - fill value where no data in this tensor
+        """
+        if np.array_equal(climatic_years, self.climatic_years) and dates.equals(self.dates):
+            return self.values
+        values = np.full((len(climatic_years), len(dates)), fill_value, dtype=self.values.dtype)
+        i_rows = pd.Index(climatic_years).get_indexer(self.climatic_years)
+        i_cols = dates.get_indexer(self.dates)
+        rows_in_grid, cols_in_grid = i_rows >= 0, i_cols >= 0
+        values[np.ix_(i_rows[rows_in_grid], i_cols[cols_in_grid])] = self.values[np.ix_(rows_in_grid, cols_in_grid)]
+        return values
+
+    def mean_over_cys(self) -> np.ndarray:
+        """
+        Per date average over climatic years (with data), accumulated in float64
+        """
+        with warnings.catch_warnings():  # all-NaN columns -> NaN, without RuntimeWarning
+            warnings.simplefilter('ignore', category=RuntimeWarning)
+            return np.nanmean(self.values, axis=0, dtype=np.float64)
+
+
+def get_block_dates_in_period(block_dates: np.ndarray, period_start: np.datetime64,
+                              period_end: np.datetime64) -> Tuple[np.ndarray, slice]:
+    """
+    Dates in [period_start, period_end) of the block of a climatic year, and associated selection of its rows - by
+    dichotomy if dates are sorted (general case in ERAA files), by a mask otherwise
+    """
+    if len(block_dates) < 2 or np.all(block_dates[1:] >= block_dates[:-1]):
+        i_start, i_end = np.searchsorted(block_dates, [period_start, period_end], side='left')
+        selec = slice(i_start, i_end)
+    else:
+        selec = np.flatnonzero((period_start <= block_dates) & (block_dates < period_end))
+    return block_dates[selec], selec
+
+
+def set_cy_tensor(df: pd.DataFrame, cy_row_index: Optional[Dict[int, Tuple[int, int]]],
+                  period: Tuple[datetime, datetime], dtype=CY_TENSOR_DTYPE) -> ClimaticYearsTensor:
+    """
+    Set (climatic year x date) tensor from the full df of an ERAA timeseries file
+    :param df: with climatic year, date and value columns
+    :param cy_row_index: {climatic year: (first row, number of rows)}, None if rows of a climatic year not contiguous
+    :param period: (start, end), end being EXCLUDED
+    :param dtype: of tensor values
+    N.B. climatic years without data in period are not in the tensor; dates are the union of the ones of all
+    climatic years (NaN values in tensor for the missing ones)
+    """
+    climatic_year_col = COLUMN_NAMES.climatic_year
+    all_dates = df[COLUMN_NAMES.date].to_numpy()
+    all_values = df[COLUMN_NAMES.value].to_numpy()
+    if cy_row_index is None:  # sort rows by climatic year, keeping date order in each block
+        i_sorted_rows = np.argsort(df[climatic_year_col].to_numpy(), kind='stable')
+        all_dates = all_dates[i_sorted_rows]
+        all_values = all_values[i_sorted_rows]
+        sorted_cys, block_starts, block_sizes = np.unique(df[climatic_year_col].to_numpy()[i_sorted_rows],
+                                                          return_index=True, return_counts=True)
+        cy_row_index = {int(cy): (int(start), int(size))
+                        for cy, start, size in zip(sorted_cys, block_starts, block_sizes)}
+    period_start, period_end = np.datetime64(period[0], 'ns'), np.datetime64(period[1], 'ns')
+    per_cy_dates = {}
+    per_cy_values = {}
+    for climatic_year in sorted(cy_row_index):
+        first_row, n_rows = cy_row_index[climatic_year]
+        block_dates, selec = get_block_dates_in_period(block_dates=all_dates[first_row:first_row + n_rows],
+                                                       period_start=period_start, period_end=period_end)
+        if len(block_dates) > 0:
+            per_cy_dates[climatic_year] = block_dates
+            per_cy_values[climatic_year] = all_values[first_row:first_row + n_rows][selec]
+    climatic_years = list(per_cy_dates)
+    if len(climatic_years) == 0:
+        return ClimaticYearsTensor(values=np.empty((0, 0), dtype=dtype), climatic_years=np.array([], dtype=int),
+                                   dates=pd.DatetimeIndex([]))
+
+    first_dates = per_cy_dates[climatic_years[0]]
+    # general case: same dates for all climatic years -> rows directly stacked
+    if all(np.array_equal(cy_dates, first_dates) for cy_dates in per_cy_dates.values()):
+        dates = first_dates
+        values = np.vstack([per_cy_values[cy] for cy in climatic_years]).astype(dtype, copy=False)
+    else:
+        dates = np.unique(np.concatenate(list(per_cy_dates.values())))
+        logging.debug(f'Different dates per climatic year in data -> tensor on union of their {len(dates)} dates')
+        values = np.full((len(climatic_years), len(dates)), np.nan, dtype=dtype)
+        for i_cy, climatic_year in enumerate(climatic_years):
+            values[i_cy, np.searchsorted(dates, per_cy_dates[climatic_year])] = per_cy_values[climatic_year]
+    return ClimaticYearsTensor(values=values, climatic_years=np.array(climatic_years),
+                               dates=pd.DatetimeIndex(dates))
+
+
+def set_cy_tensor_from_values(values: np.ndarray, climatic_years: np.ndarray, dates: pd.DatetimeIndex,
+                              dtype=CY_TENSOR_DTYPE) -> ClimaticYearsTensor:
+    """
+    Set tensor from values on a (climatic year x date) grid, e.g. obtained by calculation on aligned tensors -
+    dropping the climatic years without any data (all-NaN rows)
+    """
+    rows_with_data = ~np.all(np.isnan(values), axis=1)
+    if not np.all(rows_with_data):
+        values = values[rows_with_data]
+        climatic_years = climatic_years[rows_with_data]
+    return ClimaticYearsTensor(values=values.astype(dtype, copy=False), climatic_years=climatic_years, dates=dates)
+
+
+def get_union_grid(cy_tensors: List[ClimaticYearsTensor]) -> (np.ndarray, pd.DatetimeIndex):
+    """
+    Union of the climatic years and of the dates of tensors -> grid on which they can be aligned
+    """
+    first_tensor = cy_tensors[0]
+    if all(np.array_equal(tensor.climatic_years, first_tensor.climatic_years)
+           and tensor.dates.equals(first_tensor.dates) for tensor in cy_tensors):
+        return first_tensor.climatic_years, first_tensor.dates
+    climatic_years = np.unique(np.concatenate([tensor.climatic_years for tensor in cy_tensors]))
+    dates = pd.DatetimeIndex(np.unique(np.concatenate([tensor.dates.to_numpy() for tensor in cy_tensors])))
+    return climatic_years, dates
+
+
+def calc_avg_of_cy_tensors(cy_tensors: List[ClimaticYearsTensor]) -> ClimaticYearsTensor:
+    """
+    Element-wise average of tensors (e.g. capa. factors of the prod. types of an aggreg. prod. type), over the
+    available values -> as a groupby-mean on the concatenation of their dfs
+    """
+    first_tensor = cy_tensors[0]
+    dtype = first_tensor.values.dtype
+    if len(cy_tensors) == 1:
+        return first_tensor
+    # aligned on the union of climatic years and dates, NaN where missing
+    climatic_years, dates = get_union_grid(cy_tensors=cy_tensors)
+    values = np.stack([tensor.reindex(climatic_years=climatic_years, dates=dates) for tensor in cy_tensors])
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        avg_values = np.nanmean(values, axis=0, dtype=np.float64).astype(dtype, copy=False)
+    return ClimaticYearsTensor(values=avg_values, climatic_years=climatic_years, dates=dates)
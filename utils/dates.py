@@ -1,9 +1,11 @@
 import logging
 from calendar import calendar
 from datetime import datetime, date, timedelta
+from functools import lru_cache
 from typing import List, Optional, Union
 from math import ceil
 
+import numpy as np
 import pandas as pd
 
 from common.constants.temporal import DAY_OF_WEEK
@@ -21,6 +23,17 @@ def set_year_in_date(my_date: datetime, new_year: int) -> datetime:
                     hour=my_date.hour, minute=my_date.minute, second=my_date.second)
 
 
+def set_target_year_in_period(period_start: datetime, period_end: datetime, target_year: int) \
+        -> (datetime, datetime):
+    """
+    Set target year in a period of the (fictive) data year, keeping the year offset of its end
+    - e.g. 1900/1/1 -> 1901/1/1 for a full year period
+    """
+    year_offset = period_end.year - period_start.year
+    return (set_year_in_date(my_date=period_start, new_year=target_year),
+            set_year_in_date(my_date=period_end, new_year=target_year + year_offset))
+
+
 def remove_useless_zero_in_date(my_date: str, date_sep: str = '/') -> str:
     suppr_first_char = False
     if my_date.startswith('0'):
@@ -142,6 +155,46 @@ def set_date_from_year_and_day_idx(year: int, day_idx: int) -> datetime:
     return datetime(year, 1, 1) + timedelta(days=day_idx - 1)
 
 
+@lru_cache(maxsize=None)
+def get_iso_week_start_offsets(year: int) -> np.ndarray:
+    """
+    Offset table - in days from January 1st of year - of the Monday of each ISO week of this year
+    Returns: array with offset of week w at idx w (idx 0 unused, set to -1)
+    """
+    first_day = date(year, 1, 1)
+    first_monday_offset = (date.fromisocalendar(year, 1, 1) - first_day).days
+    # number of ISO weeks of the year: week of December 28th (always in last ISO week)
+    n_iso_weeks = date(year, 12, 28).isocalendar()[1]
+    offsets = first_monday_offset + 7 * np.arange(-1, n_iso_weeks, dtype=np.int64)
+    offsets[0] = -1
+    return offsets
+
+
+def set_dates_from_year_and_iso_idx(year: int, week_idx: np.ndarray, day_idx: Union[np.ndarray, int] = 1) \
+        -> np.ndarray:
+    """
+    Vectorized version of set_date_from_year_and_iso_idx, from arrays of (ISO) week and day (of week) idx
+    Returns: array of datetime64[ns] dates
+    """
+    week_idx = np.asarray(week_idx, dtype=np.int64)
+    day_idx = np.asarray(day_idx, dtype=np.int64)
+    week_offsets = get_iso_week_start_offsets(year=year)
+    n_iso_weeks = len(week_offsets) - 1
+    if np.any((week_idx < 1) | (week_idx > n_iso_weeks)) or np.any((day_idx < 1) | (day_idx > 7)):
+        raise ValueError(f'Invalid ISO week (1 to {n_iso_weeks}) or day (1 to 7) idx for year {year}')
+    day_offsets = week_offsets[week_idx] + day_idx - 1
+    return np.datetime64(f'{year}-01-01', 'ns') + day_offsets.astype('timedelta64[D]')
+
+
+def set_dates_from_year_and_day_idx(year: int, day_idx: np.ndarray) -> np.ndarray:
+    """
+    Vectorized version of set_date_from_year_and_day_idx
+    Returns: array of datetime64[ns] dates
+    """
+    day_offsets = np.asarray(day_idx, dtype=np.int64) - 1
+    return np.datetime64(f'{year}-01-01', 'ns') + day_offsets.astype('timedelta64[D]')
+
+
 def get_n_days_in_period(start: datetime, end: datetime) -> int:
     """
     Number of days in period, both start and end being included in it
@@ -11,7 +11,8 @@ from utils.basic_utils import get_key_of_val
 
 
 def cast_df_col_as_date(df: pd.DataFrame, date_col: str, date_format: str) -> pd.DataFrame:
-    df[date_col] = df[date_col].apply(lambda x: datetime.strptime(x, date_format))
+    # fixed format -> vectorized parsing (i.o. datetime.strptime applied row by row)
+    df[date_col] = pd.to_datetime(df[date_col], format=date_format)
     return df
 
 
@@ -204,6 +205,137 @@ def resample_and_distribute(df: pd.DataFrame, date_col: str, value_cols: list, m
     return resampled.reset_index().rename(columns={'index': date_col})
 
 
+def get_resampling_step_idx(step_dates: np.ndarray, avail_steps: np.ndarray, dates: np.ndarray) -> np.ndarray:
+    """
+    Get, for each zone and each (fine granularity) date, idx of the step (coarse granularity) value to be used: the
+    one of the last available step before - or at - this date, or the first available step for dates before it (i.e.,
+    'ffill' then 'bfill' logic)
+    Args:
+        step_dates: (n_steps,) sorted array of step dates, common to all zones
+        avail_steps: (n_zones, n_steps) boolean array, True if value available for the zone and step
+        dates: (n_dates,) sorted array of fine granularity dates
+
+    Returns: (n_zones, n_dates) array of step idx, -1 for zones without any available step
+    """
+    n_zones, n_steps = avail_steps.shape
+    # last step with date <= each date (-1 if before the first step)
+    last_step_idx = np.searchsorted(step_dates, dates, side='right') - 1
+    # per zone, last AVAILABLE step <= each step
+    avail_step_idx = np.where(avail_steps, np.arange(n_steps), -1)
+    last_avail_step_idx = np.maximum.accumulate(avail_step_idx, axis=1)
+    step_idx = np.where(last_step_idx >= 0, last_avail_step_idx[:, np.maximum(last_step_idx, 0)], -1)
+    # bfill before first available step of each zone
+    first_avail_step_idx = np.where(avail_steps.any(axis=1), avail_steps.argmax(axis=1), -1)
+    return np.where(step_idx >= 0, step_idx, first_avail_step_idx[:, np.newaxis])
+
+
+def resample_and_distribute_arrays(step_dates: np.ndarray, values: np.ndarray, avail_steps: np.ndarray,
+                                   dates: np.ndarray, method: str, resample_divisor: float = None,
+                                   fill_na_vals: np.ndarray = None) -> (np.ndarray, np.ndarray):
+    """
+    NumPy version of resample_and_distribute, applied to all zones at once
+    Args:
+        step_dates: (n_steps,) sorted array of step (e.g. day/week) dates
+        values: (n_zones, n_steps, n_cols) array of values
+        avail_steps: (n_zones, n_steps) boolean array, True if data available for the zone and step
+        dates: (n_dates,) sorted array of resampled (e.g. hourly) dates
+        method: resampling method, see ResampleMethods
+        resample_divisor: for uniform distribution method, to divide values
+        fill_na_vals: (n_cols,) for all at first time-slot method, values used where no data (NaN to keep NaN)
+
+    Returns: (n_zones, n_dates, n_cols) array of resampled values, and (n_zones, n_dates) array of idx of the
+    step used for each date - for key columns
+    """
+    n_zones = values.shape[0]
+    step_idx = get_resampling_step_idx(step_dates=step_dates, avail_steps=avail_steps, dates=dates)
+    zone_idx = np.arange(n_zones)[:, np.newaxis]
+    if method == ResampleMethods.uniform_distrib:
+        # repeat step value for all dates of this step
+        resampled = values[zone_idx, step_idx]
+        if resample_divisor is not None:
+            resampled = resampled / resample_divisor
+    elif method == ResampleMethods.all_at_first_ts:
+        # scatter step values on the dates equal to step dates, NaN (then fill value) elsewhere
+        resampled = np.full((n_zones, len(dates), values.shape[2]), np.nan)
+        date_step_idx = np.minimum(np.searchsorted(step_dates, dates, side='left'), len(step_dates) - 1)
+        is_step_date = step_dates[date_step_idx] == dates
+        with_value = is_step_date & avail_steps[:, date_step_idx]
+        resampled[with_value] = values[zone_idx, date_step_idx][with_value]
+        if fill_na_vals is not None:
+            resampled = np.where(np.isnan(resampled), fill_na_vals, resampled)
+    else:
+        raise ValueError(f'Unknown resampling method {method}')
+    return resampled, step_idx
+
+
+def resample_and_distribute_per_zone(df: pd.DataFrame, zone_col: str, zones: List[str], date_col: str,
+                                     value_cols: list, method: str, start_date: datetime, end_date: datetime,
+                                     resample_divisor: float = None, fill_na_vals: dict = None, key_cols: list = None,
+                                     freq: str = 'h') -> Dict[str, pd.DataFrame]:
+    """
+    Same as resample_and_distribute applied to the df of each zone, but with all zones treated at once
+    (NumPy engine). Columns other than date, value and key ones are not kept
+    Args:
+        df: with data of all zones, and unique (zone, date) rows
+        zone_col: name of zone column
+        zones: list of zones for which data must be resampled
+        others: see resample_and_distribute
+
+    Returns: {zone: resampled df, with date column, then key and value columns}; empty df for zones wo data
+    """
+    if key_cols is None:
+        key_cols = []
+    df = df[df[zone_col].isin(zones)]
+    if df.duplicated(subset=[zone_col, date_col]).any():
+        raise ValueError('Multiple rows for a same (zone, date) couple: cannot resample data per zone')
+    zones_in_df = set(df[zone_col])
+    zones_with_data = [zone for zone in zones if zone in zones_in_df]
+    per_zone_resampled = {zone: pd.DataFrame() for zone in zones if zone not in zones_with_data}
+    if len(zones_with_data) == 0:
+        return per_zone_resampled
+
+    step_dates = np.unique(df[date_col].to_numpy())
+    if start_date > pd.Timestamp(step_dates[0]):
+        raise ValueError('Start date cannot be later than the first index date for df resampling')
+    if end_date < pd.Timestamp(step_dates[-1]):
+        raise ValueError('End date cannot be earlier than the last index date for df reasmpling')
+    dates = pd.date_range(start_date, end_date, freq=freq)
+    # (zone x step) arrays
+    i_zones = pd.Index(zones_with_data).get_indexer(df[zone_col])
+    i_steps = np.searchsorted(step_dates, df[date_col].to_numpy())
+    avail_steps = np.zeros((len(zones_with_data), len(step_dates)), dtype=bool)
+    avail_steps[i_zones, i_steps] = True
+    values = np.full((len(zones_with_data), len(step_dates), len(value_cols)), np.nan)
+    values[i_zones, i_steps] = df[value_cols].to_numpy(dtype=np.float64)
+    if fill_na_vals is not None:
+        fill_na_vals = np.array([fill_na_vals.get(col, np.nan) for col in value_cols], dtype=np.float64)
+    resampled, step_idx = resample_and_distribute_arrays(step_dates=step_dates, values=values,
+                                                         avail_steps=avail_steps, dates=dates.to_numpy(),
+                                                         method=method, resample_divisor=resample_divisor,
+                                                         fill_na_vals=fill_na_vals)
+    # key columns follow the same step idx (ffill then bfill); with NaN outside step dates - then filled - in
+    # 'all at first time-slot' case -> cast to float as with pandas
+    all_dates_are_steps = np.isin(dates.to_numpy(), step_dates).all()
+    cast_key_cols_to_float = method == ResampleMethods.all_at_first_ts and not all_dates_are_steps
+    zone_idx = np.arange(len(zones_with_data))[:, np.newaxis]
+    resampled_key_vals = {}
+    for col in key_cols:
+        key_vals = np.empty((len(zones_with_data), len(step_dates)), dtype=df[col].dtype)
+        key_vals[i_zones, i_steps] = df[col].to_numpy()
+        key_vals = key_vals[zone_idx, step_idx]
+        resampled_key_vals[col] = key_vals.astype(np.float64) if cast_key_cols_to_float else key_vals
+    ordered_cols = [col for col in df.columns if col in key_cols or col in value_cols]
+    for i_zone, zone in enumerate(zones_with_data):
+        zone_data = {date_col: dates}
+        for col in ordered_cols:
+            if col in value_cols:
+                zone_data[col] = resampled[i_zone, :, value_cols.index(col)]
+            else:
+                zone_data[col] = resampled_key_vals[col][i_zone]
+        per_zone_resampled[zone] = pd.DataFrame(zone_data)
+    return {zone: per_zone_resampled[zone] for zone in zones}
+
+
 def sort_out_cols_with_zero_values(df: pd.DataFrame, abs_val_threshold: float) -> pd.DataFrame:
     df = df.loc[:, (df.abs() >= abs_val_threshold).any(axis=0)]
     return df
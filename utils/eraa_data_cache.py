@@ -0,0 +1,243 @@
+"""
+Cache of ERAA CSV files as typed binary files -> parse each (large, multi-climatic-year) CSV file once, then reload
+it in a few ms. Feather (columnar) format is used if pyarrow is available, pickle otherwise.
+Also a per-file index {climatic year: (first row, number of rows)} -> to read only the rows of the selected climatic
+year (ERAA timeseries files being sorted by climatic year, then date) when the binary cache cannot be used; and helpers
+to select the rows of a climatic year and period, used by the ERAA data store (see utils/eraa_data_store.py)
+"""
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from common.long_term_uc_io import COLUMN_NAMES, DATE_FORMAT, ERAA_DATA_CACHE_FORMATS, ERAA_DATA_CACHE_SUBFOLDER, \
+    FILES_FORMAT
+from utils.dir_utils import make_dir, uniformize_path_os
+
+try:
+    import pyarrow  # noqa: F401 -> only needed by pandas feather IO
+    CACHE_FORMAT = ERAA_DATA_CACHE_FORMATS.feather
+except ImportError:
+    CACHE_FORMAT = ERAA_DATA_CACHE_FORMATS.pickle
+
+USE_ERAA_DATA_CACHE = True  # set to False to always (re)read CSV files
+
+
+def get_cache_file(csv_file: str) -> str:
+    folder, filename = os.path.split(csv_file)
+    basename = os.path.splitext(filename)[0]
+    return uniformize_path_os(path_str=os.path.join(folder, ERAA_DATA_CACHE_SUBFOLDER, f'{basename}.{CACHE_FORMAT}'))
+
+
+def get_source_signature(csv_file: str) -> dict:
+    """
+    Signature of a source file, used to invalidate its cached version when it has been modified
+    """
+    file_stats = os.stat(csv_file)
+    return {'mtime_ns': file_stats.st_mtime_ns, 'size': file_stats.st_size}
+
+
+def get_signature_file(cache_file: str) -> str:
+    return f'{cache_file}.json'
+
+
+def is_cache_valid(csv_file: str, cache_file: str) -> bool:
+    signature_file = get_signature_file(cache_file=cache_file)
+    if not (os.path.exists(cache_file) and os.path.exists(signature_file)):
+        return False
+    with open(signature_file, 'r') as f:
+        cached_signature = json.load(f)
+    return cached_signature == get_source_signature(csv_file=csv_file)
+
+
+def set_typed_columns(df: pd.DataFrame, date_cols: List[str]) -> pd.DataFrame:
+    """
+    Cast date columns from str to datetime once and for all, before saving the cache file
+    """
+    for col in date_cols:
+        if col in df.columns and df[col].dtype == object:
+            df[col] = pd.to_datetime(df[col], format=DATE_FORMAT)
+    climatic_year_col = COLUMN_NAMES.climatic_year
+    if climatic_year_col in df.columns:
+        df[climatic_year_col] = df[climatic_year_col].astype(int)
+    return df
+
+
+def write_file_atomically(file: str, write_func: Callable[[str], None]):
+    """
+    Write a file through a temporary one in the same folder, then renamed -> readers (e.g. other workers of a process
+    pool) never see a partly written file, and concurrent writers each replace it with a complete one
+    :param file: final path
+    :param write_func: writing the file content to the (temporary) path given as arg.
+    """
+    folder, filename = os.path.split(file)
+    tmp_fd, tmp_file = tempfile.mkstemp(dir=folder, prefix=f'{filename}.', suffix='.tmp')
+    os.close(tmp_fd)
+    try:
+        write_func(tmp_file)
+        os.replace(tmp_file, file)
+    finally:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+
+
+def write_json(file: str, content: dict):
+    with open(file, 'w') as f:
+        json.dump(content, f)
+
+
+def write_cache_file(df: pd.DataFrame, csv_file: str, cache_file: str):
+    make_dir(full_path=os.path.dirname(cache_file))
+    if CACHE_FORMAT == ERAA_DATA_CACHE_FORMATS.feather:
+        write_file_atomically(file=cache_file, write_func=df.to_feather)
+    else:
+        write_file_atomically(file=cache_file, write_func=df.to_pickle)
+    # signature written after data, so that an interrupted write cannot be seen as a valid cache
+    source_signature = get_source_signature(csv_file=csv_file)
+    write_file_atomically(file=get_signature_file(cache_file=cache_file),
+                          write_func=lambda tmp_file: write_json(file=tmp_file, content=source_signature))
+
+
+def is_cache_usable(csv_file: str) -> bool:
+    """
+    Is the binary cache of a CSV file either up-to-date or writable (then written at first read of the full file)?
+    """
+    if not USE_ERAA_DATA_CACHE:
+        return False
+    cache_file = get_cache_file(csv_file=csv_file)
+    if is_cache_valid(csv_file=csv_file, cache_file=cache_file):
+        return True
+    # first existing folder of the cache file path (cache subfolder being created at first write)
+    cache_folder = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_folder):
+        cache_folder = os.path.dirname(cache_folder)
+    return os.access(cache_folder, os.W_OK)
+
+
+def read_cache_file(cache_file: str) -> pd.DataFrame:
+    if CACHE_FORMAT == ERAA_DATA_CACHE_FORMATS.feather:
+        return pd.read_feather(cache_file)
+    return pd.read_pickle(cache_file)
+
+
+def read_eraa_csv(csv_file: str, date_cols: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Read an ERAA CSV file, from its binary cached version if up-to-date
+    Args:
+        csv_file: full path to the (source) CSV file
+        date_cols: list of columns with dates, to be cast to datetime before caching. Default is ['date']
+
+    Returns: df with file content - and typed date/climatic year columns
+    """
+    if date_cols is None:
+        date_cols = [COLUMN_NAMES.date]
+    cache_file = get_cache_file(csv_file=csv_file)
+    if USE_ERAA_DATA_CACHE and is_cache_valid(csv_file=csv_file, cache_file=cache_file):
+        logging.debug(f'Read cached version of {csv_file}')
+        try:
+            return read_cache_file(cache_file=cache_file)
+        except Exception as e:
+            logging.warning(f'Corrupted cache file {cache_file} ({e}) -> CSV file read again')
+
+    df = pd.read_csv(csv_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+    df = set_typed_columns(df=df, date_cols=date_cols)
+    if USE_ERAA_DATA_CACHE:
+        try:
+            write_cache_file(df=df, csv_file=csv_file, cache_file=cache_file)
+        except OSError as e:  # e.g., read-only data folder; not blocking
+            logging.warning(f'Cache file {cache_file} cannot be written ({e}) -> CSV file will be read next time')
+    return df
+
+
+def calc_cy_row_index(climatic_years: np.ndarray) -> Optional[Dict[int, Tuple[int, int]]]:
+    """
+    Calculate {climatic year: (first row, number of rows)} from the climatic year column of a file
+    Returns: None if the rows of a given climatic year are not contiguous
+    """
+    if len(climatic_years) == 0:
+        return {}
+    # first row of each block of contiguous identical values
+    block_starts = np.flatnonzero(np.r_[True, climatic_years[1:] != climatic_years[:-1]])
+    block_ends = np.r_[block_starts[1:], len(climatic_years)]
+    block_cys = [int(cy) for cy in climatic_years[block_starts]]
+    if len(set(block_cys)) < len(block_cys):
+        return None
+    return {cy: (int(start), int(end - start)) for cy, start, end in zip(block_cys, block_starts, block_ends)}
+
+
+def get_cy_index_file(csv_file: str) -> str:
+    folder, filename = os.path.split(csv_file)
+    basename = os.path.splitext(filename)[0]
+    return uniformize_path_os(path_str=os.path.join(folder, ERAA_DATA_CACHE_SUBFOLDER, f'{basename}_cy-index.json'))
+
+
+def get_cy_row_index(csv_file: str) -> Optional[Dict[int, Tuple[int, int]]]:
+    """
+    Get per climatic year row range of a CSV file - from saved index file if up-to-date, otherwise by reading
+    climatic year column only
+    """
+    cy_index_file = get_cy_index_file(csv_file=csv_file)
+    source_signature = get_source_signature(csv_file=csv_file)
+    if os.path.exists(cy_index_file):
+        with open(cy_index_file, 'r') as f:
+            saved_index = json.load(f)
+        if saved_index['signature'] == source_signature:
+            cy_row_index = saved_index['index']
+            return None if cy_row_index is None else {int(cy): tuple(rows) for cy, rows in cy_row_index.items()}
+
+    climatic_year_col = COLUMN_NAMES.climatic_year
+    df_cys = pd.read_csv(csv_file, sep=FILES_FORMAT.column_sep, usecols=[climatic_year_col])
+    cy_row_index = calc_cy_row_index(climatic_years=df_cys[climatic_year_col].to_numpy())
+    if cy_row_index is None:
+        logging.warning(f'Rows of a same climatic year are not contiguous in {csv_file} -> no row index')
+    try:  # small file, saved even if binary cache is not used
+        make_dir(full_path=os.path.dirname(cy_index_file))
+        saved_index = {'signature': source_signature, 'index': cy_row_index}
+        write_file_atomically(file=cy_index_file, write_func=lambda tmp_file: write_json(file=tmp_file,
+                                                                                          content=saved_index))
+    except OSError as e:
+        logging.warning(f'Climatic year index file {cy_index_file} cannot be written ({e})')
+    return cy_row_index
+
+
+def read_eraa_cy_rows(csv_file: str, climatic_year: int) -> pd.DataFrame:
+    """
+    Read the rows of a given climatic year of an ERAA timeseries file (with climatic year and date columns) -> only
+    these lines are parsed, through the per climatic year row index. To be used when binary cache cannot be used,
+    otherwise reading (once) the full file is faster.
+    Same result - including row idx - as reading full file then keeping the rows of this climatic year
+    """
+    cy_row_index = get_cy_row_index(csv_file=csv_file)
+    if cy_row_index is None:
+        df_all = pd.read_csv(csv_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
+        df_all = set_typed_columns(df=df_all, date_cols=[COLUMN_NAMES.date])
+        return df_all[df_all[COLUMN_NAMES.climatic_year] == climatic_year]
+    # if climatic year not in file, first line read to get same column types as with data -> then removed
+    first_row, n_rows = cy_row_index.get(climatic_year, (0, 1))
+    # N.B. header (line 0) kept
+    df_cy = pd.read_csv(csv_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep,
+                        skiprows=range(1, first_row + 1), nrows=n_rows)
+    # same row idx as if full file had been read
+    df_cy.index = pd.RangeIndex(start=first_row, stop=first_row + len(df_cy))
+    df_cy = set_typed_columns(df=df_cy, date_cols=[COLUMN_NAMES.date])
+    if climatic_year not in cy_row_index:
+        df_cy = df_cy.iloc[0:0]
+    return df_cy
+
+
+def select_period_in_sorted_block(df: pd.DataFrame, date_col: str, period_start: datetime,
+                                  period_end: datetime) -> pd.DataFrame:
+    """
+    Keep rows with date in [period_start, period_end) - by dichotomy if dates are sorted, by a mask otherwise
+    """
+    dates = df[date_col]
+    if dates.is_monotonic_increasing:
+        i_start, i_end = dates.searchsorted([period_start, period_end], side='left')
+        return df.iloc[i_start:i_end].copy()
+    return df[(period_start <= dates) & (dates < period_end)].copy()
+
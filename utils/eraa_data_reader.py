@@ -8,8 +8,8 @@ from common.constants.aggreg_operations import AggregOpeNames
 from common.constants.datatypes import DATATYPE_NAMES
 from common.long_term_uc_io import COLUMN_NAMES, DATE_FORMAT, FILES_FORMAT, HYDRO_VALUE_COLUMNS, HYDRO_FILES, \
     HYDRO_KEY_COLUMNS, HYDRO_DEFAULT_VALUES
-from utils.basic_utils import str_sanitizer, robust_cast_str_to_float
-from utils.dates import set_date_from_year_and_iso_idx, set_date_from_year_and_day_idx
+from utils.basic_utils import str_sanitizer
+from utils.dates import set_dates_from_year_and_iso_idx, set_dates_from_year_and_day_idx
 from utils.df_utils import cast_df_col_as_date, concatenate_dfs, selec_in_df_based_on_list, \
     get_subdf_from_date_range, replace_none_values_in_df
 
@@ -79,9 +79,10 @@ def read_and_process_hydro_data(hydro_dt: str, folder: str, rm_week_and_day_cols
 
     df_hydro = pd.read_csv(hydro_file, sep=FILES_FORMAT.column_sep, decimal=FILES_FORMAT.decimal_sep)
     # robust cast to numeric values -> got some pbs with data... TODO: fix this more properly
+    # N.B. vectorized equivalent of robust_cast_str_to_float; values that cannot be cast set to NaN
     value_cols = HYDRO_VALUE_COLUMNS[hydro_dt]
     for col in value_cols:
-        df_hydro[col] = df_hydro[col].apply(robust_cast_str_to_float)
+        df_hydro[col] = pd.to_numeric(df_hydro[col], errors='coerce')
     # replace none values by default ones
     df_hydro = replace_none_values_in_df(df=df_hydro, per_col_repl_values=HYDRO_DEFAULT_VALUES[hydro_dt],
                                          key_cols=HYDRO_KEY_COLUMNS[hydro_dt])
@@ -101,15 +102,10 @@ def read_and_process_hydro_data(hydro_dt: str, folder: str, rm_week_and_day_cols
         if new_len < init_len:
             logging.warning(f'{init_len - new_len} rows suppressed in {hydro_dt} data due to invalid week idx (> 52)')
         # set date column based on week and day=1 index values
-        df_hydro[date_col] = (
-            df_hydro.apply(lambda row:
-                           set_date_from_year_and_iso_idx(year=1900, week_idx=row[week_col], day_idx=row[day_col]),
-                           axis=1)
-        )
+        df_hydro[date_col] = set_dates_from_year_and_iso_idx(year=1900, week_idx=df_hydro[week_col].to_numpy(),
+                                                             day_idx=df_hydro[day_col].to_numpy())
     else:  # only from day index from 1 to 365
-        df_hydro[date_col] = (df_hydro[day_col]
-                                       .apply(lambda x: set_date_from_year_and_day_idx(year=1900, day_idx=x))
-                                       )
+        df_hydro[date_col] = set_dates_from_year_and_day_idx(year=1900, day_idx=df_hydro[day_col].to_numpy())
     if rm_week_and_day_cols:
         cols_tb_rmed = [week_col]
         if day_col in df_cols:
@@ -0,0 +1,165 @@
+"""
+Process-wide in-memory store of (parsed) ERAA data files -> shared by all Dataset objects of a same Python process,
+so that the same file is read once when looping over (year, climatic year, period, etc.) cases.
+LRU policy, with a bound on the total memory size of stored dataframes
+"""
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+from common.long_term_uc_io import COLUMN_NAMES
+from utils.climatic_years_tensor import CY_TENSOR_DTYPE, ClimaticYearsTensor, set_cy_tensor
+from utils.eraa_data_cache import calc_cy_row_index, is_cache_usable, read_eraa_csv, read_eraa_cy_rows, \
+    select_period_in_sorted_block
+
+ERAA_DATA_STORE_MAX_BYTES = 2 * 1024 ** 3  # 2GB
+
+
+@dataclass(frozen=True)
+class ERAADataKey:
+    datatype: str
+    target_year: Optional[int] = None  # None for data common to all years (e.g. hydro)
+    country: Optional[str] = None  # None for files with data of all countries (e.g. hydro)
+    is_stress_test: bool = False
+    prod_type: Optional[str] = None  # for datatypes with one file per production type (RES capa. factors)
+    climatic_year: Optional[int] = None  # for the rows of a single climatic year of a file, None for full file
+
+
+@dataclass
+class ERAADataStoreStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    n_bytes: int = 0
+    n_bytes_max_reached: int = 0
+
+    def __repr__(self) -> str:
+        n_requests = self.hits + self.misses
+        hit_ratio = 100 * self.hits / n_requests if n_requests > 0 else 0
+        return (f'ERAA data store: {self.hits} hits, {self.misses} misses ({hit_ratio:.0f}% hit ratio), '
+                f'{self.evictions} evictions; {self.n_bytes / 1024 ** 2:.1f}MB currently stored, '
+                f'max. reached {self.n_bytes_max_reached / 1024 ** 2:.1f}MB')
+
+
+@dataclass
+class StoredData:
+    df: pd.DataFrame
+    n_bytes: int
+    # {climatic year: (first row, number of rows)}, None if data not sorted by climatic year
+    cy_row_index: Optional[Dict[int, Tuple[int, int]]] = None
+
+
+class ERAADataStore:
+    def __init__(self, max_bytes: int = ERAA_DATA_STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = ERAADataStoreStats()
+        self._data: OrderedDict[ERAADataKey, StoredData] = OrderedDict()
+
+    def __contains__(self, key: ERAADataKey) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def set_max_bytes(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._evict_until_size_ok()
+
+    def clear(self):
+        self._data.clear()
+        self.stats.n_bytes = 0
+
+    def _evict_until_size_ok(self):
+        while self.stats.n_bytes > self.max_bytes and len(self._data) > 0:
+            evicted_key, evicted_data = self._data.popitem(last=False)  # least recently used
+            self.stats.n_bytes -= evicted_data.n_bytes
+            self.stats.evictions += 1
+            logging.debug(f'{evicted_key} evicted from ERAA data store')
+
+    def _get_stored_data(self, key: ERAADataKey, loader: Callable[[], pd.DataFrame]) -> StoredData:
+        if key in self._data:
+            self.stats.hits += 1
+            self._data.move_to_end(key)
+            return self._data[key]
+
+        self.stats.misses += 1
+        df = loader()
+        climatic_year_col = COLUMN_NAMES.climatic_year
+        cy_row_index = calc_cy_row_index(climatic_years=df[climatic_year_col].to_numpy()) \
+            if climatic_year_col in df.columns else None
+        stored_data = StoredData(df=df, n_bytes=int(df.memory_usage(deep=True).sum()), cy_row_index=cy_row_index)
+        if stored_data.n_bytes > self.max_bytes:
+            logging.warning(f'{key} data bigger than ERAA data store max. size ({self.max_bytes} bytes) '
+                            f'-> not stored')
+            return stored_data
+        self._data[key] = stored_data
+        self.stats.n_bytes += stored_data.n_bytes
+        self._evict_until_size_ok()
+        self.stats.n_bytes_max_reached = max(self.stats.n_bytes_max_reached, self.stats.n_bytes)
+        return stored_data
+
+    def get_data(self, key: ERAADataKey, csv_file: str) -> pd.DataFrame:
+        """
+        Get (a copy of) full data of a file
+        """
+        stored_data = self._get_stored_data(key=key, loader=lambda: read_eraa_csv(csv_file=csv_file))
+        return stored_data.df.copy()
+
+    def get_processed_data(self, key: ERAADataKey, loader: Callable[[], Optional[pd.DataFrame]]) \
+            -> Optional[pd.DataFrame]:
+        """
+        Get data obtained by a given read-and-process function (e.g., hydro data with dates set from week/day idx)
+        N.B. stored df directly returned (no copy) -> not to be modified in place; to be used with functions
+        creating new dfs (e.g., filter_input_data)
+        """
+        if key in self._data:
+            return self._get_stored_data(key=key, loader=loader).df
+        df = loader()
+        if df is None:  # no data file -> nothing stored
+            return None
+        return self._get_stored_data(key=key, loader=lambda: df).df
+
+    def get_ts_data(self, key: ERAADataKey, csv_file: str, climatic_year: int,
+                    period: Tuple[datetime, datetime]) -> pd.DataFrame:
+        """
+        Get data of a timeseries file, for given climatic year and period (end EXCLUDED) -> same result - incl.
+        row idx - as reading full file then applying filter_input_data.
+        N.B. if full file not already stored and binary cache cannot be used (deactivated, or read-only data folder),
+        only the lines of the selected climatic year are parsed in CSV file - and stored
+        """
+        if key not in self and not is_cache_usable(csv_file=csv_file):
+            cy_key = replace(key, climatic_year=climatic_year)
+            df_cy = self._get_stored_data(key=cy_key,
+                                          loader=lambda: read_eraa_cy_rows(csv_file=csv_file,
+                                                                           climatic_year=climatic_year)).df
+            return select_period_in_sorted_block(df=df_cy, date_col=COLUMN_NAMES.date, period_start=period[0],
+                                                 period_end=period[1])
+        stored_data = self._get_stored_data(key=key, loader=lambda: read_eraa_csv(csv_file=csv_file))
+        df = stored_data.df
+        if stored_data.cy_row_index is None:
+            df_cy = df[df[COLUMN_NAMES.climatic_year] == climatic_year]
+        else:
+            first_row, n_rows = stored_data.cy_row_index.get(climatic_year, (0, 0))
+            df_cy = df.iloc[first_row:first_row + n_rows]
+        return select_period_in_sorted_block(df=df_cy, date_col=COLUMN_NAMES.date, period_start=period[0],
+                                             period_end=period[1])
+
+    def get_all_cys_ts_data(self, key: ERAADataKey, csv_file: str, period: Tuple[datetime, datetime],
+                            dtype=CY_TENSOR_DTYPE) -> ClimaticYearsTensor:
+        """
+        Get data of a timeseries file for all its climatic years and a given period (end EXCLUDED), as a dense
+        (climatic year x date) tensor
+        """
+        stored_data = self._get_stored_data(key=key, loader=lambda: read_eraa_csv(csv_file=csv_file))
+        return set_cy_tensor(df=stored_data.df, cy_row_index=stored_data.cy_row_index, period=period, dtype=dtype)
+
+    def log_stats(self):
+        logging.info(self.stats)
+
+
+# unique store in a process
+ERAA_DATA_STORE = ERAADataStore()
@@ -0,0 +1,147 @@
+"""
+Per-stage profiling of a UC run: (nested) spans around its main stages - data reading, model build, solve, output
+writing... -, each one recording wall time, CPU time and memory (process peak RSS, and optionally Python allocations
+with tracemalloc - slower). Spans are gathered by a module-level profiler, deactivated by default (then spans are
+no-ops), and dumped as a JSON timeline, e.g. to know if a slow run is I/O, build or solver bound
+"""
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict, field
+from typing import List, Optional
+
+try:
+    import resource  # not available on Windows -> no RSS values then
+except ImportError:
+    resource = None
+
+BYTES_PER_MB = 1024 ** 2
+STAGE_PATH_SEP = ' > '
+
+
+def get_peak_rss_mb() -> Optional[float]:
+    """
+    Peak Resident Set Size of the process since its start, in MB (N.B. ru_maxrss in kB on Linux, bytes on macOS)
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / BYTES_PER_MB if sys.platform == 'darwin' else max_rss / 1024
+
+
+@dataclass
+class StageSpan:
+    name: str
+    path: str  # names of the enclosing spans and of this one, e.g. 'get ERAA data > countries data'
+    depth: int
+    start: float  # in s, from start of profiling
+    wall_time: float = None  # s
+    cpu_time: float = None  # s, of the process (all threads)
+    peak_rss: float = None  # MB, process high-water mark at end of span
+    peak_rss_delta: float = None  # MB, increase of this high-water mark during span
+    # Python allocations, only if tracemalloc activated: net (end - start) and peak above start, in MB
+    alloc_delta: float = None
+    alloc_peak: float = None
+
+    def to_dict(self) -> dict:
+        return {key: round(val, 4) if isinstance(val, float) else val for key, val in asdict(self).items()
+                if val is not None}
+
+
+@dataclass
+class _OpenSpan:
+    span: StageSpan
+    cpu_start: float
+    peak_rss_start: Optional[float]
+    alloc_start: int = 0
+    # peak of allocations seen in closed child spans (tracemalloc peak being reset at each span start)
+    alloc_peak: int = 0
+
+
+@dataclass
+class StageProfiler:
+    enabled: bool = False
+    with_tracemalloc: bool = False
+    spans: List[StageSpan] = field(default_factory=list)
+    _open_spans: List[_OpenSpan] = field(default_factory=list)
+    _t0: float = None
+
+    def start(self, with_tracemalloc: bool = False):
+        """
+        (Re)start profiling - previous spans being dropped
+        """
+        self.enabled = True
+        self.with_tracemalloc = with_tracemalloc
+        self.spans = []
+        self._open_spans = []
+        self._t0 = time.perf_counter()
+        if self.with_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        self.enabled = False
+        if self.with_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def open_span(self, name: str):
+        parent_path = self._open_spans[-1].span.path if len(self._open_spans) > 0 else None
+        span = StageSpan(name=name, path=name if parent_path is None else f'{parent_path}{STAGE_PATH_SEP}{name}',
+                         depth=len(self._open_spans), start=time.perf_counter() - self._t0)
+        open_span = _OpenSpan(span=span, cpu_start=time.process_time(), peak_rss_start=get_peak_rss_mb())
+        if self.with_tracemalloc:
+            current_alloc, peak_alloc = tracemalloc.get_traced_memory()
+            # keep the peak reached so far in the parent span, before resetting it for the new one
+            if len(self._open_spans) > 0:
+                self._open_spans[-1].alloc_peak = max(self._open_spans[-1].alloc_peak, peak_alloc)
+            tracemalloc.reset_peak()
+            open_span.alloc_start = current_alloc
+            open_span.alloc_peak = current_alloc
+        self._open_spans.append(open_span)
+        # appended at opening -> spans in chronological order of their start in the timeline
+        self.spans.append(span)
+
+    def close_span(self):
+        open_span = self._open_spans.pop()
+        span = open_span.span
+        span.wall_time = time.perf_counter() - self._t0 - span.start
+        span.cpu_time = time.process_time() - open_span.cpu_start
+        span.peak_rss = get_peak_rss_mb()
+        if span.peak_rss is not None:
+            span.peak_rss_delta = span.peak_rss - open_span.peak_rss_start
+        if self.with_tracemalloc:
+            current_alloc, peak_alloc = tracemalloc.get_traced_memory()
+            alloc_peak = max(open_span.alloc_peak, peak_alloc)
+            span.alloc_delta = (current_alloc - open_span.alloc_start) / BYTES_PER_MB
+            span.alloc_peak = (alloc_peak - open_span.alloc_start) / BYTES_PER_MB
+            if len(self._open_spans) > 0:
+                self._open_spans[-1].alloc_peak = max(self._open_spans[-1].alloc_peak, alloc_peak)
+
+    def get_timeline(self) -> dict:
+        return {'total_wall_time': round(time.perf_counter() - self._t0, 4), 'with_tracemalloc': self.with_tracemalloc,
+                'units': {'time': 's', 'memory': 'MB'}, 'spans': [span.to_dict() for span in self.spans]}
+
+    def json_dump(self, file: str):
+        with open(file, 'w', encoding='utf-8') as f:
+            json.dump(self.get_timeline(), f, indent=2)
+        logging.info(f'Per-stage profiling timeline ({len(self.spans)} spans) saved in {file}')
+
+
+STAGE_PROFILER = StageProfiler()
+
+
+@contextmanager
+def profile_stage(name: str):
+    """
+    Span around a stage - as a with block or a function decorator -, recorded only if STAGE_PROFILER is enabled
+    """
+    if not STAGE_PROFILER.enabled:
+        yield
+        return
+    STAGE_PROFILER.open_span(name=name)
+    try:
+        yield
+    finally:
+        STAGE_PROFILER.close_span()
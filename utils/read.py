@@ -1,8 +1,9 @@
 import json
+from dataclasses import fields
 from typing import List, Dict, Optional, Union
 import logging
 
-from common.constants.optimisation import SolverParams
+from common.constants.optimisation import SolverParams, SolverProfile
 from common.constants.plots import PlotNames
 from common.long_term_uc_io import get_json_usage_params_file, get_json_fixed_params_file, \
     get_json_eraa_avail_values_file, get_json_params_tb_modif_file, get_json_pypsa_static_params_file, \
@@ -289,12 +290,19 @@ def read_and_check_data_analysis_params(eraa_data_descr: ERAADatasetDescr, n_cur
     return data_analyses
 
 
-def read_solver_params() -> SolverParams:
+def read_solver_params(profile_name: str = None) -> SolverParams:
+    """
+    Read solver params JSON file
+    :param profile_name: name of the solver performance profile to be used - in the ones of the JSON file -,
+    overwriting the one of this file if not None (e.g., fast-LP for batch adequacy runs)
+    """
     solver_params_data = set_json_solver_params()
     # a few tests on read JSON file
     name_key = 'name'
     lic_file_key = 'license_file'
-    known_keys = [name_key, lic_file_key]
+    profile_key = 'profile'
+    profiles_key = 'profiles'
+    known_keys = [name_key, lic_file_key, profile_key, profiles_key]
     solver_params_file = get_json_solver_params_file()
     if name_key not in solver_params_data:
         raise Exception(f'Mandatory param {name_key} missing in {solver_params_file} -> STOP')
@@ -303,8 +311,26 @@ def read_solver_params() -> SolverParams:
     unknown_params = list(set(solver_params_data) - set(known_keys))
     if len(unknown_params) > 0:
         logging.warning(f'There are unknown parameters in {solver_params_file}: {unknown_params} -> will not be used')
-    solver_params_data = {key: solver_params_data[key] for key in known_keys}
-    return SolverParams(**solver_params_data)
+    # solver performance profile, if one selected
+    if profile_name is None:
+        profile_name = solver_params_data.get(profile_key)
+    profile = None
+    if profile_name is not None:
+        profiles_data = solver_params_data.get(profiles_key, {})
+        if profile_name not in profiles_data:
+            raise Exception(f'Unknown solver profile {profile_name} - not in {solver_params_file}; '
+                            f'it must be in {list(profiles_data)} -> STOP')
+        profile_data = profiles_data[profile_name]
+        profile_param_names = [attr.name for attr in fields(SolverProfile)]
+        unknown_profile_params = list(set(profile_data) - set(profile_param_names))
+        if len(unknown_profile_params) > 0:
+            logging.warning(f'There are unknown parameters in solver profile {profile_name} of {solver_params_file}: '
+                            f'{unknown_profile_params} -> will not be used')
+        profile = SolverProfile(**{key: val for key, val in profile_data.items() if key in profile_param_names})
+        profile.check(profile_name=profile_name)
+        logging.info(f'Solver profile {profile_name} used: {profile}')
+    return SolverParams(name=solver_params_data[name_key], license_file=solver_params_data.get(lic_file_key),
+                        profile_name=profile_name, profile=profile)
 
 
 def read_given_phase_specific_key_from_plot_params(phase_name: str, param_to_be_set: str) -> Union[
@@ -0,0 +1,34 @@
+"""
+Batched engine of residual load calculations: fatal (RES) production - capacity x capa. factor - and net demand -
+demand minus fatal production and hydro Run-of-River production -, for all (country, climatic year, date) at once
+with broadcasted operations on dense arrays, instead of per country and aggreg. prod. type loops on dfs
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def calc_fatal_prod_batch(cf_values: np.ndarray, capas: np.ndarray) -> np.ndarray:
+    """
+    Fatal production of each prod. type
+    :param cf_values: capa. factors, of shape (..., prod. type, climatic year, date) - e.g. with country as first dim.
+    :param capas: capacities, of shape (..., prod. type)
+    :returns per prod. type production, of shape (..., prod. type, climatic year, date)
+    """
+    return capas[..., np.newaxis, np.newaxis] * cf_values
+
+
+def calc_net_demand_batch(demand: np.ndarray, cf_values: np.ndarray, capas: np.ndarray,
+                          ror_prod: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Net demand = demand - sum over prod. types of capacity x capa. factor - Run-of-River prod.
+    :param demand: of shape (..., climatic year, date)
+    :param cf_values: capa. factors, of shape (..., prod. type, climatic year, date)
+    :param capas: capacities, of shape (..., prod. type)
+    :param ror_prod: hydro Run-of-River production, same shape as demand - None if not accounted for
+    N.B. multiply-sum over prod. types done in their order (no BLAS call) -> same values as a loop over them
+    """
+    net_demand = demand - np.einsum('...p,...pcd->...cd', capas, cf_values)
+    if ror_prod is not None:
+        net_demand -= ror_prod
+    return net_demand
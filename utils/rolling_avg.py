@@ -0,0 +1,59 @@
+"""
+Rolling (moving window) averages of multiple timeseries at once: cumulative sums of the stacked (series x time-slot)
+value matrix, window sums being differences of them -> O(number of values) whatever the window lengths, instead of a
+per-series and per-window rolling calculation
+"""
+from typing import Dict, Hashable, List
+
+import numpy as np
+
+
+def calc_rolling_avg_batch(values: np.ndarray, windows: List[int]) -> Dict[int, np.ndarray]:
+    """
+    Trailing rolling averages of timeseries (average of the window values ending at each time-slot)
+    :param values: of shape (number of series, number of time-slots) - NaN ignored in averages
+    :param windows: lengths of the rolling windows, in number of time-slots
+    :returns {window: averages of shape (number of series, number of time-slots)}, NaN for the first window - 1
+    time-slots - as pandas rolling default -, or if no value in window
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_series, n_slots = values.shape
+    is_nan = np.isnan(values)
+    with_nan = is_nan.any()
+    # leading column of zeros -> sum of window (i - w, i] obtained as cum_sum[i + 1] - cum_sum[i + 1 - w]
+    cum_sum = np.zeros((n_series, n_slots + 1))
+    np.cumsum(np.where(is_nan, 0, values) if with_nan else values, axis=1, out=cum_sum[:, 1:])
+    if with_nan:
+        cum_count = np.zeros((n_series, n_slots + 1))
+        np.cumsum(~is_nan, axis=1, out=cum_count[:, 1:])
+    rolling_avgs = {}
+    for window in windows:
+        rolling_avg = np.full((n_series, n_slots), np.nan)
+        if window <= n_slots:
+            window_sums = cum_sum[:, window:] - cum_sum[:, :-window]
+            if with_nan:
+                window_counts = cum_count[:, window:] - cum_count[:, :-window]
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    rolling_avg[:, window - 1:] = np.where(window_counts > 0, window_sums / window_counts, np.nan)
+            else:
+                rolling_avg[:, window - 1:] = window_sums / window
+        rolling_avgs[window] = rolling_avg
+    return rolling_avgs
+
+
+def calc_rolling_avg_of_series(series: Dict[Hashable, np.ndarray], windows: List[int]) \
+        -> Dict[int, Dict[Hashable, np.ndarray]]:
+    """
+    Rolling averages of a dict of timeseries, stacked in a matrix per number of time-slots (a unique one in general)
+    :returns {window: {series key: averages}}
+    """
+    per_length_keys = {}
+    for key, vals in series.items():
+        per_length_keys.setdefault(len(vals), []).append(key)
+    rolling_avgs = {window: {} for window in windows}
+    for keys in per_length_keys.values():
+        group_avgs = calc_rolling_avg_batch(values=np.vstack([series[key] for key in keys]), windows=windows)
+        for window, avg_matrix in group_avgs.items():
+            rolling_avgs[window] |= dict(zip(keys, avg_matrix))
+    # same order as input series
+    return {window: {key: window_avgs[key] for key in series} for window, window_avgs in rolling_avgs.items()}
@@ -0,0 +1,268 @@
+"""
+Streaming statistics engine of timeseries: duration curve, quantiles, ramp distribution and top-N time-slots,
+obtained by iterating over chunks of values -> memory bounded by the chunk size (and summary arrays), whatever
+the horizon and number of (country, year, climatic year) cases considered
+N.B. exact order statistics (partial or full sort) if the number of values fits in a chunk; above, approximated by
+interpolation in a histogram of values with fine uniform bins
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# a full year of hourly values - incl. leap years - in a chunk, i.e. exact statistics for ERAA yearly timeseries
+STATS_CHUNK_SIZE = 8784
+N_VALUE_HIST_BINS = 10000  # for approximated order statistics above chunk size
+N_RAMP_HIST_BINS = 100  # ramp distribution saved
+DURATION_CURVE_N_POINTS_MAX = 8784  # points of duration curves, downsampled above
+N_TOP_SLOTS_DEFAULT = 10
+QUANTILE_LEVELS_DEFAULT = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+# above this number of order statistics a full sort is cheaper than a partial one (np.partition cost growing with it)
+N_KTH_MAX_FOR_PARTITION = 64
+
+
+@dataclass
+class TimeseriesStats:
+    n_values: int  # non-NaN values
+    min_value: float
+    max_value: float
+    mean_value: float
+    quantile_levels: np.ndarray
+    quantiles: np.ndarray
+    # duration curve: values of given (1-based) ranks in descending order
+    duration_ranks: np.ndarray
+    duration_values: np.ndarray
+    # ramps: differences of consecutive values
+    ramp_min: float
+    ramp_max: float
+    ramp_quantiles: np.ndarray  # for the same levels as values quantiles
+    ramp_hist_edges: np.ndarray
+    ramp_hist_counts: np.ndarray
+    # top-N time-slots, sorted by descending values
+    top_slot_idx: np.ndarray
+    top_slot_values: np.ndarray
+    is_exact: bool  # are order statistics exact, or approximated from histogram?
+
+    def to_dict(self, dates: Optional[List[datetime]] = None, with_duration_curve: bool = True) -> dict:
+        """
+        JSON-serializable dict of these statistics
+        :param dates: of the timeseries, to identify the top-N time-slots; their index if None
+        :param with_duration_curve: add (possibly downsampled) duration curve?
+        """
+        if dates is None:
+            top_slots = [int(idx) + 1 for idx in self.top_slot_idx]
+        else:
+            top_slots = [dates[idx].isoformat() for idx in self.top_slot_idx]
+        stats_dict = {'n_values': self.n_values, 'min': self.min_value, 'max': self.max_value, 'mean': self.mean_value,
+                      'quantiles': {str(level): float(val) for level, val in zip(self.quantile_levels, self.quantiles)},
+                      'ramps': {'min': self.ramp_min, 'max': self.ramp_max,
+                                'quantiles': {str(level): float(val)
+                                              for level, val in zip(self.quantile_levels, self.ramp_quantiles)},
+                                'hist_edges': self.ramp_hist_edges.tolist(),
+                                'hist_counts': self.ramp_hist_counts.tolist()},
+                      'top_slots': {'slots': top_slots, 'values': self.top_slot_values.tolist()},
+                      'is_exact': self.is_exact}
+        if with_duration_curve:
+            stats_dict['duration_curve'] = {'ranks': self.duration_ranks.tolist(),
+                                            'values': self.duration_values.tolist()}
+        return stats_dict
+
+
+def iter_value_chunks(values: np.ndarray, chunk_size: int = STATS_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Chunks of (non-NaN) values - views on the values vector if no NaN
+    """
+    for i_start in range(0, len(values), chunk_size):
+        chunk = values[i_start:i_start + chunk_size]
+        nan_in_chunk = np.isnan(chunk)
+        yield chunk[~nan_in_chunk] if nan_in_chunk.any() else chunk
+
+
+def iter_ramp_chunks(values: np.ndarray, chunk_size: int = STATS_CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """
+    Chunks of (non-NaN) ramps - i.e. differences of consecutive values, first ramp of a chunk using the last value
+    of the previous one
+    """
+    for i_start in range(0, len(values) - 1, chunk_size):
+        ramps = np.diff(values[i_start:i_start + chunk_size + 1].astype(np.float64))
+        nan_in_chunk = np.isnan(ramps)
+        yield ramps[~nan_in_chunk] if nan_in_chunk.any() else ramps
+
+
+def get_min_max_sum_count(chunks: Iterator[np.ndarray]) -> Tuple[float, float, float, int]:
+    min_val, max_val, sum_val, count = np.inf, -np.inf, 0.0, 0
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        min_val = min(min_val, float(chunk.min()))
+        max_val = max(max_val, float(chunk.max()))
+        sum_val += float(chunk.sum(dtype=np.float64))
+        count += len(chunk)
+    return min_val, max_val, sum_val, count
+
+
+def calc_streamed_histogram(chunks: Iterator[np.ndarray], min_val: float, max_val: float,
+                            n_bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Histogram of values accumulated over chunks, on uniform bins in [min_val, max_val]
+    :returns (bin edges, counts)
+    """
+    counts = np.zeros(n_bins, dtype=np.int64)
+    edges = None
+    for chunk in chunks:
+        chunk_counts, edges = np.histogram(chunk, bins=n_bins, range=(min_val, max_val))
+        counts += chunk_counts
+    if edges is None:
+        edges = np.linspace(min_val, max_val, n_bins + 1)
+    return edges, counts
+
+
+def get_order_stats_exact(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Values at (possibly fractional) 0-based positions in ascending order, linearly interpolated between the two
+    surrounding order statistics - as np.quantile default method -, with a single partial sort (np.partition) if
+    only a few positions, e.g. quantiles only
+    """
+    i_low = np.floor(positions).astype(int)
+    i_high = np.minimum(i_low + 1, len(values) - 1)
+    kth = np.unique(np.concatenate([i_low, i_high]))
+    if len(kth) > N_KTH_MAX_FOR_PARTITION:
+        partitioned = np.sort(values.astype(np.float64))
+    else:
+        partitioned = np.partition(values.astype(np.float64), kth)
+    weight_high = positions - i_low
+    return (1 - weight_high) * partitioned[i_low] + weight_high * partitioned[i_high]
+
+
+def get_order_stats_from_hist(edges: np.ndarray, counts: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Approximated values at 0-based positions in ascending order, assuming values uniformly spread in each bin
+    """
+    cum_counts = np.cumsum(counts)
+    i_bins = np.minimum(np.searchsorted(cum_counts, positions, side='right'), len(counts) - 1)
+    n_before = cum_counts[i_bins] - counts[i_bins]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        frac_in_bin = np.where(counts[i_bins] > 0, (positions - n_before + 0.5) / counts[i_bins], 0.5)
+    order_stats = edges[i_bins] + np.clip(frac_in_bin, 0, 1) * (edges[i_bins + 1] - edges[i_bins])
+    return np.clip(order_stats, edges[0], edges[-1])
+
+
+def calc_order_stats(chunks_getter: Callable[[], Iterator[np.ndarray]], n_values: int, min_val: float,
+                     max_val: float, positions: np.ndarray, chunk_size: int = STATS_CHUNK_SIZE,
+                     n_hist_bins: int = N_VALUE_HIST_BINS) -> Tuple[np.ndarray, bool]:
+    """
+    Values at 0-based positions in ascending order - exact if all values fit in a chunk, from a streamed histogram
+    otherwise
+    :param chunks_getter: function returning a new iterator over the chunks of values (one pass per call)
+    :returns (order statistics, are they exact?)
+    """
+    if n_values == 0:
+        return np.full(len(positions), np.nan), True
+    if min_val == max_val:
+        return np.full(len(positions), min_val), True
+    if n_values <= chunk_size:
+        return get_order_stats_exact(values=np.concatenate(list(chunks_getter())), positions=positions), True
+    edges, counts = calc_streamed_histogram(chunks=chunks_getter(), min_val=min_val, max_val=max_val,
+                                            n_bins=n_hist_bins)
+    return get_order_stats_from_hist(edges=edges, counts=counts, positions=positions), False
+
+
+def get_duration_ranks(n_values: int, n_points_max: int = DURATION_CURVE_N_POINTS_MAX) -> np.ndarray:
+    """
+    (1-based) ranks of the points of a duration curve - all of them, or uniformly spread ones (incl. first and last)
+    if more values than max. number of points
+    """
+    if n_values <= n_points_max:
+        return np.arange(1, n_values + 1)
+    return np.unique(np.round(np.linspace(1, n_values, n_points_max)).astype(int))
+
+
+def calc_duration_curve(values: np.ndarray, n_points_max: int = DURATION_CURVE_N_POINTS_MAX,
+                        chunk_size: int = STATS_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Duration curve - values sorted in descending order, NaN excluded - of a timeseries
+    :returns (1-based ranks, values at these ranks)
+    """
+    min_val, max_val, _, n_values = get_min_max_sum_count(chunks=iter_value_chunks(values, chunk_size))
+    ranks = get_duration_ranks(n_values=n_values, n_points_max=n_points_max)
+    # full curve in a chunk -> simple sort
+    if n_values <= chunk_size and len(ranks) == n_values:
+        return ranks, np.sort(np.concatenate(list(iter_value_chunks(values, chunk_size))))[::-1]
+    duration_values, _ = calc_order_stats(chunks_getter=lambda: iter_value_chunks(values, chunk_size),
+                                          n_values=n_values, min_val=min_val, max_val=max_val,
+                                          positions=(n_values - ranks).astype(np.float64), chunk_size=chunk_size)
+    return ranks, duration_values
+
+
+def get_top_slots(values: np.ndarray, n_top: int = N_TOP_SLOTS_DEFAULT,
+                  chunk_size: int = STATS_CHUNK_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    N time-slots with the highest values, merging the top-N candidates of each chunk (np.argpartition)
+    :returns (indices, values), sorted by descending values
+    """
+    top_idx = np.empty(0, dtype=np.int64)
+    top_values = np.empty(0, dtype=np.float64)
+    for i_start in range(0, len(values), chunk_size):
+        chunk = values[i_start:i_start + chunk_size]
+        chunk_idx = np.flatnonzero(~np.isnan(chunk))
+        cand_idx = np.concatenate([top_idx, chunk_idx + i_start])
+        cand_values = np.concatenate([top_values, chunk[chunk_idx].astype(np.float64)])
+        if len(cand_values) > n_top:
+            i_kept = np.argpartition(-cand_values, n_top - 1)[:n_top]
+            cand_idx, cand_values = cand_idx[i_kept], cand_values[i_kept]
+        top_idx, top_values = cand_idx, cand_values
+    # descending values, first time-slot in case of ties
+    i_sorted = np.lexsort((top_idx, -top_values))
+    return top_idx[i_sorted], top_values[i_sorted]
+
+
+def calc_ts_stats(values: np.ndarray, quantile_levels: Tuple[float, ...] = QUANTILE_LEVELS_DEFAULT,
+                  n_duration_points_max: int = DURATION_CURVE_N_POINTS_MAX, n_top: int = N_TOP_SLOTS_DEFAULT,
+                  chunk_size: int = STATS_CHUNK_SIZE) -> TimeseriesStats:
+    """
+    Calculate statistics of a timeseries, by passes over chunks of its values
+    :param values: of the timeseries (possibly with NaN, ignored)
+    :param quantile_levels: in [0, 1]
+    :param n_duration_points_max: max. number of points of the duration curve
+    :param n_top: number of top time-slots
+    :param chunk_size: number of values per chunk
+    """
+    quantile_levels = np.array(quantile_levels, dtype=np.float64)
+    # values
+    min_val, max_val, sum_val, n_values = get_min_max_sum_count(chunks=iter_value_chunks(values, chunk_size))
+    ranks = get_duration_ranks(n_values=n_values, n_points_max=n_duration_points_max)
+    # quantiles and duration curve points obtained in the same pass(es)
+    quantile_pos = quantile_levels * max(n_values - 1, 0)
+    duration_pos = (n_values - ranks).astype(np.float64)
+    order_stats, is_exact = calc_order_stats(chunks_getter=lambda: iter_value_chunks(values, chunk_size),
+                                             n_values=n_values, min_val=min_val, max_val=max_val,
+                                             positions=np.concatenate([quantile_pos, duration_pos]),
+                                             chunk_size=chunk_size)
+    n_levels = len(quantile_levels)
+    # ramps
+    ramp_min, ramp_max, _, n_ramps = get_min_max_sum_count(chunks=iter_ramp_chunks(values, chunk_size))
+    if n_ramps > 0:
+        ramp_quantiles, ramp_exact = calc_order_stats(chunks_getter=lambda: iter_ramp_chunks(values, chunk_size),
+                                                      n_values=n_ramps, min_val=ramp_min, max_val=ramp_max,
+                                                      positions=quantile_levels * (n_ramps - 1), chunk_size=chunk_size)
+        is_exact = is_exact and ramp_exact
+        ramp_hist_edges, ramp_hist_counts = (
+            calc_streamed_histogram(chunks=iter_ramp_chunks(values, chunk_size), min_val=ramp_min, max_val=ramp_max,
+                                    n_bins=N_RAMP_HIST_BINS)
+        )
+    else:
+        ramp_min, ramp_max = np.nan, np.nan
+        ramp_quantiles = np.full(n_levels, np.nan)
+        ramp_hist_edges, ramp_hist_counts = np.empty(0), np.empty(0, dtype=np.int64)
+    top_slot_idx, top_slot_values = get_top_slots(values=values, n_top=n_top, chunk_size=chunk_size)
+    if n_values == 0:
+        min_val, max_val, mean_val = np.nan, np.nan, np.nan
+    else:
+        mean_val = sum_val / n_values
+    return TimeseriesStats(n_values=n_values, min_value=min_val, max_value=max_val, mean_value=mean_val,
+                           quantile_levels=quantile_levels, quantiles=order_stats[:n_levels],
+                           duration_ranks=ranks, duration_values=order_stats[n_levels:],
+                           ramp_min=ramp_min, ramp_max=ramp_max, ramp_quantiles=ramp_quantiles,
+                           ramp_hist_edges=ramp_hist_edges, ramp_hist_counts=ramp_hist_counts,
+                           top_slot_idx=top_slot_idx, top_slot_values=top_slot_values, is_exact=is_exact)
@@ -0,0 +1,101 @@
+"""
+Writers of UC results (optimal decisions and marginal prices) - one per output file format:
+- CSV: one wide file per result family and run (historical format, e.g. to open results in a spreadsheet)
+- Parquet: zstd-compressed binary files, in a single dataset partitioned by (target year, climatic year, start
+horizon) - much faster to write/reload and smaller on disk, e.g. for batch runs. Needs pyarrow; CSV used otherwise
+"""
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict
+
+import pandas as pd
+
+from common.long_term_uc_io import UC_RESULT_FILE_FORMATS, UC_RESULT_FAMILIES, get_opt_power_file, \
+    get_storage_opt_dec_file, get_link_flow_opt_dec_file, get_marginal_prices_file, get_uc_results_dataset_file
+
+try:
+    import pyarrow  # noqa: F401 -> only needed by pandas parquet IO
+    WITH_PARQUET = True
+except ImportError:
+    WITH_PARQUET = False
+
+PARQUET_COMPRESSION = 'zstd'
+CSV_FILE_GETTERS = {UC_RESULT_FAMILIES.opt_power: get_opt_power_file,
+                    UC_RESULT_FAMILIES.storage_opt_decisions: get_storage_opt_dec_file,
+                    UC_RESULT_FAMILIES.link_flow_opt_decisions: get_link_flow_opt_dec_file,
+                    UC_RESULT_FAMILIES.marginal_prices: get_marginal_prices_file}
+
+
+@dataclass
+class UCResultWriter(ABC):
+    """
+    Abstract base class - results of a given run, identified by (country, target year, climatic year, start horizon)
+    """
+    country: str
+    year: int
+    climatic_year: int
+    start_horizon: datetime
+    toy_model_output: bool = False
+    file_format: str = None
+
+    @abstractmethod
+    def get_file(self, result_family: str) -> str:
+        pass
+
+    @abstractmethod
+    def write_df(self, df: pd.DataFrame, file: str):
+        pass
+
+    def write(self, result_family: str, df: pd.DataFrame):
+        file = self.get_file(result_family=result_family)
+        logging.info(f'Save {result_family} to {self.file_format} file {file}')
+        self.write_df(df=df, file=file)
+
+    def write_all(self, results: Dict[str, pd.DataFrame]):
+        for result_family, df in results.items():
+            self.write(result_family=result_family, df=df)
+
+
+@dataclass
+class CsvUCResultWriter(UCResultWriter):
+    file_format: str = UC_RESULT_FILE_FORMATS.csv
+
+    def get_file(self, result_family: str) -> str:
+        return CSV_FILE_GETTERS[result_family](country=self.country, year=self.year, climatic_year=self.climatic_year,
+                                               start_horizon=self.start_horizon,
+                                               toy_model_output=self.toy_model_output)
+
+    def write_df(self, df: pd.DataFrame, file: str):
+        df.to_csv(file)
+
+
+@dataclass
+class ParquetUCResultWriter(UCResultWriter):
+    file_format: str = UC_RESULT_FILE_FORMATS.parquet
+
+    def get_file(self, result_family: str) -> str:
+        return get_uc_results_dataset_file(result_family=result_family, country=self.country, year=self.year,
+                                           climatic_year=self.climatic_year, start_horizon=self.start_horizon,
+                                           toy_model_output=self.toy_model_output)
+
+    def write_df(self, df: pd.DataFrame, file: str):
+        df.to_parquet(file, compression=PARQUET_COMPRESSION)
+
+
+UC_RESULT_WRITERS = {UC_RESULT_FILE_FORMATS.csv: CsvUCResultWriter,
+                     UC_RESULT_FILE_FORMATS.parquet: ParquetUCResultWriter}
+
+
+def get_uc_result_writer(file_format: str, country: str, year: int, climatic_year: int, start_horizon: datetime,
+                         toy_model_output: bool = False) -> UCResultWriter:
+    if file_format not in UC_RESULT_WRITERS:
+        raise Exception(f'Unknown UC result file format {file_format}; it must be in {list(UC_RESULT_WRITERS)} '
+                        f'-> STOP')
+    if file_format == UC_RESULT_FILE_FORMATS.parquet and not WITH_PARQUET:
+        logging.warning(f'pyarrow not available -> UC results saved in {UC_RESULT_FILE_FORMATS.csv} files '
+                        f'instead of {file_format} ones')
+        file_format = UC_RESULT_FILE_FORMATS.csv
+    return UC_RESULT_WRITERS[file_format](country=country, year=year, climatic_year=climatic_year,
+                                          start_horizon=start_horizon, toy_model_output=toy_model_output)